@@ -1,24 +1,49 @@
 # application/pipelines/bc3_classification_pipeline.py
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import logging
 import math
 import re
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Sequence
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Sequence
 
-from application.services.catalog_candidate_selector import CatalogCandidateSelector
+from application.services.bc3_batch_planner import (
+    Bc3BatchPlanner,
+    Bc3PlannedBatch,
+)
+from application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+    FocusedRanking,
+)
+from application.services.catalog_feature_index import (
+    CatalogFeatureIndex,
+    normalize_text,
+)
+from application.services.llm_circuit_breaker import (
+    LlmCircuitBreaker,
+    is_llm_unavailable_error,
+)
 from application.services.prompted_text_extraction_service import (
     PromptedTextExtractionService,
 )
 from domain.models.bc3_classification_models import (
-    Bc3CatalogoItem,
     Bc3ClasificacionItem,
     Bc3ClasificacionResultado,
     Bc3ClassificationRequest,
     Bc3DescompuestoInput,
+    Bc3FamiliaCompacta,
     Bc3PromptCandidate,
 )
+from domain.models.llm_usage import LlmUsage
+from domain.ports.bc3_job_journal import Bc3JobJournal
+from domain.ports.bc3_result_cache import Bc3ResultCache
 from infrastructure.catalog.compact_catalog_yaml_repository import (
     CompactCatalogBundle,
     CompactCatalogYamlRepository,
@@ -47,6 +72,58 @@ _TYPE_CODE_TO_RESULT = {
 
 _CODE_SPACE_RE = re.compile(r"\s+")
 
+# La confianza del selector y el fallback solo consultan top1/top2.
+_SELECTOR_RANKING_HEAD = 2
+
+_RESULT_CACHE_SOURCE = "result_cache"
+_FAST_PATH_SOURCE = "selector_fast_path"
+
+# Rondas de reintento como máximo por lote, dentro del presupuesto global
+# del request.
+_MAX_RETRY_ROUNDS_PER_BATCH = 2
+
+# Lotes enviados al pool por encima de los que caben en vuelo, para que el
+# siguiente esté listo sin acumular resultados pendientes de consumir.
+_LLM_SUBMIT_WINDOW_FACTOR = 2
+
+# "inline": el catálogo viaja como valor "cat" dentro de INPUT_JSON.
+# "prefix": tarea + catálogo en crudo forman un primer bloque idéntico en
+# todas las llamadas y INPUT_JSON solo lleva el lote.
+# "top_k": como "prefix", pero el bloque solo trae la unión de los top-K
+# candidatos del selector de los items del lote (menos tokens, sin cache
+# de prefijo para el catálogo).
+# "hierarchical": una primera llamada (solo leyenda de familias) elige una o
+# dos familias por item y la clasificación ve solo los items de esas
+# familias (más unos pocos candidatos del selector como red de seguridad).
+_PROMPT_LAYOUTS = ("inline", "prefix", "top_k", "hierarchical")
+_SLICE_LAYOUTS = ("top_k", "hierarchical")
+_CATALOG_PREFIX_HEADER = (
+    "BLOQUE cat (catálogo compacto), enviado aquí como texto literal en lugar "
+    "de dentro de INPUT_JSON; INPUT_JSON solo trae \"lot\".\n"
+    "cat:\n"
+)
+_CATALOG_SLICE_HEADER = (
+    "BLOQUE cat (extracto del catálogo compacto con los candidatos de este "
+    "lote), enviado aquí como texto literal en lugar de dentro de INPUT_JSON; "
+    "INPUT_JSON solo trae \"lot\". codigo_interno debe salir de este extracto.\n"
+    "cat:\n"
+)
+_FAMILY_LEGEND_HEADER = "LEYENDA de familias del catálogo:\n"
+_FAMILY_PROMPT_KEY = "bc3_familia_es"
+_FAMILY_STAGE_BATCH_FACTOR = 4
+_MAX_FAMILIES_PER_ITEM = 2
+_HIERARCHICAL_SELECTOR_HEDGE = 3
+_MAX_CACHED_CATALOG_PREFIXES = 4
+
+
+def _resolution_path(item: Bc3ClasificacionItem) -> str:
+    source = item.confidence_source or ""
+    if source in (_RESULT_CACHE_SOURCE, _FAST_PATH_SOURCE):
+        return source
+    if source == "fallback_selector":
+        return "fallback"
+    return "llm"
+
 
 @dataclass(frozen=True)
 class _FallbackSelection:
@@ -65,6 +142,156 @@ class _ConfidenceInfo:
     selector_conf_pct: float
 
 
+@dataclass(frozen=True)
+class _DedupPlan:
+    originals: List[Bc3DescompuestoInput]
+    unique: List[Bc3DescompuestoInput]
+    unique_position: List[int]
+    original_positions: List[List[int]]
+
+
+class _RetryBudget:
+    """
+    Presupuesto de llamadas de reintento de un request, compartido por los
+    lotes en vuelo (hilos o corrutinas).
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(0, int(limit))
+        self.used = 0
+        self.recovered = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+    def record_recovered(self, count: int) -> None:
+        with self._lock:
+            self.recovered += count
+
+
+class _UsageTally:
+    """
+    Suma del uso de tokens reportado por la API en un request (lotes y
+    reintentos), para medir el acierto de la cache de prefijo.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage: LlmUsage) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.input_tokens
+            self.cached_input_tokens += usage.cached_input_tokens
+            self.output_tokens += usage.output_tokens
+
+
+class _LlmCallGate:
+    """
+    Decide, por request, si una llamada al LLM se hace y con qué timeout:
+    el plazo global del request acota el timeout de cada llamada y, con el
+    circuito abierto, los lotes van directos al fallback local.
+    """
+
+    def __init__(
+        self,
+        *,
+        circuit_breaker: LlmCircuitBreaker | None,
+        deadline_s: float | None,
+        call_timeout_s: float | None,
+    ) -> None:
+        self._circuit_breaker = circuit_breaker
+        self._expires_at = time.monotonic() + deadline_s if deadline_s else None
+        self._call_timeout_s = call_timeout_s or None
+        self.skipped_circuit_open = 0
+        self.skipped_deadline = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple[bool, float | None]:
+        timeout_s = self._call_timeout_s
+        if self._expires_at is not None:
+            remaining = self._expires_at - time.monotonic()
+            if remaining <= 0:
+                with self._lock:
+                    self.skipped_deadline += 1
+                return False, None
+            timeout_s = min(timeout_s or remaining, remaining)
+
+        if self._circuit_breaker is not None and not self._circuit_breaker.allow():
+            with self._lock:
+                self.skipped_circuit_open += 1
+            return False, None
+        return True, timeout_s
+
+    def release(self, *, responded: bool, error: BaseException | None = None) -> None:
+        if self._circuit_breaker is None:
+            return
+        if responded:
+            self._circuit_breaker.record_success()
+        elif error is not None and is_llm_unavailable_error(error):
+            self._circuit_breaker.record_failure()
+        else:
+            self._circuit_breaker.record_inconclusive()
+
+    def blocked(self) -> bool:
+        """Sin consumir la llamada de prueba del circuito semiabierto."""
+        if self._expires_at is not None and time.monotonic() >= self._expires_at:
+            return True
+        return self._circuit_breaker is not None and self._circuit_breaker.is_open()
+
+
+@dataclass(frozen=True)
+class _FamilyLegend:
+    text: str
+    codes_by_family: Dict[str, List[str]]
+
+
+@dataclass(frozen=True)
+class _RunPlan:
+    req: Bc3ClassificationRequest
+    dedup_plan: _DedupPlan | None
+    bundle: CompactCatalogBundle
+    catalog_index: CatalogFeatureIndex
+    rankings: List[List[Bc3PromptCandidate]] | None
+    cache_keys: List[str]
+    cached_items: Dict[int, Bc3ClasificacionItem]
+    fast_path_items: Dict[int, Bc3ClasificacionItem]
+    journal: Bc3JobJournal | None
+    journal_key: str | None
+    journal_items: Dict[int, Bc3ClasificacionItem]
+    pending_positions: List[int]
+    batches: List[Bc3PlannedBatch]
+    batch_starts: List[int]
+    batch_size: int
+    prefix_tokens: int
+    retry_budget: _RetryBudget
+    usage_tally: _UsageTally
+    llm_gate: _LlmCallGate
+    context_text: str | None
+    slice_codes: Dict[str, List[str]]
+
+    @property
+    def total_batches(self) -> int:
+        return max(1, len(self.batches))
+
+
+@dataclass(frozen=True)
+class _LlmCallInput:
+    payload: dict
+    context_text: str | None
+    prompt_cache_key: str | None
+    prompt_cache_retention: str | None
+
+
 @dataclass(frozen=True)
 class _RepairResult:
     items: List[Bc3ClasificacionItem]
@@ -83,6 +310,19 @@ class Bc3ClassificationPipeline:
         prompt_cache_enabled: bool = True,
         prompt_cache_key_prefix: str = "bc3-catalog",
         prompt_cache_retention: str | None = "24h",
+        selector_engine: str = "scalar",
+        dedup_enabled: bool = False,
+        result_cache: Bc3ResultCache | None = None,
+        llm_max_concurrency: int = 1,
+        batch_planner: Bc3BatchPlanner | None = None,
+        fast_path_enabled: bool = False,
+        fast_path_min_confidence: float = 85.0,
+        fast_path_min_margin: float = 0.25,
+        llm_retry_budget: int = 0,
+        prompt_layout: str = "inline",
+        circuit_breaker: LlmCircuitBreaker | None = None,
+        llm_call_timeout_s: float = 0.0,
+        request_deadline_s: float = 0.0,
     ) -> None:
         self._extractor = extractor
         self._selector = selector
@@ -90,116 +330,1448 @@ class Bc3ClassificationPipeline:
         self._prompt_cache_enabled = prompt_cache_enabled
         self._prompt_cache_key_prefix = prompt_cache_key_prefix
         self._prompt_cache_retention = prompt_cache_retention
+        self._selector_engine = (selector_engine or "scalar").strip().lower()
+        self._dedup_enabled = dedup_enabled
+        self._result_cache = result_cache
+        self._llm_max_concurrency = max(1, int(llm_max_concurrency))
+        # Sin planner explícito se agrupa solo por nº de items (presupuestos
+        # desactivados), pero se siguen estimando tokens para el log.
+        self._batch_planner = batch_planner or Bc3BatchPlanner(
+            max_input_tokens=0,
+            max_output_tokens=0,
+        )
+        self._fast_path_enabled = fast_path_enabled
+        self._fast_path_min_confidence = float(fast_path_min_confidence)
+        self._fast_path_min_margin = float(fast_path_min_margin)
+        self._llm_retry_budget = max(0, int(llm_retry_budget))
+        self._prompt_layout = (prompt_layout or "inline").strip().lower()
+        if self._prompt_layout not in _PROMPT_LAYOUTS:
+            raise ValueError(
+                f"Layout de prompt '{prompt_layout}' no soportado. "
+                f"Disponibles: {', '.join(_PROMPT_LAYOUTS)}"
+            )
+        self._circuit_breaker = circuit_breaker
+        self._llm_call_timeout_s = max(0.0, float(llm_call_timeout_s))
+        self._request_deadline_s = max(0.0, float(request_deadline_s))
+        self._catalog_prefixes: Dict[str, str] = {}
+        self._family_legends: Dict[str, _FamilyLegend] = {}
+        self._catalog_prefixes_lock = threading.Lock()
+
+    def run(
+        self,
+        req: Bc3ClassificationRequest,
+        *,
+        journal: Bc3JobJournal | None = None,
+    ) -> Bc3ClasificacionResultado:
+        """
+        Con `journal`, cada lote reparado queda anotado y una nueva ejecución
+        del mismo request (tras una caída) solo envía al LLM lo que faltaba.
+        """
+        results: List[Bc3ClasificacionItem | None] = [None] * len(req.descompuestos)
+        for position, item in self._iter_positioned(req, journal=journal):
+            results[position] = item
+        return Bc3ClasificacionResultado(resultados=results)
+
+    def run_iter(
+        self,
+        req: Bc3ClassificationRequest,
+        *,
+        journal: Bc3JobJournal | None = None,
+    ) -> Iterator[Bc3ClasificacionItem]:
+        """
+        Emite los items reparados según se resuelven: primero los que no
+        necesitan LLM (diario, cache de resultados, fast path) y después cada
+        lote en orden. Solo se retienen los lotes en vuelo, no el resultado
+        completo.
+        """
+        for _position, item in self._iter_positioned(req, journal=journal):
+            yield item
+
+    def run_iter_positioned(
+        self,
+        req: Bc3ClassificationRequest,
+        *,
+        journal: Bc3JobJournal | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> Iterator[tuple[int, Bc3ClasificacionItem]]:
+        """
+        Como `run_iter`, con la posición de cada item en el request. Si se
+        pasa `progress`, se llama con (lotes_terminados, lotes_totales) tras
+        los items resueltos sin LLM y tras cada lote.
+        """
+        yield from self._iter_positioned(req, journal=journal, progress=progress)
+
+    async def run_async(
+        self,
+        req: Bc3ClassificationRequest,
+        *,
+        journal: Bc3JobJournal | None = None,
+    ) -> Bc3ClasificacionResultado:
+        """
+        Mismo resultado que `run` sobre un event loop: las llamadas al LLM son
+        corrutinas limitadas por `llm_max_concurrency` y la parte de CPU
+        (ranking local y reparación) va a hilos para no bloquear el loop.
+        """
+        results: List[Bc3ClasificacionItem | None] = [None] * len(req.descompuestos)
+        async for position, item in self._aiter_positioned(req, journal=journal):
+            results[position] = item
+        return Bc3ClasificacionResultado(resultados=results)
+
+    def _iter_positioned(
+        self,
+        req: Bc3ClassificationRequest,
+        *,
+        journal: Bc3JobJournal | None = None,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> Iterator[tuple[int, Bc3ClasificacionItem]]:
+        plan = self._plan_run(req, journal=journal)
+        paths: Counter[str] = Counter()
+        yield from self._emit_resolved(plan=plan, paths=paths)
+        if progress is not None:
+            progress(0, len(plan.batches))
+
+        # Ventana deslizante: el pool limita cuántos lotes están en el LLM y
+        # la ventana cuántos resultados pueden esperar a ser consumidos.
+        # Los lotes se entregan en orden: mientras se repara el lote N
+        # (ranking local), los siguientes siguen en el LLM.
+        max_workers = self._log_llm_concurrency(plan)
+        window = max_workers * _LLM_SUBMIT_WINDOW_FACTOR
+        total_batches = len(plan.batches)
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="bc3-llm",
+        )
+        try:
+            in_flight: deque[Future] = deque()
+            next_batch = 1
+            while in_flight or next_batch <= total_batches:
+                while next_batch <= total_batches and len(in_flight) < window:
+                    in_flight.append(
+                        executor.submit(
+                            self._classify_batch_with_llm,
+                            plan=plan,
+                            batch_index=next_batch,
+                        )
+                    )
+                    next_batch += 1
+
+                batch_index = next_batch - len(in_flight)
+                items = self._finish_batch(
+                    plan=plan,
+                    batch_index=batch_index,
+                    parsed=in_flight.popleft().result(),
+                )
+                yield from self._emit_batch(
+                    plan=plan,
+                    batch_index=batch_index,
+                    items=items,
+                    paths=paths,
+                )
+                if progress is not None:
+                    progress(batch_index, total_batches)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        self._complete_journal(plan)
+        self._log_run_summary(plan=plan, paths=paths)
+
+    async def _aiter_positioned(
+        self,
+        req: Bc3ClassificationRequest,
+        *,
+        journal: Bc3JobJournal | None = None,
+    ) -> AsyncIterator[tuple[int, Bc3ClasificacionItem]]:
+        plan = await asyncio.to_thread(self._plan_run, req, journal=journal)
+        paths: Counter[str] = Counter()
+        for emitted in self._emit_resolved(plan=plan, paths=paths):
+            yield emitted
+
+        # Misma ventana que la ruta síncrona: el semáforo limita las
+        # llamadas al LLM y la ventana las tareas vivas y los resultados que
+        # esperan a un consumidor lento.
+        max_workers = self._log_llm_concurrency(plan)
+        semaphore = asyncio.Semaphore(max_workers)
+        window = max_workers * _LLM_SUBMIT_WINDOW_FACTOR
+        total_batches = len(plan.batches)
+
+        async def _bounded_call(batch_index: int) -> Bc3ClasificacionResultado:
+            async with semaphore:
+                return await self._classify_batch_with_llm_async(
+                    plan=plan,
+                    batch_index=batch_index,
+                )
+
+        in_flight: deque[asyncio.Future] = deque()
+        next_batch = 1
+        try:
+            while in_flight or next_batch <= total_batches:
+                while next_batch <= total_batches and len(in_flight) < window:
+                    in_flight.append(asyncio.ensure_future(_bounded_call(next_batch)))
+                    next_batch += 1
+
+                batch_index = next_batch - len(in_flight)
+                parsed = await in_flight.popleft()
+                items = await asyncio.to_thread(
+                    self._finish_batch,
+                    plan=plan,
+                    batch_index=batch_index,
+                    parsed=parsed,
+                )
+                for emitted in self._emit_batch(
+                    plan=plan,
+                    batch_index=batch_index,
+                    items=items,
+                    paths=paths,
+                ):
+                    yield emitted
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        await asyncio.to_thread(self._complete_journal, plan)
+        await asyncio.to_thread(self._log_run_summary, plan=plan, paths=paths)
+
+    def _plan_run(
+        self,
+        req: Bc3ClassificationRequest,
+        *,
+        journal: Bc3JobJournal | None = None,
+    ) -> _RunPlan:
+        # El plazo del request cuenta desde aquí: incluye el ranking local.
+        llm_gate = _LlmCallGate(
+            circuit_breaker=self._circuit_breaker,
+            deadline_s=req.deadline_s or self._request_deadline_s,
+            call_timeout_s=self._llm_call_timeout_s,
+        )
+        original_req = req
+        dedup_plan: _DedupPlan | None = None
+        if self._dedup_enabled:
+            dedup_plan = self._plan_dedup(req.descompuestos)
+            req = req.model_copy(update={"descompuestos": dedup_plan.unique})
 
-    def run(self, req: Bc3ClassificationRequest) -> Bc3ClasificacionResultado:
         bundle = self._catalog_repository.get_bundle()
         catalog_items = bundle.to_bc3_catalog_items()
+        catalog_index = self._selector.index_for(
+            cache_key=bundle.prompt_cache_key,
+            catalogo=catalog_items,
+        )
+
+        journal_key: str | None = None
+        journal_items: Dict[int, Bc3ClasificacionItem] = {}
+        if journal is not None:
+            journal_key = self._journal_key(req=original_req, bundle=bundle)
+            journal_items = self._load_journal(
+                journal=journal,
+                journal_key=journal_key,
+                req=req,
+            )
+
+        precomputed_rankings = self._precompute_rankings(
+            req=req,
+            catalog_index=catalog_index,
+        )
+
+        cache_keys: List[str] = []
+        cached_items: Dict[int, Bc3ClasificacionItem] = {}
+        if self._result_cache is not None:
+            cache_keys = [
+                self._result_cache_key(req=req, bundle=bundle, item=item)
+                for item in req.descompuestos
+            ]
+            cached_items = self._resolve_cached_results(
+                req=req,
+                bundle=bundle,
+                catalog_index=catalog_index,
+                cache_keys=cache_keys,
+                rankings=precomputed_rankings,
+            )
+
+        fast_path_items: Dict[int, Bc3ClasificacionItem] = {}
+        if self._fast_path_enabled:
+            if precomputed_rankings is None:
+                # El ranking del fast path se guarda en el plan y sirve
+                # también para los candidatos del prompt y la reparación.
+                precomputed_rankings = self._rank_descompuestos(
+                    req=req,
+                    catalog_index=catalog_index,
+                    skip={**journal_items, **cached_items},
+                )
+            fast_path_items = self._resolve_fast_path(
+                req=req,
+                bundle=bundle,
+                catalog_index=catalog_index,
+                rankings=precomputed_rankings,
+                skip={**journal_items, **cached_items},
+            )
+
+        pending_positions = [
+            position
+            for position in range(len(req.descompuestos))
+            if position not in journal_items
+            and position not in cached_items
+            and position not in fast_path_items
+        ]
+        pending = [req.descompuestos[position] for position in pending_positions]
 
         batch_size = max(1, int(req.llm_batch_size or 1))
-        total_items = len(req.descompuestos)
-        total_batches = max(1, (total_items + batch_size - 1) // batch_size)
+        usage_tally = _UsageTally()
+        families_by_id: Dict[str, List[str]] = {}
+        if self._prompt_layout == "hierarchical" and pending:
+            families_by_id = self._classify_families(
+                bundle=bundle,
+                pending=pending,
+                batch_size=batch_size,
+                usage_tally=usage_tally,
+                llm_gate=llm_gate,
+            )
+            # Lotes de la segunda etapa agrupados por familias: items vecinos
+            # comparten extracto de catálogo. Sin familia, al final.
+            order = sorted(
+                range(len(pending)),
+                key=lambda k: (
+                    pending[k].id not in families_by_id,
+                    families_by_id.get(pending[k].id, []),
+                ),
+            )
+            pending_positions = [pending_positions[k] for k in order]
+            pending = [pending[k] for k in order]
+
+        batches = self._batch_planner.plan(
+            pending,
+            compact_items=[self._to_compact_input(item) for item in pending],
+            max_items=batch_size,
+        )
+        batch_starts: List[int] = []
+        offset = 0
+        for batch in batches:
+            batch_starts.append(offset)
+            offset += len(batch.items)
 
         logger.info(
-            "BC3 clasificación por lotes. total_descompuestos=%s llm_batch_size=%s total_batches=%s catalog_items=%s",
-            total_items,
+            "BC3 clasificación por lotes. total_descompuestos=%s llm_batch_size=%s total_batches=%s catalog_items=%s items_por_lote=%s",
+            len(pending),
             batch_size,
-            total_batches,
+            max(1, len(batches)),
             len(bundle.entries),
+            [len(batch.items) for batch in batches],
         )
 
-        aggregated: List[Bc3ClasificacionItem] = []
+        context_text = None
+        slice_codes: Dict[str, List[str]] = {}
+        prefix_tokens = self._batch_planner.estimate_tokens(bundle.prompt_text)
+        if self._prompt_layout == "prefix":
+            context_text = self._catalog_prefix(bundle)
+            prefix_tokens = self._batch_planner.estimate_tokens(context_text)
+        elif self._prompt_layout == "top_k":
+            slice_codes = self._slice_candidates(
+                req=req,
+                positions=pending_positions,
+                catalog_index=catalog_index,
+                rankings=precomputed_rankings,
+                top_k=req.top_k_candidates,
+            )
+            # El extracto cambia por lote; se estima en _log_batch_tokens.
+            prefix_tokens = 0
+        elif self._prompt_layout == "hierarchical":
+            hedge = self._slice_candidates(
+                req=req,
+                positions=pending_positions,
+                catalog_index=catalog_index,
+                rankings=precomputed_rankings,
+                top_k=_HIERARCHICAL_SELECTOR_HEDGE,
+            )
+            codes_by_family = self._family_legend(bundle).codes_by_family
+            for descompuesto in pending:
+                families = families_by_id.get(descompuesto.id)
+                codes: List[str] = []
+                if families:
+                    for family_id in families:
+                        codes.extend(codes_by_family.get(family_id, ()))
+                    codes.extend(hedge.get(descompuesto.id, ()))
+                slice_codes[descompuesto.id] = list(dict.fromkeys(codes))
+            prefix_tokens = 0
+
+        return _RunPlan(
+            req=req,
+            dedup_plan=dedup_plan,
+            bundle=bundle,
+            catalog_index=catalog_index,
+            rankings=precomputed_rankings,
+            cache_keys=cache_keys,
+            cached_items=cached_items,
+            fast_path_items=fast_path_items,
+            journal=journal,
+            journal_key=journal_key,
+            journal_items=journal_items,
+            pending_positions=pending_positions,
+            batches=batches,
+            batch_starts=batch_starts,
+            batch_size=batch_size,
+            prefix_tokens=prefix_tokens,
+            retry_budget=_RetryBudget(self._llm_retry_budget),
+            usage_tally=usage_tally,
+            llm_gate=llm_gate,
+            context_text=context_text,
+            slice_codes=slice_codes,
+        )
 
-        for batch_index, batch in enumerate(self._chunk(req.descompuestos, batch_size), start=1):
-            ids = [item.id for item in batch]
+    def _log_llm_concurrency(self, plan: _RunPlan) -> int:
+        max_workers = max(1, min(self._llm_max_concurrency, len(plan.batches) or 1))
+        if plan.batches:
             logger.info(
-                "BC3 lote %s/%s. items=%s ids=%s",
-                batch_index,
-                total_batches,
-                len(batch),
-                ids,
+                "BC3 lotes LLM en paralelo. lotes=%s max_concurrency=%s",
+                len(plan.batches),
+                max_workers,
             )
+        return max_workers
 
-            payload = {
-                "cat": bundle.prompt_text,
-                "lot": [self._to_compact_input(item) for item in batch],
-            }
+    def _prepare_llm_call(
+        self,
+        *,
+        plan: _RunPlan,
+        items: Sequence[Bc3DescompuestoInput],
+    ) -> _LlmCallInput:
+        lot = [self._to_compact_input(item) for item in items]
+        context_text = plan.context_text
+        if self._prompt_layout in _SLICE_LAYOUTS:
+            context_text = self._catalog_slice(plan=plan, items=items)
+        if context_text is not None:
+            payload = {"lot": lot}
+        else:
+            payload = {"cat": plan.bundle.prompt_text, "lot": lot}
+
+        prompt_cache_key = None
+        prompt_cache_retention = None
+        if self._prompt_cache_enabled:
+            cache_scope = plan.bundle.prompt_cache_key
+            if self._prompt_layout in _SLICE_LAYOUTS:
+                # El extracto cambia por lote: la clave sigue a su contenido
+                # para no mezclar prefijos distintos bajo la misma clave.
+                digest = hashlib.sha256(context_text.encode("utf-8")).hexdigest()
+                cache_scope = f"slice:{digest[:24]}"
+            prompt_cache_key = f"{self._prompt_cache_key_prefix}:{cache_scope}"
+            prompt_cache_retention = self._prompt_cache_retention
+
+        return _LlmCallInput(
+            payload=payload,
+            context_text=context_text,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+        )
 
-            prompt_cache_key = None
-            prompt_cache_retention = None
-            if self._prompt_cache_enabled:
-                prompt_cache_key = f"{self._prompt_cache_key_prefix}:{bundle.prompt_cache_key}"
-                prompt_cache_retention = self._prompt_cache_retention
+    def _catalog_prefix(self, bundle: CompactCatalogBundle) -> str:
+        """
+        Bloque de catálogo del layout "prefix", serializado una vez por
+        versión de catálogo y reutilizado tal cual en cada lote.
+        """
+        with self._catalog_prefixes_lock:
+            prefix = self._catalog_prefixes.get(bundle.prompt_cache_key)
+            if prefix is None:
+                if len(self._catalog_prefixes) >= _MAX_CACHED_CATALOG_PREFIXES:
+                    self._catalog_prefixes.pop(next(iter(self._catalog_prefixes)))
+                prefix = _CATALOG_PREFIX_HEADER + bundle.prompt_text
+                self._catalog_prefixes[bundle.prompt_cache_key] = prefix
+            return prefix
+
+    def _slice_candidates(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        positions: Sequence[int],
+        catalog_index: CatalogFeatureIndex,
+        rankings: Sequence[List[Bc3PromptCandidate]] | None,
+        top_k: int,
+    ) -> Dict[str, List[str]]:
+        """
+        Top `top_k` del selector por descompuesto pendiente, para los
+        layouts con extracto de catálogo. Reutiliza el ranking vectorizado
+        si existe.
+        """
+        candidates: Dict[str, List[str]] = {}
+        for position in positions:
+            descompuesto = req.descompuestos[position]
+            if rankings is not None:
+                ranking = rankings[position][:top_k]
+            else:
+                try:
+                    ranking = self._selector.select(
+                        descompuesto=descompuesto,
+                        index=catalog_index,
+                        top_k=top_k,
+                    )
+                except Exception as exc:
+                    logger.warning(
+                        "No se pudieron calcular candidatos para id=%s; se enviará el catálogo completo. error=%s",
+                        descompuesto.id,
+                        exc,
+                    )
+                    ranking = []
+            candidates[descompuesto.id] = [candidate.codigo for candidate in ranking]
+        return candidates
 
-            try:
-                parsed, _schema_name = self._extractor.extract(
-                    prompt_key=req.prompt_key,
-                    payload=payload,
-                    prompt_cache_key=prompt_cache_key,
-                    prompt_cache_retention=prompt_cache_retention,
+    def _catalog_slice(
+        self,
+        *,
+        plan: _RunPlan,
+        items: Sequence[Bc3DescompuestoInput],
+    ) -> str:
+        """
+        Extracto del catálogo con la unión de candidatos del lote. Si algún
+        item no tiene candidatos se envía el catálogo completo.
+        """
+        codes: Dict[str, None] = {}
+        for item in items:
+            item_codes = plan.slice_codes.get(item.id)
+            if not item_codes:
+                return self._catalog_prefix(plan.bundle)
+            codes.update(dict.fromkeys(item_codes))
+        return _CATALOG_SLICE_HEADER + plan.bundle.slice_prompt_text(codes)
+
+    def _family_legend(self, bundle: CompactCatalogBundle) -> _FamilyLegend:
+        with self._catalog_prefixes_lock:
+            legend = self._family_legends.get(bundle.prompt_cache_key)
+            if legend is None:
+                if len(self._family_legends) >= _MAX_CACHED_CATALOG_PREFIXES:
+                    self._family_legends.pop(next(iter(self._family_legends)))
+                legend = _FamilyLegend(
+                    text=_FAMILY_LEGEND_HEADER + bundle.family_legend_text(),
+                    codes_by_family=bundle.codes_by_family(),
                 )
-                parsed_result = Bc3ClasificacionResultado.model_validate(parsed)
-            except Exception as exc:
-                logger.exception(
-                    "Fallo en clasificación BC3 con LLM. Se aplicará fallback local. error=%s",
-                    exc,
+                self._family_legends[bundle.prompt_cache_key] = legend
+            return legend
+
+    def _classify_families(
+        self,
+        *,
+        bundle: CompactCatalogBundle,
+        pending: Sequence[Bc3DescompuestoInput],
+        batch_size: int,
+        usage_tally: _UsageTally,
+        llm_gate: _LlmCallGate,
+    ) -> Dict[str, List[str]]:
+        """
+        Primera etapa del layout "hierarchical": el LLM sitúa cada item en
+        una o dos familias viendo solo la leyenda. Los lotes son mayores que
+        los de clasificación porque la salida por item es mínima.
+        """
+        legend = self._family_legend(bundle)
+        batches = self._batch_planner.plan(
+            pending,
+            compact_items=[self._to_compact_input(item) for item in pending],
+            max_items=batch_size * _FAMILY_STAGE_BATCH_FACTOR,
+        )
+        max_workers = max(1, min(self._llm_max_concurrency, len(batches) or 1))
+        with ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="bc3-familias",
+        ) as executor:
+            results = list(
+                executor.map(
+                    lambda batch: self._call_family_llm(
+                        bundle=bundle,
+                        legend=legend,
+                        items=batch.items,
+                        usage_tally=usage_tally,
+                        llm_gate=llm_gate,
+                    ),
+                    batches,
                 )
-                parsed_result = Bc3ClasificacionResultado(resultados=[])
+            )
+
+        families_by_id: Dict[str, List[str]] = {}
+        for result in results:
+            families_by_id.update(result)
+
+        logger.info(
+            "BC3 etapa de familias. lotes=%s items=%s con_familia=%s familias_por_item=%.2f",
+            len(batches),
+            len(pending),
+            len(families_by_id),
+            sum(len(families) for families in families_by_id.values())
+            / max(len(families_by_id), 1),
+        )
+        return families_by_id
+
+    def _call_family_llm(
+        self,
+        *,
+        bundle: CompactCatalogBundle,
+        legend: _FamilyLegend,
+        items: Sequence[Bc3DescompuestoInput],
+        usage_tally: _UsageTally,
+        llm_gate: _LlmCallGate,
+    ) -> Dict[str, List[str]]:
+        payload = {"lot": [self._to_compact_input(item) for item in items]}
+        prompt_cache_key = None
+        prompt_cache_retention = None
+        if self._prompt_cache_enabled:
+            prompt_cache_key = f"{self._prompt_cache_key_prefix}-familias:{bundle.prompt_cache_key}"
+            prompt_cache_retention = self._prompt_cache_retention
+
+        allowed, timeout_s = llm_gate.acquire()
+        if not allowed:
+            return {}
+
+        usage: List[LlmUsage] = []
+        responded = False
+        error: Exception | None = None
+        try:
+            parsed, _schema_name = self._extractor.extract(
+                prompt_key=_FAMILY_PROMPT_KEY,
+                payload=payload,
+                prompt_cache_key=prompt_cache_key,
+                prompt_cache_retention=prompt_cache_retention,
+                usage_sink=usage.append,
+                context_text=legend.text,
+                timeout_s=timeout_s,
+            )
+            responded = True
+            result = Bc3FamiliaCompacta.model_validate(parsed)
+        except Exception as exc:
+            error = exc
+            logger.exception(
+                "Fallo en la etapa de familias BC3. Esos items verán el catálogo completo. error=%s",
+                exc,
+            )
+            return {}
+        finally:
+            llm_gate.release(responded=responded, error=error)
+            for reported in usage:
+                usage_tally.add(reported)
+
+        expected_ids = {item.id for item in items}
+        families_by_id: Dict[str, List[str]] = {}
+        for row in result.r:
+            if row.i not in expected_ids:
+                continue
+            families = [
+                family_id
+                for family_id in dict.fromkeys(raw.strip() for raw in row.f)
+                if family_id in legend.codes_by_family
+            ][:_MAX_FAMILIES_PER_ITEM]
+            if families:
+                families_by_id[row.i] = families
+        return families_by_id
+
+    def _call_llm(
+        self,
+        *,
+        plan: _RunPlan,
+        call: _LlmCallInput,
+        usage: List[LlmUsage],
+    ) -> Bc3ClasificacionResultado:
+        allowed, timeout_s = plan.llm_gate.acquire()
+        if not allowed:
+            return Bc3ClasificacionResultado(resultados=[])
+
+        responded = False
+        error: Exception | None = None
+        try:
+            parsed, _schema_name = self._extractor.extract(
+                prompt_key=plan.req.prompt_key,
+                payload=call.payload,
+                prompt_cache_key=call.prompt_cache_key,
+                prompt_cache_retention=call.prompt_cache_retention,
+                usage_sink=usage.append,
+                context_text=call.context_text,
+                timeout_s=timeout_s,
+            )
+            responded = True
+            return Bc3ClasificacionResultado.model_validate(parsed)
+        except Exception as exc:
+            error = exc
+            logger.exception(
+                "Fallo en clasificación BC3 con LLM. Se aplicará fallback local. error=%s",
+                exc,
+            )
+            return Bc3ClasificacionResultado(resultados=[])
+        finally:
+            plan.llm_gate.release(responded=responded, error=error)
+            for reported in usage:
+                plan.usage_tally.add(reported)
+
+    async def _call_llm_async(
+        self,
+        *,
+        plan: _RunPlan,
+        call: _LlmCallInput,
+        usage: List[LlmUsage],
+    ) -> Bc3ClasificacionResultado:
+        allowed, timeout_s = plan.llm_gate.acquire()
+        if not allowed:
+            return Bc3ClasificacionResultado(resultados=[])
+
+        responded = False
+        error: Exception | None = None
+        try:
+            parsed, _schema_name = await self._extractor.extract_async(
+                prompt_key=plan.req.prompt_key,
+                payload=call.payload,
+                prompt_cache_key=call.prompt_cache_key,
+                prompt_cache_retention=call.prompt_cache_retention,
+                usage_sink=usage.append,
+                context_text=call.context_text,
+                timeout_s=timeout_s,
+            )
+            responded = True
+            return Bc3ClasificacionResultado.model_validate(parsed)
+        except Exception as exc:
+            error = exc
+            logger.exception(
+                "Fallo en clasificación BC3 con LLM. Se aplicará fallback local. error=%s",
+                exc,
+            )
+            return Bc3ClasificacionResultado(resultados=[])
+        finally:
+            plan.llm_gate.release(responded=responded, error=error)
+            for reported in usage:
+                plan.usage_tally.add(reported)
+
+    def _log_batch_start(self, *, plan: _RunPlan, batch_index: int) -> None:
+        batch = plan.batches[batch_index - 1].items
+        logger.info(
+            "BC3 lote %s/%s. items=%s ids=%s",
+            batch_index,
+            plan.total_batches,
+            len(batch),
+            [item.id for item in batch],
+        )
+
+    def _classify_batch_with_llm(
+        self,
+        *,
+        plan: _RunPlan,
+        batch_index: int,
+    ) -> Bc3ClasificacionResultado:
+        """
+        Llamada al LLM de un lote; se ejecuta en el pool de hilos. Cualquier
+        fallo devuelve un resultado vacío para que la reparación aplique el
+        fallback local del lote, igual que en la versión secuencial.
+        """
+        batch = plan.batches[batch_index - 1].items
+        self._log_batch_start(plan=plan, batch_index=batch_index)
+        usage: List[LlmUsage] = []
+        call = self._prepare_llm_call(plan=plan, items=batch)
+        result = self._call_llm(plan=plan, call=call, usage=usage)
+        self._log_batch_tokens(
+            plan=plan,
+            batch_index=batch_index,
+            call=call,
+            usage=usage,
+        )
+
+        failed = self._failed_llm_items(items=batch, parsed=result, bundle=plan.bundle)
+        for retry_round in range(1, _MAX_RETRY_ROUNDS_PER_BATCH + 1):
+            if not failed or plan.llm_gate.blocked():
+                break
+            if not plan.retry_budget.try_acquire():
+                break
+            self._log_retry(
+                plan=plan,
+                batch_index=batch_index,
+                retry_round=retry_round,
+                failed=failed,
+            )
+            retry = self._call_llm(
+                plan=plan,
+                call=self._prepare_llm_call(plan=plan, items=failed),
+                usage=[],
+            )
+            result, failed = self._merge_retry(
+                plan=plan,
+                parsed=result,
+                retry=retry,
+                retried=failed,
+            )
+        return result
+
+    async def _classify_batch_with_llm_async(
+        self,
+        *,
+        plan: _RunPlan,
+        batch_index: int,
+    ) -> Bc3ClasificacionResultado:
+        batch = plan.batches[batch_index - 1].items
+        self._log_batch_start(plan=plan, batch_index=batch_index)
+        usage: List[LlmUsage] = []
+        call = self._prepare_llm_call(plan=plan, items=batch)
+        result = await self._call_llm_async(plan=plan, call=call, usage=usage)
+        self._log_batch_tokens(
+            plan=plan,
+            batch_index=batch_index,
+            call=call,
+            usage=usage,
+        )
 
-            self._log_model_confidence_distribution(
+        failed = self._failed_llm_items(items=batch, parsed=result, bundle=plan.bundle)
+        for retry_round in range(1, _MAX_RETRY_ROUNDS_PER_BATCH + 1):
+            if not failed or plan.llm_gate.blocked():
+                break
+            if not plan.retry_budget.try_acquire():
+                break
+            self._log_retry(
+                plan=plan,
                 batch_index=batch_index,
-                total_batches=total_batches,
-                parsed=parsed_result,
+                retry_round=retry_round,
+                failed=failed,
+            )
+            retry = await self._call_llm_async(
+                plan=plan,
+                call=self._prepare_llm_call(plan=plan, items=failed),
+                usage=[],
+            )
+            result, failed = self._merge_retry(
+                plan=plan,
+                parsed=result,
+                retry=retry,
+                retried=failed,
+            )
+        return result
+
+    def _failed_llm_items(
+        self,
+        *,
+        items: Sequence[Bc3DescompuestoInput],
+        parsed: Bc3ClasificacionResultado,
+        bundle: CompactCatalogBundle,
+    ) -> List[Bc3DescompuestoInput]:
+        """
+        Items que la reparación tendría que resolver por fallback: id ausente
+        en la respuesta o código que no existe en el catálogo.
+        """
+        result_by_id = {item.id: item for item in parsed.resultados}
+        failed: List[Bc3DescompuestoInput] = []
+        for item in items:
+            current = result_by_id.get(item.id)
+            if current is None or not self._normalize_code(current.codigo_interno, bundle):
+                failed.append(item)
+        return failed
+
+    def _merge_retry(
+        self,
+        *,
+        plan: _RunPlan,
+        parsed: Bc3ClasificacionResultado,
+        retry: Bc3ClasificacionResultado,
+        retried: Sequence[Bc3DescompuestoInput],
+    ) -> tuple[Bc3ClasificacionResultado, List[Bc3DescompuestoInput]]:
+        retried_ids = {item.id for item in retried}
+        still_failed = self._failed_llm_items(
+            items=retried,
+            parsed=retry,
+            bundle=plan.bundle,
+        )
+        still_failed_ids = {item.id for item in still_failed}
+
+        # Se conserva la respuesta original salvo para los ids que el
+        # reintento sí resolvió.
+        recovered = [
+            item
+            for item in retry.resultados
+            if item.id in retried_ids and item.id not in still_failed_ids
+        ]
+        recovered_ids = {item.id for item in recovered}
+        merged = [
+            item for item in parsed.resultados if item.id not in recovered_ids
+        ]
+        merged.extend(recovered)
+
+        plan.retry_budget.record_recovered(len(recovered_ids))
+        return Bc3ClasificacionResultado(resultados=merged), still_failed
+
+    @staticmethod
+    def _log_retry(
+        *,
+        plan: _RunPlan,
+        batch_index: int,
+        retry_round: int,
+        failed: Sequence[Bc3DescompuestoInput],
+    ) -> None:
+        logger.warning(
+            "BC3 lote %s/%s: reintento %s solo con los items fallidos. items=%s ids=%s",
+            batch_index,
+            plan.total_batches,
+            retry_round,
+            len(failed),
+            [item.id for item in failed],
+        )
+
+    def _log_batch_tokens(
+        self,
+        *,
+        plan: _RunPlan,
+        batch_index: int,
+        call: _LlmCallInput,
+        usage: Sequence[LlmUsage],
+    ) -> None:
+        batch = plan.batches[batch_index - 1]
+        planned_input = plan.prefix_tokens + batch.input_tokens
+        if self._prompt_layout in _SLICE_LAYOUTS:
+            planned_input += self._batch_planner.estimate_tokens(call.context_text)
+        if not usage:
+            logger.info(
+                "BC3 lote %s/%s tokens. estimados_entrada=%s estimados_salida=%s (la API no reportó uso)",
+                batch_index,
+                plan.total_batches,
+                planned_input,
+                batch.output_tokens,
             )
+            return
+
+        actual = usage[-1]
+        logger.info(
+            "BC3 lote %s/%s tokens. estimados_entrada=%s reales_entrada=%s estimados_salida=%s reales_salida=%s cacheados=%s",
+            batch_index,
+            plan.total_batches,
+            planned_input,
+            actual.input_tokens,
+            batch.output_tokens,
+            actual.output_tokens,
+            actual.cached_input_tokens,
+        )
+
+    def _finish_batch(
+        self,
+        *,
+        plan: _RunPlan,
+        batch_index: int,
+        parsed: Bc3ClasificacionResultado,
+    ) -> List[Bc3ClasificacionItem]:
+        batch = plan.batches[batch_index - 1].items
+        start = plan.batch_starts[batch_index - 1]
+        batch_positions = plan.pending_positions[start:start + len(batch)]
+        ids = [item.id for item in batch]
+        total_batches = plan.total_batches
+
+        self._log_model_confidence_distribution(
+            batch_index=batch_index,
+            total_batches=total_batches,
+            parsed=parsed,
+        )
+
+        batch_rankings = None
+        if plan.rankings is not None:
+            batch_rankings = [plan.rankings[position] for position in batch_positions]
 
-            repaired = self._repair_batch_results(
+        repaired = self._repair_batch_results(
+            batch=batch,
+            parsed=parsed,
+            bundle=plan.bundle,
+            catalog_index=plan.catalog_index,
+            rankings=batch_rankings,
+        )
+
+        if self._result_cache is not None:
+            self._store_llm_results(
                 batch=batch,
-                parsed=parsed_result,
-                bundle=bundle,
-                catalog_items=catalog_items,
-            )
-            aggregated.extend(repaired.items)
-
-            if repaired.fallback_count == len(batch):
-                logger.error(
-                    "BC3 lote %s/%s: TODOS los items salieron por fallback local. "
-                    "Esto suele indicar fallo del LLM, ids devueltos incorrectos o códigos fuera del catálogo. "
-                    "matched_llm=%s zero_model_conf=%s ids=%s",
-                    batch_index,
-                    total_batches,
-                    repaired.matched_llm_count,
-                    repaired.zero_model_conf_count,
-                    ids,
+                cache_keys=[plan.cache_keys[position] for position in batch_positions],
+                parsed=parsed,
+                bundle=plan.bundle,
+            )
+
+        if plan.journal is not None:
+            self._journal_batch(
+                plan=plan,
+                batch_index=batch_index,
+                positions=batch_positions,
+                items=repaired.items,
+            )
+
+        if repaired.fallback_count == len(batch):
+            logger.error(
+                "BC3 lote %s/%s: TODOS los items salieron por fallback local. "
+                "Esto suele indicar fallo del LLM, ids devueltos incorrectos o códigos fuera del catálogo. "
+                "matched_llm=%s zero_model_conf=%s ids=%s",
+                batch_index,
+                total_batches,
+                repaired.matched_llm_count,
+                repaired.zero_model_conf_count,
+                ids,
+            )
+        elif repaired.fallback_count > 0:
+            logger.warning(
+                "BC3 lote %s/%s: fallback parcial. fallback_count=%s/%s matched_llm=%s zero_model_conf=%s ids=%s",
+                batch_index,
+                total_batches,
+                repaired.fallback_count,
+                len(batch),
+                repaired.matched_llm_count,
+                repaired.zero_model_conf_count,
+                ids,
+            )
+        else:
+            logger.info(
+                "BC3 lote %s/%s resuelto sin fallback. matched_llm=%s zero_model_conf=%s",
+                batch_index,
+                total_batches,
+                repaired.matched_llm_count,
+                repaired.zero_model_conf_count,
+            )
+
+        return repaired.items
+
+    def _emit_resolved(
+        self,
+        *,
+        plan: _RunPlan,
+        paths: Counter[str],
+    ) -> Iterator[tuple[int, Bc3ClasificacionItem]]:
+        resolved = {**plan.journal_items, **plan.cached_items, **plan.fast_path_items}
+        for position in sorted(resolved):
+            yield from self._emit(
+                plan=plan,
+                position=position,
+                item=resolved[position],
+                paths=paths,
+            )
+
+    def _emit_batch(
+        self,
+        *,
+        plan: _RunPlan,
+        batch_index: int,
+        items: List[Bc3ClasificacionItem],
+        paths: Counter[str],
+    ) -> Iterator[tuple[int, Bc3ClasificacionItem]]:
+        start = plan.batch_starts[batch_index - 1]
+        positions = plan.pending_positions[start:start + len(items)]
+        for position, item in zip(positions, items):
+            yield from self._emit(
+                plan=plan,
+                position=position,
+                item=item,
+                paths=paths,
+            )
+
+    @staticmethod
+    def _emit(
+        *,
+        plan: _RunPlan,
+        position: int,
+        item: Bc3ClasificacionItem,
+        paths: Counter[str],
+    ) -> Iterator[tuple[int, Bc3ClasificacionItem]]:
+        """
+        Traduce la posición del request deduplicado a las del original: el
+        representante sale tal cual y cada duplicado como copia con su id.
+        """
+        paths[_resolution_path(item)] += 1
+
+        dedup_plan = plan.dedup_plan
+        if dedup_plan is None:
+            yield position, item
+            return
+
+        representative = dedup_plan.unique[position]
+        for original_position in dedup_plan.original_positions[position]:
+            original = dedup_plan.originals[original_position]
+            if original is representative:
+                yield original_position, item
+                continue
+            yield original_position, item.model_copy(
+                update={
+                    "id": original.id,
+                    "codigo_bc3": original.codigo_bc3,
+                    "descripcion_entrada": original.descripcion,
+                }
+            )
+
+    def _log_run_summary(self, *, plan: _RunPlan, paths: Counter[str]) -> None:
+        logger.info(
+            "BC3 rutas de resolución. result_cache=%s selector_fast_path=%s llm=%s fallback_local=%s total=%s",
+            paths[_RESULT_CACHE_SOURCE],
+            paths[_FAST_PATH_SOURCE],
+            paths["llm"],
+            paths["fallback"],
+            sum(paths.values()),
+        )
+        tally = plan.usage_tally
+        if tally.calls:
+            logger.info(
+                "BC3 uso de tokens. layout=%s llamadas=%s entrada=%s cacheados=%s acierto_cache=%.1f%% salida=%s",
+                self._prompt_layout,
+                tally.calls,
+                tally.input_tokens,
+                tally.cached_input_tokens,
+                100.0 * tally.cached_input_tokens / max(tally.input_tokens, 1),
+                tally.output_tokens,
+            )
+        gate = plan.llm_gate
+        if gate.skipped_circuit_open or gate.skipped_deadline:
+            logger.warning(
+                "BC3 llamadas LLM omitidas (fallback local). circuito_abierto=%s plazo_agotado=%s",
+                gate.skipped_circuit_open,
+                gate.skipped_deadline,
+            )
+        if plan.retry_budget.limit:
+            logger.info(
+                "BC3 reintentos LLM. usados=%s presupuesto=%s items_recuperados=%s",
+                plan.retry_budget.used,
+                plan.retry_budget.limit,
+                plan.retry_budget.recovered,
+            )
+
+        if plan.journal_items:
+            logger.info(
+                "BC3 trabajo reanudado desde el diario. items_recuperados=%s",
+                len(plan.journal_items),
+            )
+
+        if self._result_cache is not None:
+            self._log_result_cache_usage(
+                req=plan.req,
+                bundle=plan.bundle,
+                cached_positions=sorted(plan.cached_items),
+                pending_count=len(plan.pending_positions),
+            )
+
+    def _result_cache_key(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        bundle: CompactCatalogBundle,
+        item: Bc3DescompuestoInput,
+    ) -> str:
+        raw = json.dumps(
+            [
+                self._extractor.model,
+                req.prompt_key,
+                bundle.prompt_cache_key,
+                *self._dedup_key(item),
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _journal_key(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        bundle: CompactCatalogBundle,
+    ) -> str:
+        raw = json.dumps(
+            [
+                self._extractor.model,
+                self._prompt_layout,
+                self._dedup_enabled,
+                bundle.prompt_cache_key,
+                req.model_dump(mode="json", exclude={"deadline_s"}),
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _load_journal(
+        *,
+        journal: Bc3JobJournal,
+        journal_key: str,
+        req: Bc3ClassificationRequest,
+    ) -> Dict[int, Bc3ClasificacionItem]:
+        try:
+            loaded = journal.load(journal_key)
+        except Exception as exc:
+            logger.warning(
+                "No se pudo leer el diario BC3; el trabajo empieza de cero. error=%s",
+                exc,
+            )
+            return {}
+
+        # Solo posiciones que siguen casando con el request (mismo id).
+        return {
+            position: item
+            for position, item in loaded.items()
+            if 0 <= position < len(req.descompuestos)
+            and item.id == req.descompuestos[position].id
+        }
+
+    @staticmethod
+    def _journal_batch(
+        *,
+        plan: _RunPlan,
+        batch_index: int,
+        positions: Sequence[int],
+        items: Sequence[Bc3ClasificacionItem],
+    ) -> None:
+        # Los items resueltos por fallback no se anotan: al reanudar se
+        # vuelven a intentar con el LLM.
+        to_record = {
+            position: item
+            for position, item in zip(positions, items)
+            if _resolution_path(item) != "fallback"
+        }
+        if not to_record:
+            return
+        try:
+            plan.journal.append(plan.journal_key, batch_index, to_record)
+        except Exception as exc:
+            logger.warning(
+                "No se pudo anotar el lote BC3 en el diario. lote=%s error=%s",
+                batch_index,
+                exc,
+            )
+
+    @staticmethod
+    def _complete_journal(plan: _RunPlan) -> None:
+        if plan.journal is None:
+            return
+        try:
+            plan.journal.complete(plan.journal_key)
+        except Exception as exc:
+            logger.warning("No se pudo cerrar el diario BC3. error=%s", exc)
+
+    def _resolve_cached_results(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        bundle: CompactCatalogBundle,
+        catalog_index: CatalogFeatureIndex,
+        cache_keys: List[str],
+        rankings: Sequence[List[Bc3PromptCandidate]] | None,
+    ) -> Dict[int, Bc3ClasificacionItem]:
+        """
+        Las respuestas cacheadas del LLM pasan por la misma reparación que
+        las nuevas (ranking, confianza del selector, datos de catálogo); solo
+        cambia `confidence_source`.
+        """
+        try:
+            hits = self._result_cache.get_many(cache_keys)
+        except Exception as exc:
+            logger.warning(
+                "No se pudo consultar la cache de resultados BC3; se clasifica todo con LLM. error=%s",
+                exc,
+            )
+            return {}
+
+        positions = [
+            position
+            for position, key in enumerate(cache_keys)
+            if key in hits
+        ]
+        if not positions:
+            return {}
+
+        batch = [req.descompuestos[position] for position in positions]
+        parsed = Bc3ClasificacionResultado(
+            resultados=[
+                hits[cache_keys[position]].model_copy(
+                    update={"id": req.descompuestos[position].id}
                 )
-            elif repaired.fallback_count > 0:
-                logger.warning(
-                    "BC3 lote %s/%s: fallback parcial. fallback_count=%s/%s matched_llm=%s zero_model_conf=%s ids=%s",
-                    batch_index,
-                    total_batches,
-                    repaired.fallback_count,
-                    len(batch),
-                    repaired.matched_llm_count,
-                    repaired.zero_model_conf_count,
-                    ids,
+                for position in positions
+            ]
+        )
+        repaired = self._repair_batch_results(
+            batch=batch,
+            parsed=parsed,
+            bundle=bundle,
+            catalog_index=catalog_index,
+            rankings=(
+                [rankings[position] for position in positions]
+                if rankings is not None
+                else None
+            ),
+        )
+
+        cached: Dict[int, Bc3ClasificacionItem] = {}
+        for position, item in zip(positions, repaired.items):
+            if item.confidence_source != "fallback_selector":
+                item = item.model_copy(
+                    update={"confidence_source": _RESULT_CACHE_SOURCE}
+                )
+            cached[position] = item
+        return cached
+
+    def _resolve_fast_path(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        bundle: CompactCatalogBundle,
+        catalog_index: CatalogFeatureIndex,
+        rankings: Sequence[List[Bc3PromptCandidate]] | None,
+        skip: Dict[int, Bc3ClasificacionItem],
+    ) -> Dict[int, Bc3ClasificacionItem]:
+        """
+        Resuelve en local los descompuestos cuyo top-1 del selector es claro
+        (confianza y margen sobre el segundo por encima de los umbrales);
+        solo el resto viaja al LLM.
+        """
+        resolved: Dict[int, Bc3ClasificacionItem] = {}
+        for position, descompuesto in enumerate(req.descompuestos):
+            if position in skip:
+                continue
+
+            if rankings is not None:
+                ranking = FocusedRanking.from_candidates(
+                    rankings[position],
+                    focus_code=None,
                 )
             else:
-                logger.info(
-                    "BC3 lote %s/%s resuelto sin fallback. matched_llm=%s zero_model_conf=%s",
-                    batch_index,
-                    total_batches,
-                    repaired.matched_llm_count,
-                    repaired.zero_model_conf_count,
+                ranking = self._selector_ranking_for_descompuesto(
+                    descompuesto=descompuesto,
+                    catalog_index=catalog_index,
+                    focus_code=None,
+                )
+            if not ranking.top:
+                continue
+
+            top1 = ranking.top[0]
+            entry = bundle.entries_by_code.get(top1.codigo)
+            if entry is None:
+                continue
+
+            selector_conf = self._selector_confidence_for_code(
+                code=top1.codigo,
+                ranking=ranking,
+            )
+            if (
+                selector_conf < self._fast_path_min_confidence
+                or self._selector_margin(ranking) < self._fast_path_min_margin
+            ):
+                continue
+
+            resolved[position] = Bc3ClasificacionItem(
+                id=descompuesto.id,
+                codigo_bc3=descompuesto.codigo_bc3,
+                descripcion_entrada=descompuesto.descripcion,
+                tipo=self._normalize_tipo(
+                    raw_tipo=None,
+                    entry_type_code=entry.type_code,
+                ),
+                codigo_interno=top1.codigo,
+                confianza_pct=round(selector_conf, 2),
+                descripcion_catalogo=entry.description,
+                familia_catalogo=entry.family_name,
+                grupo_catalogo=entry.group_name or entry.type_name,
+                confidence_source=_FAST_PATH_SOURCE,
+                selector_rank=1,
+                selector_score=round(float(top1.score or 0.0), 4),
+            )
+
+        logger.info(
+            "BC3 fast path del selector. resueltos_en_local=%s de %s min_confianza=%s min_margen=%s",
+            len(resolved),
+            len(req.descompuestos) - len(skip),
+            self._fast_path_min_confidence,
+            self._fast_path_min_margin,
+        )
+        return resolved
+
+    def _store_llm_results(
+        self,
+        *,
+        batch: List[Bc3DescompuestoInput],
+        cache_keys: List[str],
+        parsed: Bc3ClasificacionResultado,
+        bundle: CompactCatalogBundle,
+    ) -> None:
+        result_by_id = {item.id: item for item in parsed.resultados}
+        to_store: Dict[str, Bc3ClasificacionItem] = {}
+        for descompuesto, key in zip(batch, cache_keys):
+            current = result_by_id.get(descompuesto.id)
+            if current is None:
+                continue
+            code = self._normalize_code(current.codigo_interno, bundle)
+            if not code:
+                continue
+            to_store[key] = current.model_copy(update={"codigo_interno": code})
+
+        if not to_store:
+            return
+        try:
+            self._result_cache.put_many(to_store)
+        except Exception as exc:
+            logger.warning(
+                "No se pudieron guardar resultados en la cache BC3. items=%s error=%s",
+                len(to_store),
+                exc,
+            )
+
+    def _log_result_cache_usage(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        bundle: CompactCatalogBundle,
+        cached_positions: List[int],
+        pending_count: int,
+    ) -> None:
+        batch_size = max(1, int(req.llm_batch_size or 1))
+        total = len(req.descompuestos)
+        calls_without_cache = (total + batch_size - 1) // batch_size
+        calls_with_cache = (pending_count + batch_size - 1) // batch_size
+        calls_saved = calls_without_cache - calls_with_cache
+
+        # Estimación gruesa (~4 caracteres por token): catálogo por cada
+        # llamada evitada más el JSON compacto de cada item servido de cache.
+        saved_chars = calls_saved * len(bundle.prompt_text) + sum(
+            len(
+                json.dumps(
+                    self._to_compact_input(req.descompuestos[position]),
+                    ensure_ascii=False,
                 )
+            )
+            for position in cached_positions
+        )
 
-        return Bc3ClasificacionResultado(resultados=aggregated)
+        stats = self._result_cache.stats()
+        logger.info(
+            "BC3 cache de resultados. hits=%s misses=%s llamadas_llm_evitadas=%s "
+            "tokens_entrada_ahorrados_aprox=%s acumulado_hits=%s acumulado_misses=%s entradas=%s bytes=%s",
+            len(cached_positions),
+            pending_count,
+            calls_saved,
+            saved_chars // 4,
+            stats.hits,
+            stats.misses,
+            stats.entries,
+            stats.size_bytes,
+        )
 
     @staticmethod
-    def _chunk(
-        items: Sequence[Bc3DescompuestoInput],
-        chunk_size: int,
-    ) -> Iterable[List[Bc3DescompuestoInput]]:
-        size = max(1, int(chunk_size))
-        for start in range(0, len(items), size):
-            yield list(items[start:start + size])
+    def _dedup_key(item: Bc3DescompuestoInput) -> tuple[str, str, str]:
+        return (
+            normalize_text(item.descripcion),
+            normalize_text(item.unidad or ""),
+            normalize_text(item.partida or ""),
+        )
+
+    def _plan_dedup(self, items: Sequence[Bc3DescompuestoInput]) -> _DedupPlan:
+        """
+        Agrupa descompuestos con la misma descripción/unidad/partida
+        normalizadas; cada grupo se clasifica una vez con su primera
+        aparición como representante.
+        """
+        position_by_key: dict[tuple[str, str, str], int] = {}
+        unique: List[Bc3DescompuestoInput] = []
+        unique_position: List[int] = []
+        original_positions: List[List[int]] = []
+        for original_position, item in enumerate(items):
+            key = self._dedup_key(item)
+            position = position_by_key.get(key)
+            if position is None:
+                position = len(unique)
+                position_by_key[key] = position
+                unique.append(item)
+                original_positions.append([])
+            unique_position.append(position)
+            original_positions[position].append(original_position)
+
+        total = len(items)
+        logger.info(
+            "BC3 dedup de descompuestos. total=%s unicos=%s duplicados=%s ratio=%.2f",
+            total,
+            len(unique),
+            total - len(unique),
+            (total / len(unique)) if unique else 1.0,
+        )
+        return _DedupPlan(
+            originals=list(items),
+            unique=unique,
+            unique_position=unique_position,
+            original_positions=original_positions,
+        )
 
     @staticmethod
     def _to_compact_input(item: Bc3DescompuestoInput) -> dict:
@@ -255,7 +1827,8 @@ class Bc3ClassificationPipeline:
         batch: List[Bc3DescompuestoInput],
         parsed: Bc3ClasificacionResultado,
         bundle: CompactCatalogBundle,
-        catalog_items: List[Bc3CatalogoItem],
+        catalog_index: CatalogFeatureIndex,
+        rankings: Sequence[List[Bc3PromptCandidate]] | None = None,
     ) -> _RepairResult:
         result_by_id = {item.id: item for item in parsed.resultados}
         fixed: List[Bc3ClasificacionItem] = []
@@ -263,23 +1836,30 @@ class Bc3ClassificationPipeline:
         zero_model_conf_count = 0
         matched_llm_count = 0
 
-        for descompuesto in batch:
+        for position, descompuesto in enumerate(batch):
             current = result_by_id.get(descompuesto.id)
             if current is not None:
                 matched_llm_count += 1
 
-            ranking = self._selector_ranking_for_descompuesto(
-                descompuesto=descompuesto,
-                catalog_items=catalog_items,
-            )
-            ranking_map = {cand.codigo: cand for cand in ranking}
-            ranking_pos = {cand.codigo: idx + 1 for idx, cand in enumerate(ranking)}
-
             normalized_code = self._normalize_code(
                 current.codigo_interno if current else None,
                 bundle,
             )
 
+            if rankings is not None:
+                # Sin puntuar el código del LLM: si queda fuera del top se
+                # recalcula abajo con foco.
+                ranking = FocusedRanking.from_candidates(
+                    rankings[position],
+                    focus_code=None,
+                )
+            else:
+                ranking = self._selector_ranking_for_descompuesto(
+                    descompuesto=descompuesto,
+                    catalog_index=catalog_index,
+                    focus_code=normalized_code,
+                )
+
             fallback_selection: _FallbackSelection | None = None
             final_code = normalized_code
             if not final_code:
@@ -306,6 +1886,13 @@ class Bc3ClassificationPipeline:
                     )
                     fallback_count += 1
 
+            if not ranking.covers(final_code):
+                ranking = self._selector_ranking_for_descompuesto(
+                    descompuesto=descompuesto,
+                    catalog_index=catalog_index,
+                    focus_code=final_code,
+                )
+
             raw_conf = current.confianza_pct if current else None
             model_conf = self._coerce_raw_confidence(raw_conf)
             if model_conf <= 0.0:
@@ -319,8 +1906,6 @@ class Bc3ClassificationPipeline:
             selector_conf = self._selector_confidence_for_code(
                 code=final_code,
                 ranking=ranking,
-                ranking_map=ranking_map,
-                ranking_pos=ranking_pos,
             )
             confidence_info = self._resolve_confidence(
                 model_conf_pct=model_conf,
@@ -328,9 +1913,9 @@ class Bc3ClassificationPipeline:
                 used_fallback=fallback_selection is not None,
             )
 
-            rank_value = ranking_pos.get(final_code)
+            rank_value = ranking.rank_of(final_code)
             score_value = None
-            candidate = ranking_map.get(final_code)
+            candidate = ranking.candidate_for(final_code)
             if candidate is not None:
                 score_value = float(candidate.score or 0.0)
 
@@ -359,17 +1944,93 @@ class Bc3ClassificationPipeline:
             matched_llm_count=matched_llm_count,
         )
 
+    def _precompute_rankings(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        catalog_index: CatalogFeatureIndex,
+    ) -> List[List[Bc3PromptCandidate]] | None:
+        """
+        Con el motor "vectorized" se rankea todo el request de una vez
+        (top_k_candidates por item) en lugar de un descompuesto cada vez.
+        """
+        if self._selector_engine != "vectorized":
+            return None
+
+        try:
+            rankings = self._selector.select_many(
+                descompuestos=req.descompuestos,
+                index=catalog_index,
+                top_k=req.top_k_candidates,
+            )
+        except Exception as exc:
+            logger.warning(
+                "No se pudo calcular el ranking vectorizado del request; "
+                "se rankeará por item. error=%s",
+                exc,
+            )
+            return None
+
+        logger.info(
+            "BC3 ranking vectorizado precalculado. descompuestos=%s top_k=%s",
+            len(rankings),
+            req.top_k_candidates,
+        )
+        return rankings
+
+    def _rank_descompuestos(
+        self,
+        *,
+        req: Bc3ClassificationRequest,
+        catalog_index: CatalogFeatureIndex,
+        skip: Dict[int, Bc3ClasificacionItem],
+    ) -> List[List[Bc3PromptCandidate]]:
+        """
+        Top `top_k_candidates` del motor "scalar" para cada descompuesto no
+        resuelto, con la misma forma que el ranking vectorizado. Las
+        posiciones de `skip` quedan vacías.
+        """
+        top_k = max(req.top_k_candidates, _SELECTOR_RANKING_HEAD)
+        rankings: List[List[Bc3PromptCandidate]] = []
+        for position, descompuesto in enumerate(req.descompuestos):
+            if position in skip:
+                rankings.append([])
+                continue
+            try:
+                rankings.append(
+                    self._selector.select(
+                        descompuesto=descompuesto,
+                        index=catalog_index,
+                        top_k=top_k,
+                    )
+                )
+            except Exception as exc:
+                logger.warning(
+                    "No se pudo calcular ranking local para id=%s codigo_bc3=%s: %s",
+                    descompuesto.id,
+                    descompuesto.codigo_bc3,
+                    exc,
+                )
+                rankings.append([])
+        return rankings
+
     def _selector_ranking_for_descompuesto(
         self,
         *,
         descompuesto: Bc3DescompuestoInput,
-        catalog_items: List[Bc3CatalogoItem],
-    ) -> List[Bc3PromptCandidate]:
+        catalog_index: CatalogFeatureIndex,
+        focus_code: str | None,
+    ) -> FocusedRanking:
+        """
+        Solo se materializan la cabeza del ranking (top1/top2 para la
+        confianza y el fallback) y el código elegido, no el catálogo entero.
+        """
         try:
-            return self._selector.select(
+            return self._selector.select_focused(
                 descompuesto=descompuesto,
-                catalogo=catalog_items,
-                top_k=len(catalog_items),
+                index=catalog_index,
+                focus_code=focus_code,
+                top_n=_SELECTOR_RANKING_HEAD,
             )
         except Exception as exc:
             logger.warning(
@@ -378,7 +2039,7 @@ class Bc3ClassificationPipeline:
                 descompuesto.codigo_bc3,
                 exc,
             )
-            return []
+            return FocusedRanking(top=(), focus_code=focus_code)
 
     @staticmethod
     def _normalize_code(raw_code: str | None, bundle: CompactCatalogBundle) -> str | None:
@@ -423,21 +2084,19 @@ class Bc3ClassificationPipeline:
         self,
         *,
         code: str,
-        ranking: List[Bc3PromptCandidate],
-        ranking_map: Dict[str, Bc3PromptCandidate],
-        ranking_pos: Dict[str, int],
+        ranking: FocusedRanking,
     ) -> float:
-        if not ranking:
+        top = ranking.top
+        if not top:
             return 10.0
 
-        top1_score = max(0.0, float(ranking[0].score or 0.0))
-        top2_score = max(0.0, float(ranking[1].score or 0.0)) if len(ranking) > 1 else 0.0
+        top1_score = max(0.0, float(top[0].score or 0.0))
 
-        candidate = ranking_map.get(code)
+        candidate = ranking.candidate_for(code)
         if candidate is None:
             return 8.0
 
-        rank = ranking_pos.get(code, len(ranking) + 1)
+        rank = ranking.rank_of(code) or len(top) + 1
         chosen_score = max(0.0, float(candidate.score or 0.0))
 
         if top1_score <= 0.0 and chosen_score <= 0.0:
@@ -447,8 +2106,7 @@ class Bc3ClassificationPipeline:
         conf = 18.0 + rel * 52.0
 
         if rank == 1:
-            gap_ratio = max(0.0, (top1_score - top2_score) / max(top1_score, 1.0))
-            conf += min(20.0, gap_ratio * 30.0)
+            conf += min(20.0, self._selector_margin(ranking) * 30.0)
         else:
             conf -= min(35.0, (rank - 1) * 4.5)
 
@@ -464,6 +2122,23 @@ class Bc3ClassificationPipeline:
 
         return max(8.0, min(95.0, conf))
 
+    @staticmethod
+    def _selector_margin(ranking: FocusedRanking) -> float:
+        """
+        Ventaja relativa del top-1 sobre el segundo candidato del ranking.
+        """
+        top = ranking.top
+        if not top:
+            return 0.0
+
+        top1_score = max(0.0, float(top[0].score or 0.0))
+        top2_score = (
+            max(0.0, float(top[1].score or 0.0))
+            if len(top) > 1
+            else 0.0
+        )
+        return max(0.0, (top1_score - top2_score) / max(top1_score, 1.0))
+
     def _resolve_confidence(
         self,
         *,
@@ -529,17 +2204,15 @@ class Bc3ClassificationPipeline:
         *,
         descompuesto: Bc3DescompuestoInput,
         bundle: CompactCatalogBundle,
-        ranking: List[Bc3PromptCandidate],
+        ranking: FocusedRanking,
     ) -> _FallbackSelection:
-        if ranking:
-            top1 = ranking[0]
+        if ranking.top:
+            top1 = ranking.top[0]
             return _FallbackSelection(
                 code=top1.codigo,
                 confidence_pct=self._selector_confidence_for_code(
                     code=top1.codigo,
                     ranking=ranking,
-                    ranking_map={cand.codigo: cand for cand in ranking},
-                    ranking_pos={cand.codigo: idx + 1 for idx, cand in enumerate(ranking)},
                 ),
                 source="local_selector",
                 rank=1,
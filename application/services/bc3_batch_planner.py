@@ -0,0 +1,134 @@
+# application/services/bc3_batch_planner.py
+from __future__ import annotations
+
+import json
+import logging
+import math
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from domain.models.bc3_classification_models import (
+    Bc3ClasificacionCompactaItem,
+    Bc3ClasificacionItem,
+    Bc3DescompuestoInput,
+)
+
+logger = logging.getLogger(__name__)
+
+# Caracteres por token para JSON en español con el tokenizador de OpenAI;
+# algo conservador para no quedarse corto con tildes y códigos.
+_DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Con salida estructurada estricta el modelo emite todos los campos del
+# item (los opcionales como null), así que se estima con un item completo.
+_OUTPUT_ITEM_TEMPLATE_CHARS = len(
+    Bc3ClasificacionItem(
+        id="",
+        tipo="SUMINISTRO_CON_MONTAJE",
+        codigo_interno="XX000000",
+        confianza_pct=100.0,
+    ).model_dump_json()
+) + 1
+_COMPACT_OUTPUT_ITEM_TEMPLATE_CHARS = len(
+    Bc3ClasificacionCompactaItem(i="", c="XX000000", t="A", p=100.0).model_dump_json()
+) + 1
+
+
+@dataclass(frozen=True)
+class Bc3PlannedBatch:
+    items: List[Bc3DescompuestoInput]
+    input_tokens: int
+    output_tokens: int
+
+
+class Bc3BatchPlanner:
+    """
+    Agrupa descompuestos en lotes por presupuesto de tokens estimado en
+    local (sin red): `max_input_tokens` para el lote de descompuestos (el
+    prefijo del catálogo es fijo por llamada y no cuenta) y
+    `max_output_tokens` para la respuesta estructurada (esquema compacto o
+    completo según `compact_output`). El nº máximo de
+    items por lote sigue siendo un límite superior. Un presupuesto <= 0
+    desactiva ese límite.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_input_tokens: int = 3000,
+        max_output_tokens: int = 1500,
+        chars_per_token: float = _DEFAULT_CHARS_PER_TOKEN,
+        compact_output: bool = True,
+    ) -> None:
+        self._max_input_tokens = int(max_input_tokens)
+        self._max_output_tokens = int(max_output_tokens)
+        self._chars_per_token = max(0.5, float(chars_per_token))
+        self._output_item_chars = (
+            _COMPACT_OUTPUT_ITEM_TEMPLATE_CHARS
+            if compact_output
+            else _OUTPUT_ITEM_TEMPLATE_CHARS
+        )
+
+    def estimate_tokens(self, text: str) -> int:
+        return int(math.ceil(len(text) / self._chars_per_token))
+
+    def estimate_input_tokens(self, compact_item: dict) -> int:
+        raw = json.dumps(compact_item, ensure_ascii=False, separators=(",", ":"))
+        return self.estimate_tokens(raw) + 1
+
+    def estimate_output_tokens(self, item: Bc3DescompuestoInput) -> int:
+        return int(
+            math.ceil(
+                (self._output_item_chars + len(item.id)) / self._chars_per_token
+            )
+        )
+
+    def plan(
+        self,
+        items: Sequence[Bc3DescompuestoInput],
+        *,
+        compact_items: Sequence[dict],
+        max_items: int,
+    ) -> List[Bc3PlannedBatch]:
+        """
+        Empaquetado voraz que respeta el orden de entrada. Un item que por sí
+        solo supera el presupuesto va en un lote propio.
+        """
+        max_items = max(1, int(max_items))
+        batches: List[Bc3PlannedBatch] = []
+        current: List[Bc3DescompuestoInput] = []
+        current_in = 0
+        current_out = 0
+
+        for item, compact in zip(items, compact_items):
+            item_in = self.estimate_input_tokens(compact)
+            item_out = self.estimate_output_tokens(item)
+
+            if current and (
+                len(current) >= max_items
+                or self._exceeds(current_in + item_in, self._max_input_tokens)
+                or self._exceeds(current_out + item_out, self._max_output_tokens)
+            ):
+                batches.append(Bc3PlannedBatch(current, current_in, current_out))
+                current, current_in, current_out = [], 0, 0
+
+            if self._exceeds(item_in, self._max_input_tokens):
+                logger.warning(
+                    "BC3 planner: el descompuesto %s supera por sí solo el presupuesto de entrada. tokens_estimados=%s max_input_tokens=%s",
+                    item.id,
+                    item_in,
+                    self._max_input_tokens,
+                )
+
+            current.append(item)
+            current_in += item_in
+            current_out += item_out
+
+        if current:
+            batches.append(Bc3PlannedBatch(current, current_in, current_out))
+
+        return batches
+
+    @staticmethod
+    def _exceeds(tokens: int, budget: int) -> bool:
+        return budget > 0 and tokens > budget
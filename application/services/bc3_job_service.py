@@ -0,0 +1,128 @@
+# application/services/bc3_job_service.py
+from __future__ import annotations
+
+import logging
+import uuid
+from typing import Any, Dict, List
+
+from application.pipelines.bc3_classification_pipeline import Bc3ClassificationPipeline
+from domain.models.bc3_classification_models import (
+    Bc3ClasificacionItem,
+    Bc3ClassificationRequest,
+)
+from domain.ports.bc3_job_journal import Bc3JobJournal
+from domain.ports.bc3_job_queue import Bc3JobQueue
+from domain.ports.bc3_job_store import Bc3JobRecord, Bc3JobStore
+
+logger = logging.getLogger(__name__)
+
+
+class Bc3JobService:
+    """
+    Trabajos BC3 asíncronos: `submit` guarda el request y lo encola sin
+    esperar; el trabajador anota en el almacén los items resueltos y el
+    progreso tras cada lote. Con `journal`, un trabajo que se corta a
+    medias por un reinicio se reanuda desde el último lote anotado.
+    """
+
+    def __init__(
+        self,
+        *,
+        pipeline: Bc3ClassificationPipeline,
+        store: Bc3JobStore,
+        queue: Bc3JobQueue,
+        journal: Bc3JobJournal | None = None,
+    ) -> None:
+        self._pipeline = pipeline
+        self._store = store
+        self._queue = queue
+        self._journal = journal
+
+    def submit(
+        self,
+        req: Bc3ClassificationRequest,
+        meta: Dict[str, Any],
+    ) -> Bc3JobRecord | None:
+        """None si la cola no admite más trabajos."""
+        job_id = uuid.uuid4().hex
+        record = self._store.create(
+            job_id,
+            req.model_dump(mode="json"),
+            meta,
+            len(req.descompuestos),
+        )
+        if not self._queue.submit(job_id, lambda: self._run(job_id)):
+            self._store.mark_failed(job_id, "Cola de trabajos BC3 llena.")
+            return None
+
+        logger.info(
+            "Trabajo BC3 encolado. job_id=%s descompuestos=%s",
+            job_id,
+            len(req.descompuestos),
+        )
+        # Con una cola en línea el trabajo ya ha terminado: se devuelve el
+        # estado actual, no el de la creación.
+        return self._store.get(job_id) or record
+
+    def get(self, job_id: str) -> Bc3JobRecord | None:
+        return self._store.get(job_id)
+
+    def items(self, job_id: str) -> List[Bc3ClasificacionItem]:
+        return self._store.items(job_id)
+
+    def resume_unfinished(self) -> int:
+        """
+        Vuelve a encolar los trabajos que un proceso anterior dejó a medias.
+        Pensado para un único proceso: con varios, cada uno devolvería a la
+        cola los trabajos en curso de los demás.
+        """
+        requeued = self._store.requeue_running()
+        if requeued:
+            logger.warning(
+                "Trabajos BC3 en curso de un proceso anterior devueltos a la cola. trabajos=%s",
+                requeued,
+            )
+
+        resumed = 0
+        for record in self._store.unfinished():
+            job_id = record.job_id
+            if self._queue.submit(job_id, lambda job_id=job_id: self._run(job_id)):
+                resumed += 1
+
+        if resumed:
+            logger.info("Trabajos BC3 reanudados tras reinicio. trabajos=%s", resumed)
+        return resumed
+
+    def _run(self, job_id: str) -> None:
+        if not self._store.claim(job_id):
+            logger.info("Trabajo BC3 ya tomado por otro trabajador; se omite. job_id=%s", job_id)
+            return
+
+        try:
+            req = Bc3ClassificationRequest.model_validate(
+                self._store.load_request(job_id)
+            )
+            resolved: Dict[int, Bc3ClasificacionItem] = {}
+
+            def _progress(batches_done: int, batches_total: int) -> None:
+                self._store.record_progress(
+                    job_id,
+                    resolved,
+                    batches_done,
+                    batches_total,
+                )
+                resolved.clear()
+
+            for position, item in self._pipeline.run_iter_positioned(
+                req,
+                journal=self._journal,
+                progress=_progress,
+            ):
+                resolved[position] = item
+        except Exception as exc:
+            logger.exception("Trabajo BC3 fallido. job_id=%s", job_id)
+            self._store.mark_failed(job_id, str(exc))
+            return
+
+        self._store.mark_done(job_id)
+        logger.info("Trabajo BC3 terminado. job_id=%s", job_id)
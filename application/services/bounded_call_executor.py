@@ -0,0 +1,99 @@
+# application/services/bounded_call_executor.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BoundedCallExecutorStats:
+    max_workers: int
+    running: int
+    queued: int
+    peak_queued: int
+    completed: int
+
+
+class BoundedCallExecutor:
+    """
+    Ejecuta llamadas bloqueantes (SDK síncrono, OCR...) desde endpoints
+    `async` en un pool propio de `max_workers` hilos, para no parar el event
+    loop. Lo que excede el pool espera en cola; `warn_queue_depth` > 0 avisa
+    en el log cuando la cola supera ese tamaño.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        max_workers: int = 4,
+        warn_queue_depth: int = 0,
+    ) -> None:
+        self._name = name
+        self._max_workers = max(1, int(max_workers))
+        self._warn_queue_depth = max(0, int(warn_queue_depth))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_workers,
+            thread_name_prefix=name,
+        )
+
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._peak_queued = 0
+        self._completed = 0
+
+    async def run(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self._queued += 1
+            queued = self._queued
+            self._peak_queued = max(self._peak_queued, queued)
+
+        if self._warn_queue_depth and queued > self._warn_queue_depth:
+            logger.warning(
+                "Cola de %s por encima del umbral. en_cola=%s umbral=%s max_workers=%s",
+                self._name,
+                queued,
+                self._warn_queue_depth,
+                self._max_workers,
+            )
+
+        def _call() -> Any:
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        future = self._executor.submit(_call)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> BoundedCallExecutorStats:
+        with self._lock:
+            return BoundedCallExecutorStats(
+                max_workers=self._max_workers,
+                running=self._running,
+                queued=self._queued,
+                peak_queued=self._peak_queued,
+                completed=self._completed,
+            )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_done(self, future: Future) -> None:
+        # Cancelada antes de arrancar (cliente desconectado): sale de la cola.
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
@@ -0,0 +1,373 @@
+# application/services/catalog_batch_scorer.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+from application.services.catalog_feature_index import (
+    DOMAIN_RULES,
+    GROUP_HINTS,
+    CatalogFeatureIndex,
+    QueryFeatures,
+)
+
+# Mismos pesos que `CatalogCandidateSelector._score_entry`.
+_TOKEN_FIELD_WEIGHTS = (
+    ("product_tokens", 5.5),
+    ("family_tokens", 3.0),
+    ("group_tokens", 2.0),
+    ("full_tokens", 1.5),
+)
+_SIMILARITY_FIELD_WEIGHTS = (
+    ("product_grams", 40.0),
+    ("family_grams", 16.0),
+    ("full_grams", 20.0),
+)
+_PRODUCT_IN_QUERY_BONUS = 18.0
+_QUERY_IN_PRODUCT_BONUS = 10.0
+
+
+def _require_numpy() -> Any:
+    try:
+        import numpy
+    except Exception as exc:
+        raise RuntimeError(
+            "No se pudo importar la dependencia opcional 'numpy'. "
+            "Instálala para usar el scorer vectorizado del selector BC3."
+        ) from exc
+    return numpy
+
+
+def _token_weight(token: str) -> float:
+    return 1.0 + min(len(token), 12) / 12.0
+
+
+class VectorizedCatalogScorer:
+    """
+    Motor de ranking por lotes: puntúa todas las consultas de un request
+    contra todo el catálogo con productos de matrices de incidencia
+    (tokens ponderados y trigramas de caracteres).
+
+    Reproduce los pesos de `_score_entry` (solape ponderado por campo,
+    bonus de subcadena, dominio y grupo). La señal difusa es el Dice sobre
+    trigramas de `TrigramDiceKernel`; el kernel difflib no admite
+    vectorización.
+
+    Las matrices se construyen por bloques de consultas, restringidas a las
+    columnas (tokens/trigramas) presentes en el bloque, de modo que la
+    memoria queda acotada por `max_matrix_cells` y no por el vocabulario.
+    """
+
+    def __init__(
+        self,
+        index: CatalogFeatureIndex,
+        *,
+        max_matrix_cells: int = 4_000_000,
+    ) -> None:
+        np = _require_numpy()
+        self._np = np
+        self._index = index
+        self._max_matrix_cells = max(1, int(max_matrix_cells))
+
+        entries = index.entries
+        total = len(entries)
+
+        token_acc: Dict[str, Dict[int, float]] = {}
+        for position, entry in enumerate(entries):
+            for field_name, weight in _TOKEN_FIELD_WEIGHTS:
+                for token in getattr(entry, field_name):
+                    row = token_acc.setdefault(token, {})
+                    row[position] = row.get(position, 0.0) + weight
+        self._token_postings: Dict[str, Tuple[Any, Any]] = {
+            token: (
+                np.fromiter(row.keys(), dtype=np.int64, count=len(row)),
+                np.fromiter(row.values(), dtype=np.float32, count=len(row)),
+            )
+            for token, row in token_acc.items()
+        }
+
+        self._gram_postings: Dict[str, Dict[str, Any]] = {}
+        self._gram_sizes: Dict[str, Any] = {}
+        for field_name, _ in _SIMILARITY_FIELD_WEIGHTS:
+            acc: Dict[str, List[int]] = {}
+            sizes = np.zeros(total, dtype=np.float32)
+            for position, entry in enumerate(entries):
+                grams = getattr(entry, field_name)
+                sizes[position] = len(grams)
+                for gram in grams:
+                    acc.setdefault(gram, []).append(position)
+            self._gram_postings[field_name] = {
+                gram: np.asarray(rows, dtype=np.int64)
+                for gram, rows in acc.items()
+            }
+            self._gram_sizes[field_name] = sizes
+
+        self._product_text_lengths = np.asarray(
+            [len(entry.product_text) for entry in entries],
+            dtype=np.int64,
+        )
+        self._short_products = [
+            position
+            for position, entry in enumerate(entries)
+            if 0 < len(entry.product_text) < 3
+        ]
+
+        self._domain_matrix = np.asarray(
+            [
+                [
+                    weight if flag else 0.0
+                    for flag, (_, weight) in zip(entry.domain_flags, DOMAIN_RULES)
+                ]
+                for entry in entries
+            ],
+            dtype=np.float32,
+        ).reshape(total, len(DOMAIN_RULES))
+        self._group_matrix = np.asarray(
+            [
+                [entry.group_bonus_by_hint.get(hint, 0.0) for hint in GROUP_HINTS]
+                for entry in entries
+            ],
+            dtype=np.float32,
+        ).reshape(total, len(GROUP_HINTS))
+        self._hint_position = {hint: idx for idx, hint in enumerate(GROUP_HINTS)}
+
+        code_order = sorted(range(total), key=lambda pos: entries[pos].code)
+        self._code_rank = np.empty(total, dtype=np.int64)
+        self._code_rank[np.asarray(code_order, dtype=np.int64)] = np.arange(total)
+
+    @property
+    def index(self) -> CatalogFeatureIndex:
+        return self._index
+
+    def rank(
+        self,
+        queries: Sequence[QueryFeatures],
+        *,
+        top_k: int,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Devuelve, por consulta, las `top_k` posiciones del catálogo con su
+        score, ordenadas igual que el selector: score desc y código asc.
+        """
+        top_k = max(1, int(top_k))
+        rankings: List[List[Tuple[int, float]]] = []
+        for chunk, chunk_grams in self._chunk_queries(queries):
+            scores = self._score_chunk(chunk, chunk_grams)
+            for row in scores:
+                rankings.append(self._top_k_row(row, top_k))
+        return rankings
+
+    def score_matrix(self, queries: Sequence[QueryFeatures]) -> Any:
+        np = self._np
+        blocks = [
+            self._score_chunk(chunk, chunk_grams)
+            for chunk, chunk_grams in self._chunk_queries(queries)
+        ]
+        if not blocks:
+            return np.zeros((0, len(self._index.entries)), dtype=np.float32)
+        return np.vstack(blocks)
+
+    def _chunk_queries(
+        self,
+        queries: Sequence[QueryFeatures],
+    ) -> List[Tuple[List[QueryFeatures], List[frozenset[str]]]]:
+        """
+        Agrupa consultas mientras tanto las filas como la unión de columnas
+        (tokens + trigramas) multiplicadas por el tamaño del catálogo quepan
+        en `max_matrix_cells`.
+        """
+        total_entries = max(1, len(self._index.entries))
+        chunks: List[Tuple[List[QueryFeatures], List[frozenset[str]]]] = []
+        current: List[QueryFeatures] = []
+        current_grams: List[frozenset[str]] = []
+        columns: set[str] = set()
+
+        for query in queries:
+            grams = query.grams
+            query_columns = set(query.tokens) | {f"#{gram}" for gram in grams}
+            merged = len(columns | query_columns)
+            if current and (
+                merged * total_entries > self._max_matrix_cells
+                or (len(current) + 1) * total_entries > self._max_matrix_cells
+            ):
+                chunks.append((current, current_grams))
+                current = []
+                current_grams = []
+                columns = set()
+            current.append(query)
+            current_grams.append(grams)
+            columns |= query_columns
+
+        if current:
+            chunks.append((current, current_grams))
+        return chunks
+
+    def _score_chunk(
+        self,
+        chunk: Sequence[QueryFeatures],
+        query_grams: Sequence[frozenset[str]],
+    ) -> Any:
+        np = self._np
+        rows = len(chunk)
+
+        scores = self._token_overlap(chunk)
+
+        query_gram_sizes = np.asarray(
+            [len(grams) for grams in query_grams],
+            dtype=np.float32,
+        )
+
+        product_intersection = None
+        for field_name, weight in _SIMILARITY_FIELD_WEIGHTS:
+            intersection = self._gram_intersection(field_name, query_grams)
+            denominator = (
+                query_gram_sizes[:, None] + self._gram_sizes[field_name][None, :]
+            )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                dice = np.where(
+                    denominator > 0,
+                    2.0 * intersection / denominator,
+                    0.0,
+                )
+            scores += (weight * dice).astype(np.float32)
+            if field_name == "product_grams":
+                product_intersection = intersection
+
+        self._add_substring_bonus(
+            scores=scores,
+            chunk=chunk,
+            product_intersection=product_intersection,
+            query_gram_sizes=query_gram_sizes,
+        )
+
+        query_domain = np.asarray(
+            [query.domain_flags for query in chunk],
+            dtype=np.float32,
+        ).reshape(rows, len(DOMAIN_RULES))
+        scores += query_domain @ self._domain_matrix.T
+
+        for row_idx, query in enumerate(chunk):
+            hint_idx = self._hint_position.get(query.group_hint or "")
+            if hint_idx is not None:
+                scores[row_idx] += self._group_matrix[:, hint_idx]
+
+        return scores
+
+    def _token_overlap(self, chunk: Sequence[QueryFeatures]) -> Any:
+        np = self._np
+        total = len(self._index.entries)
+        vocabulary = sorted(
+            {token for query in chunk for token in query.tokens}
+            & self._token_postings.keys()
+        )
+        if not vocabulary:
+            return np.zeros((len(chunk), total), dtype=np.float32)
+
+        column = {token: idx for idx, token in enumerate(vocabulary)}
+        query_matrix = np.zeros((len(chunk), len(vocabulary)), dtype=np.float32)
+        for row_idx, query in enumerate(chunk):
+            for token in query.tokens:
+                col = column.get(token)
+                if col is not None:
+                    query_matrix[row_idx, col] = _token_weight(token)
+
+        entry_matrix = np.zeros((len(vocabulary), total), dtype=np.float32)
+        for col, token in enumerate(vocabulary):
+            positions, values = self._token_postings[token]
+            entry_matrix[col, positions] = values
+
+        return query_matrix @ entry_matrix
+
+    def _gram_intersection(
+        self,
+        field_name: str,
+        query_grams: Sequence[frozenset[str]],
+    ) -> Any:
+        np = self._np
+        total = len(self._index.entries)
+        postings = self._gram_postings[field_name]
+        vocabulary = sorted(
+            {gram for grams in query_grams for gram in grams} & postings.keys()
+        )
+        if not vocabulary:
+            return np.zeros((len(query_grams), total), dtype=np.float32)
+
+        column = {gram: idx for idx, gram in enumerate(vocabulary)}
+        query_matrix = np.zeros((len(query_grams), len(vocabulary)), dtype=np.float32)
+        for row_idx, grams in enumerate(query_grams):
+            cols = [column[gram] for gram in grams if gram in column]
+            query_matrix[row_idx, cols] = 1.0
+
+        entry_matrix = np.zeros((len(vocabulary), total), dtype=np.float32)
+        for col, gram in enumerate(vocabulary):
+            entry_matrix[col, postings[gram]] = 1.0
+
+        return query_matrix @ entry_matrix
+
+    def _add_substring_bonus(
+        self,
+        *,
+        scores: Any,
+        chunk: Sequence[QueryFeatures],
+        product_intersection: Any,
+        query_gram_sizes: Any,
+    ) -> None:
+        """
+        Un texto solo puede ser subcadena de otro si todos sus trigramas
+        aparecen en él: la matriz de intersección filtra los pares y la
+        comprobación exacta con `in` se hace únicamente sobre esos pares.
+        """
+        np = self._np
+        entries = self._index.entries
+        product_sizes = self._gram_sizes["product_grams"]
+
+        for row_idx, query in enumerate(chunk):
+            query_text = query.text
+            row_intersection = product_intersection[row_idx]
+
+            product_candidates = np.nonzero(
+                (product_sizes > 0)
+                & (row_intersection >= product_sizes)
+                & (self._product_text_lengths <= len(query_text))
+            )[0].tolist()
+            product_candidates.extend(self._short_products)
+
+            bonus_positions: set[int] = set()
+            for position in product_candidates:
+                if position in bonus_positions:
+                    continue
+                product_text = entries[position].product_text
+                if product_text and product_text in query_text:
+                    scores[row_idx, position] += _PRODUCT_IN_QUERY_BONUS
+                    bonus_positions.add(position)
+
+            if not query_text:
+                continue
+
+            if len(query_text) < 3:
+                query_candidates = np.nonzero(
+                    self._product_text_lengths >= len(query_text)
+                )[0].tolist()
+            else:
+                query_candidates = np.nonzero(
+                    (row_intersection >= query_gram_sizes[row_idx])
+                    & (self._product_text_lengths >= len(query_text))
+                )[0].tolist()
+
+            for position in query_candidates:
+                if position in bonus_positions:
+                    continue
+                if query_text in entries[position].product_text:
+                    scores[row_idx, position] += _QUERY_IN_PRODUCT_BONUS
+
+    def _top_k_row(self, row: Any, top_k: int) -> List[Tuple[int, float]]:
+        np = self._np
+        total = row.shape[0]
+        if top_k < total:
+            threshold = np.partition(row, total - top_k)[total - top_k]
+            candidates = np.nonzero(row >= threshold)[0]
+        else:
+            candidates = np.arange(total)
+
+        order = np.lexsort((self._code_rank[candidates], -row[candidates]))
+        selected = candidates[order][:top_k]
+        return [(int(position), float(row[position])) for position in selected]
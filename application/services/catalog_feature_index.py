@@ -0,0 +1,335 @@
+# application/services/catalog_feature_index.py
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from domain.models.bc3_classification_models import Bc3CatalogoItem
+
+_STOPWORDS = {
+    "a",
+    "al",
+    "con",
+    "de",
+    "del",
+    "e",
+    "el",
+    "en",
+    "entre",
+    "la",
+    "las",
+    "lo",
+    "los",
+    "o",
+    "para",
+    "por",
+    "que",
+    "se",
+    "sin",
+    "su",
+    "sus",
+    "u",
+    "un",
+    "una",
+    "uno",
+    "unos",
+    "unas",
+    "y",
+}
+
+_SYNONYM_GROUPS = {
+    "alquiler": {"alquiler", "renting"},
+    "demolicion": {"demolicion", "demoliciones", "derribo", "derribos", "desmontaje"},
+    "instalacion": {"instalacion", "instalaciones", "montaje", "colocacion"},
+    "mobiliario": {"mobiliario", "mueble", "muebles", "enser", "enseres"},
+    "proteccion": {"proteccion", "protecciones"},
+    "residuos": {"residuo", "residuos", "escombro", "escombros"},
+    "retirada": {"retirada", "retirar", "despeje", "evacuacion"},
+    "suministro": {"suministro", "aporte", "material", "materiales"},
+}
+
+_VARIANT_TO_CANONICAL = {
+    variant: canonical
+    for canonical, variants in _SYNONYM_GROUPS.items()
+    for variant in variants
+}
+
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_SPACES_RE = re.compile(r"\s+")
+
+# Bonus de dominio: (tokens canónicos, peso). Se suma cuando la consulta y el
+# texto completo del producto comparten al menos un token del conjunto.
+DOMAIN_RULES: Tuple[Tuple[frozenset[str], float], ...] = (
+    (frozenset({"retirada", "demolicion"}), 14.0),
+    (frozenset({"mobiliario"}), 10.0),
+    (frozenset({"residuos"}), 8.0),
+    (frozenset({"instalacion"}), 8.0),
+    (frozenset({"suministro"}), 8.0),
+)
+
+GROUP_HINTS: Tuple[str, ...] = (
+    "SUMINISTRO",
+    "MONTAJE",
+    "SUMINISTRO_CON_MONTAJE",
+    "MAQUINARIA_ALQUILER",
+    "MAQUINARIA_COMPRA",
+    "MEDIOS_AUXILIARES",
+)
+
+
+def normalize_text(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text or "")
+    normalized = "".join(
+        char for char in normalized if not unicodedata.combining(char)
+    )
+    normalized = normalized.lower()
+    normalized = _NON_ALNUM_RE.sub(" ", normalized)
+    return _SPACES_RE.sub(" ", normalized).strip()
+
+
+def tokenize_sequence(normalized_text: str) -> List[str]:
+    if not normalized_text:
+        return []
+
+    tokens: List[str] = []
+    for raw_token in normalized_text.split():
+        if len(raw_token) <= 1:
+            continue
+        if raw_token in _STOPWORDS:
+            continue
+        tokens.append(_VARIANT_TO_CANONICAL.get(raw_token, raw_token))
+    return tokens
+
+
+def tokenize(normalized_text: str) -> set[str]:
+    return set(tokenize_sequence(normalized_text))
+
+
+def char_ngrams(text: str, size: int = 3) -> frozenset[str]:
+    if not text:
+        return frozenset()
+    if len(text) < size:
+        return frozenset({text})
+    return frozenset(text[i:i + size] for i in range(len(text) - size + 1))
+
+
+def domain_flags(tokens: set[str] | frozenset[str]) -> Tuple[bool, ...]:
+    return tuple(bool(rule_tokens & tokens) for rule_tokens, _ in DOMAIN_RULES)
+
+
+def domain_bonus(
+    *,
+    query_flags: Tuple[bool, ...],
+    entry_flags: Tuple[bool, ...],
+) -> float:
+    score = 0.0
+    for (_, weight), query_flag, entry_flag in zip(
+        DOMAIN_RULES,
+        query_flags,
+        entry_flags,
+    ):
+        if query_flag and entry_flag:
+            score += weight
+    return score
+
+
+def group_bonus(
+    *,
+    group_hint: str | None,
+    group_text: str,
+    full_text: str,
+) -> float:
+    if group_hint == "SUMINISTRO":
+        if "materia" in group_text or "suministro" in full_text:
+            return 22.0
+
+    if group_hint == "MONTAJE":
+        if "mano de obra" in group_text or "montaje" in full_text:
+            return 22.0
+
+    if group_hint == "SUMINISTRO_CON_MONTAJE":
+        if "aporte" in group_text or (
+            "suministro" in full_text and "montaje" in full_text
+        ):
+            return 28.0
+
+    if group_hint == "MAQUINARIA_ALQUILER":
+        if "alquiler" in group_text:
+            return 26.0
+
+    if group_hint == "MAQUINARIA_COMPRA":
+        if "maquinaria" in group_text and "alquiler" not in group_text:
+            return 20.0
+
+    if group_hint == "MEDIOS_AUXILIARES":
+        if "medios auxiliares" in group_text:
+            return 26.0
+
+    return 0.0
+
+
+@dataclass(frozen=True)
+class QueryFeatures:
+    text: str
+    tokens: set[str]
+    grams: frozenset[str]
+    group_hint: str | None
+    domain_flags: Tuple[bool, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class IndexedCatalogEntry:
+    item: Bc3CatalogoItem
+    product_text: str
+    family_text: str
+    group_text: str
+    full_text: str
+    product_tokens: frozenset[str]
+    family_tokens: frozenset[str]
+    group_tokens: frozenset[str]
+    full_tokens: frozenset[str]
+    product_grams: frozenset[str]
+    family_grams: frozenset[str]
+    full_grams: frozenset[str]
+    domain_flags: Tuple[bool, ...]
+    group_bonus_by_hint: Dict[str, float]
+
+    @property
+    def code(self) -> str:
+        return self.item.codigo
+
+    @classmethod
+    def from_item(cls, item: Bc3CatalogoItem) -> "IndexedCatalogEntry":
+        product_text = normalize_text(item.descripcion_producto)
+        family_text = normalize_text(item.descripcion_familia)
+        group_text = normalize_text(item.descripcion_grupo)
+        full_text = normalize_text(
+            item.descripcion_completa or item.search_text()
+        )
+        full_tokens = frozenset(tokenize(full_text))
+
+        bonus_by_hint: Dict[str, float] = {}
+        for hint in GROUP_HINTS:
+            bonus = group_bonus(
+                group_hint=hint,
+                group_text=group_text,
+                full_text=full_text,
+            )
+            if bonus:
+                bonus_by_hint[hint] = bonus
+
+        return cls(
+            item=item,
+            product_text=product_text,
+            family_text=family_text,
+            group_text=group_text,
+            full_text=full_text,
+            product_tokens=frozenset(tokenize(product_text)),
+            family_tokens=frozenset(tokenize(family_text)),
+            group_tokens=frozenset(tokenize(group_text)),
+            full_tokens=full_tokens,
+            product_grams=char_ngrams(product_text),
+            family_grams=char_ngrams(family_text),
+            full_grams=char_ngrams(full_text),
+            domain_flags=domain_flags(full_tokens),
+            group_bonus_by_hint=bonus_by_hint,
+        )
+
+
+@dataclass(frozen=True)
+class CatalogFeatureIndex:
+    """
+    Rasgos normalizados del catálogo, calculados una sola vez por bundle.
+
+    El selector puntúa contra estas entradas en lugar de volver a normalizar
+    y tokenizar cada `Bc3CatalogoItem` en cada descompuesto. Incluye además
+    un índice invertido sobre el texto completo para el prefiltro BM25.
+    """
+
+    cache_key: str
+    entries: Tuple[IndexedCatalogEntry, ...]
+    postings: Dict[str, Tuple[Tuple[int, int], ...]]
+    idf: Dict[str, float]
+    doc_lengths: Tuple[int, ...]
+    avg_doc_length: float
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def build(
+        cls,
+        *,
+        catalogo: Sequence[Bc3CatalogoItem],
+        cache_key: str = "",
+    ) -> "CatalogFeatureIndex":
+        entries = tuple(IndexedCatalogEntry.from_item(item) for item in catalogo)
+
+        postings_acc: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths: List[int] = []
+        for position, entry in enumerate(entries):
+            counts = Counter(tokenize_sequence(entry.full_text))
+            doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                postings_acc.setdefault(token, []).append((position, tf))
+
+        total_docs = len(entries)
+        idf = {
+            token: math.log(
+                1.0 + (total_docs - len(rows) + 0.5) / (len(rows) + 0.5)
+            )
+            for token, rows in postings_acc.items()
+        }
+
+        return cls(
+            cache_key=cache_key,
+            entries=entries,
+            postings={token: tuple(rows) for token, rows in postings_acc.items()},
+            idf=idf,
+            doc_lengths=tuple(doc_lengths),
+            avg_doc_length=(
+                sum(doc_lengths) / total_docs if total_docs else 0.0
+            ),
+        )
+
+    def bm25_candidates(
+        self,
+        query_tokens: Iterable[str],
+        *,
+        limit: int,
+    ) -> List[int]:
+        """
+        Primera etapa barata: posiciones de las `limit` entradas con mayor
+        BM25 frente a los tokens de la consulta. Solo recorre las listas de
+        postings de esos tokens, no el catálogo completo.
+        """
+        avg_len = self.avg_doc_length or 1.0
+        scores: Dict[int, float] = {}
+
+        for token in set(query_tokens):
+            rows = self.postings.get(token)
+            if not rows:
+                continue
+            idf = self.idf[token]
+            for position, tf in rows:
+                norm = _BM25_K1 * (
+                    1.0 - _BM25_B + _BM25_B * self.doc_lengths[position] / avg_len
+                )
+                scores[position] = scores.get(position, 0.0) + idf * (
+                    tf * (_BM25_K1 + 1.0) / (tf + norm)
+                )
+
+        best = heapq.nlargest(
+            max(1, int(limit)),
+            scores.items(),
+            key=lambda row: (row[1], -row[0]),
+        )
+        return sorted(position for position, _ in best)
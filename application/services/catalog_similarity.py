@@ -0,0 +1,85 @@
+# application/services/catalog_similarity.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from difflib import SequenceMatcher
+
+from application.services.catalog_feature_index import QueryFeatures
+
+
+class SimilarityKernel(ABC):
+    """
+    Señal difusa entre la consulta normalizada y un texto del catálogo,
+    en el rango [0, 1]. Recibe el texto y sus trigramas precalculados para
+    que cada kernel use la representación que necesite.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def similarity(
+        self,
+        *,
+        query: QueryFeatures,
+        text: str,
+        grams: frozenset[str],
+    ) -> float:
+        raise NotImplementedError
+
+
+class TrigramDiceKernel(SimilarityKernel):
+    """
+    Coeficiente de Dice sobre conjuntos de trigramas de caracteres. Coste
+    lineal en nº de trigramas y sin dependencias nativas; es la misma
+    similitud que usa el scorer vectorizado.
+    """
+
+    name = "trigram"
+
+    def similarity(
+        self,
+        *,
+        query: QueryFeatures,
+        text: str,
+        grams: frozenset[str],
+    ) -> float:
+        query_grams = query.grams
+        total = len(query_grams) + len(grams)
+        if not total:
+            return 0.0
+        return 2.0 * len(query_grams & grams) / total
+
+
+class DifflibKernel(SimilarityKernel):
+    """
+    Modo de referencia: `difflib.SequenceMatcher.ratio()`, cuadrático en la
+    longitud de los textos. Reproduce el comportamiento histórico.
+    """
+
+    name = "difflib"
+
+    def similarity(
+        self,
+        *,
+        query: QueryFeatures,
+        text: str,
+        grams: frozenset[str],
+    ) -> float:
+        return SequenceMatcher(None, query.text, text).ratio()
+
+
+_KERNELS = {
+    TrigramDiceKernel.name: TrigramDiceKernel,
+    DifflibKernel.name: DifflibKernel,
+}
+
+
+def build_similarity_kernel(name: str | None) -> SimilarityKernel:
+    key = (name or TrigramDiceKernel.name).strip().lower()
+    if key in _KERNELS:
+        return _KERNELS[key]()
+
+    available = ", ".join(sorted(_KERNELS))
+    raise ValueError(
+        f"Kernel de similitud '{name}' no soportado. Disponibles: {available}"
+    )
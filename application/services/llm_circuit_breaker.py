@@ -0,0 +1,174 @@
+# application/services/llm_circuit_breaker.py
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Solo cuentan los fallos de disponibilidad del proveedor; un 400 o un error
+# de esquema no dicen nada de su salud. Por nombre para no depender del SDK.
+_UNAVAILABLE_STATUS = {429, 500, 502, 503, 504}
+_UNAVAILABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "RateLimitError",
+}
+# Plazos que vencen en local (esperando turno en el planificador) antes de
+# llegar al proveedor: nunca cuentan contra el circuito.
+_LOCAL_DEADLINE_ERROR_NAMES = {"LlmDeadlineExceededError"}
+
+
+def is_llm_unavailable_error(exc: BaseException) -> bool:
+    """
+    Timeouts, red, 5xx y 429 (que ya agotó los reintentos del planificador).
+    Un plazo agotado esperando turno en local no cuenta.
+    """
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if names & _LOCAL_DEADLINE_ERROR_NAMES:
+        return False
+    status = getattr(exc, "status_code", None)
+    if status in _UNAVAILABLE_STATUS or (isinstance(status, int) and status >= 500):
+        return True
+    return bool(names & _UNAVAILABLE_ERROR_NAMES)
+
+
+@dataclass(frozen=True)
+class LlmCircuitSnapshot:
+    state: str
+    consecutive_failures: int
+    failure_threshold: int
+    cooldown_s: float
+    retry_in_s: float
+    opened_count: int
+    short_circuited: int
+
+
+class LlmCircuitBreaker:
+    """
+    Corta las llamadas al LLM tras `failure_threshold` fallos seguidos
+    (timeouts, 5xx, red...) durante `cooldown_s`: mientras está abierto el
+    pipeline resuelve solo con el selector local. Pasado el enfriamiento
+    deja pasar una única llamada de prueba; si responde, se cierra y si
+    falla vuelve a abrirse. Se comparte entre requests del proceso.
+    `failure_threshold` <= 0 lo desactiva.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        cooldown_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = max(0, int(failure_threshold))
+        self._cooldown_s = max(0.0, float(cooldown_s))
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._opened_count = 0
+        self._short_circuited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._failure_threshold > 0
+
+    def allow(self) -> bool:
+        """
+        True si la llamada puede hacerse. En semiabierto solo la primera
+        llamada (la prueba) obtiene True hasta que se registre su resultado.
+        """
+        if not self.enabled:
+            return True
+
+        with self._lock:
+            if self._state == CIRCUIT_CLOSED:
+                return True
+            if self._state == CIRCUIT_OPEN and self._cooldown_elapsed_locked():
+                self._state = CIRCUIT_HALF_OPEN
+                logger.info("Circuito LLM semiabierto: se envía una llamada de prueba.")
+                return True
+            self._short_circuited += 1
+            return False
+
+    def is_open(self) -> bool:
+        """Abierto y aún en enfriamiento (no consume la llamada de prueba)."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                return True
+            return self._state == CIRCUIT_OPEN and not self._cooldown_elapsed_locked()
+
+    def record_success(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state != CIRCUIT_CLOSED:
+                logger.info("Circuito LLM cerrado: el LLM vuelve a responder.")
+            self._state = CIRCUIT_CLOSED
+            self._consecutive_failures = 0
+
+    def record_inconclusive(self) -> None:
+        """
+        La llamada falló por algo que no es disponibilidad (request o
+        esquema inválidos): no suma fallos. Si era la llamada de prueba, el
+        circuito vuelve a abierto con el enfriamiento ya cumplido para que
+        la siguiente llamada haga de prueba.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._state = CIRCUIT_OPEN
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == CIRCUIT_HALF_OPEN or (
+                self._state == CIRCUIT_CLOSED
+                and self._consecutive_failures >= self._failure_threshold
+            ):
+                self._state = CIRCUIT_OPEN
+                self._opened_at = self._clock()
+                self._opened_count += 1
+                logger.warning(
+                    "Circuito LLM abierto tras %s fallos seguidos. "
+                    "Se usa solo el selector local durante %.1fs.",
+                    self._consecutive_failures,
+                    self._cooldown_s,
+                )
+
+    def snapshot(self) -> LlmCircuitSnapshot:
+        with self._lock:
+            retry_in_s = 0.0
+            if self._state == CIRCUIT_OPEN:
+                retry_in_s = max(
+                    0.0,
+                    self._opened_at + self._cooldown_s - self._clock(),
+                )
+            return LlmCircuitSnapshot(
+                state=self._state if self.enabled else "disabled",
+                consecutive_failures=self._consecutive_failures,
+                failure_threshold=self._failure_threshold,
+                cooldown_s=self._cooldown_s,
+                retry_in_s=round(retry_in_s, 3),
+                opened_count=self._opened_count,
+                short_circuited=self._short_circuited,
+            )
+
+    def _cooldown_elapsed_locked(self) -> bool:
+        return self._clock() - self._opened_at >= self._cooldown_s
@@ -1,6 +1,7 @@
 # application/services/prompted_text_extraction_service.py
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any, Dict, Iterable, Type
 
@@ -8,10 +9,12 @@ from pydantic import BaseModel
 
 from application.services.schema_registry import SchemaRegistry
 from domain.models.bc3_classification_models import (
+    Bc3ClasificacionCompacta,
     Bc3ClasificacionItem,
     Bc3ClasificacionResultado,
 )
-from domain.ports.prompt_repository import PromptRepository
+from domain.models.llm_usage import LlmUsageSink
+from domain.ports.prompt_repository import PromptRepository, PromptSpec
 
 logger = logging.getLogger(__name__)
 
@@ -38,12 +41,18 @@ class PromptedTextExtractionService:
         prompt_repo: PromptRepository,
         schema_registry: SchemaRegistry,
         model: str,
+        async_llm_client: Any | None = None,
     ) -> None:
         self._llm = llm_client
+        self._async_llm = async_llm_client
         self._prompts = prompt_repo
         self._schemas = schema_registry
         self._model = model
 
+    @property
+    def model(self) -> str:
+        return self._model
+
     def extract(
         self,
         *,
@@ -51,24 +60,70 @@ class PromptedTextExtractionService:
         payload: Dict[str, Any],
         prompt_cache_key: str | None = None,
         prompt_cache_retention: str | None = None,
+        usage_sink: LlmUsageSink | None = None,
+        context_text: str | None = None,
+        timeout_s: float | None = None,
     ) -> tuple[BaseModel, str]:
-        spec = self._prompts.get(prompt_key)
-        response_model: Type[BaseModel] = self._schemas.get(spec.schema)
+        spec, response_model, task = self._resolve_prompt(
+            prompt_key=prompt_key,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+        )
 
-        task = "\n\n".join(
-            [part for part in [spec.task, spec.schema_hint] if part]
-        ).strip()
+        parsed = self._llm.extract_structured(
+            model=self._model,
+            system=spec.system,
+            task=task,
+            payload=payload,
+            response_model=response_model,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+            usage_sink=usage_sink,
+            context_text=context_text,
+            timeout_s=timeout_s,
+        )
 
-        logger.info(
-            "Extracción TEXTO: prompt_key=%s schema=%s model=%s cache_key=%s cache_retention=%s",
-            prompt_key,
-            spec.schema,
-            self._model,
-            bool(prompt_cache_key),
-            prompt_cache_retention,
+        parsed = self._postprocess(
+            schema_name=spec.schema,
+            payload=payload,
+            parsed=parsed,
         )
+        return parsed, spec.schema
 
-        parsed = self._llm.extract_structured(
+    async def extract_async(
+        self,
+        *,
+        prompt_key: str,
+        payload: Dict[str, Any],
+        prompt_cache_key: str | None = None,
+        prompt_cache_retention: str | None = None,
+        usage_sink: LlmUsageSink | None = None,
+        context_text: str | None = None,
+        timeout_s: float | None = None,
+    ) -> tuple[BaseModel, str]:
+        """
+        Igual que `extract` pero sobre el cliente asíncrono. Sin cliente
+        asíncrono configurado, ejecuta `extract` en un hilo.
+        """
+        if self._async_llm is None:
+            return await asyncio.to_thread(
+                self.extract,
+                prompt_key=prompt_key,
+                payload=payload,
+                prompt_cache_key=prompt_cache_key,
+                prompt_cache_retention=prompt_cache_retention,
+                usage_sink=usage_sink,
+                context_text=context_text,
+                timeout_s=timeout_s,
+            )
+
+        spec, response_model, task = self._resolve_prompt(
+            prompt_key=prompt_key,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+        )
+
+        parsed = await self._async_llm.extract_structured(
             model=self._model,
             system=spec.system,
             task=task,
@@ -76,6 +131,9 @@ class PromptedTextExtractionService:
             response_model=response_model,
             prompt_cache_key=prompt_cache_key,
             prompt_cache_retention=prompt_cache_retention,
+            usage_sink=usage_sink,
+            context_text=context_text,
+            timeout_s=timeout_s,
         )
 
         parsed = self._postprocess(
@@ -85,6 +143,30 @@ class PromptedTextExtractionService:
         )
         return parsed, spec.schema
 
+    def _resolve_prompt(
+        self,
+        *,
+        prompt_key: str,
+        prompt_cache_key: str | None,
+        prompt_cache_retention: str | None,
+    ) -> tuple[PromptSpec, Type[BaseModel], str]:
+        spec = self._prompts.get(prompt_key)
+        response_model: Type[BaseModel] = self._schemas.get(spec.schema)
+
+        task = "\n\n".join(
+            [part for part in [spec.task, spec.schema_hint] if part]
+        ).strip()
+
+        logger.info(
+            "Extracción TEXTO: prompt_key=%s schema=%s model=%s cache_key=%s cache_retention=%s",
+            prompt_key,
+            spec.schema,
+            self._model,
+            bool(prompt_cache_key),
+            prompt_cache_retention,
+        )
+        return spec, response_model, task
+
     def _postprocess(
         self,
         *,
@@ -92,7 +174,9 @@ class PromptedTextExtractionService:
         payload: Dict[str, Any],
         parsed: BaseModel,
     ) -> BaseModel:
-        if schema_name != "bc3_clasificacion_resultado":
+        if schema_name == "bc3_clasificacion_compacta":
+            parsed = Bc3ClasificacionCompacta.model_validate(parsed).expand()
+        elif schema_name != "bc3_clasificacion_resultado":
             return parsed
 
         result = Bc3ClasificacionResultado.model_validate(parsed)
@@ -5,7 +5,11 @@ from typing import Dict, Type
 
 from pydantic import BaseModel
 
-from domain.models.bc3_classification_models import Bc3ClasificacionResultado
+from domain.models.bc3_classification_models import (
+    Bc3ClasificacionCompacta,
+    Bc3ClasificacionResultado,
+    Bc3FamiliaCompacta,
+)
 from domain.models.ocr_models import DocumentoOcr
 from domain.models.residuos_models import ResiduosDocumento
 from domain.models.residuos_paquete import ResiduosPaquete
@@ -18,6 +22,8 @@ class SchemaRegistry:
             "residuos_documento": ResiduosDocumento,
             "residuos_paquete": ResiduosPaquete,
             "bc3_clasificacion_resultado": Bc3ClasificacionResultado,
+            "bc3_clasificacion_compacta": Bc3ClasificacionCompacta,
+            "bc3_familia_compacta": Bc3FamiliaCompacta,
         }
 
     def get(self, schema_name: str) -> Type[BaseModel]:
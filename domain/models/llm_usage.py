@@ -0,0 +1,19 @@
+# domain/models/llm_usage.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class LlmUsage:
+    """
+    Consumo de tokens que reporta la API para una llamada.
+    """
+
+    input_tokens: int
+    output_tokens: int
+    cached_input_tokens: int = 0
+
+
+LlmUsageSink = Callable[[LlmUsage], None]
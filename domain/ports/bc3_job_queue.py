@@ -0,0 +1,24 @@
+# domain/ports/bc3_job_queue.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Callable
+
+
+class Bc3JobQueue(ABC):
+    """
+    Ejecuta los trabajos BC3 encolados. `submit` no espera al trabajo y
+    devuelve False si la cola no admite más.
+    """
+
+    @abstractmethod
+    def submit(self, job_id: str, task: Callable[[], None]) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def pending(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def shutdown(self) -> None:
+        raise NotImplementedError
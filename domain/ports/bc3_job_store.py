@@ -0,0 +1,93 @@
+# domain/ports/bc3_job_store.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping
+
+from domain.models.bc3_classification_models import Bc3ClasificacionItem
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class Bc3JobRecord:
+    job_id: str
+    status: str
+    meta: Dict[str, Any]
+    items_total: int
+    items_done: int
+    batches_done: int
+    batches_total: int
+    error: str | None
+    created_at: float
+    updated_at: float
+
+
+class Bc3JobStore(ABC):
+    """
+    Estado persistente de los trabajos BC3 asíncronos: el request a
+    ejecutar, el sobre `meta`, el progreso por lotes y los items ya
+    resueltos por su posición en el request.
+    """
+
+    @abstractmethod
+    def create(
+        self,
+        job_id: str,
+        request: Dict[str, Any],
+        meta: Dict[str, Any],
+        items_total: int,
+    ) -> Bc3JobRecord:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, job_id: str) -> Bc3JobRecord | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_request(self, job_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, job_id: str) -> bool:
+        """
+        Pasa el trabajo de `queued` a `running` de forma atómica. False si
+        ya no estaba en cola (otro proceso lo tomó o terminó).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def requeue_running(self) -> int:
+        """Devuelve a la cola los trabajos que un proceso anterior dejó en curso."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def record_progress(
+        self,
+        job_id: str,
+        items: Mapping[int, Bc3ClasificacionItem],
+        batches_done: int,
+        batches_total: int,
+    ) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark_done(self, job_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark_failed(self, job_id: str, error: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def items(self, job_id: str) -> List[Bc3ClasificacionItem]:
+        """Items resueltos hasta ahora, en el orden del request."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def unfinished(self) -> List[Bc3JobRecord]:
+        raise NotImplementedError
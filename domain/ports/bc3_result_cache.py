@@ -0,0 +1,36 @@
+# domain/ports/bc3_result_cache.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Mapping, Sequence
+
+from domain.models.bc3_classification_models import Bc3ClasificacionItem
+
+
+@dataclass(frozen=True)
+class Bc3ResultCacheStats:
+    hits: int
+    misses: int
+    entries: int
+    size_bytes: int
+
+
+class Bc3ResultCache(ABC):
+    """
+    Almacén de respuestas del LLM por descompuesto. Las claves las construye
+    el pipeline (modelo, prompt, versión de catálogo y contenido normalizado);
+    los valores solo conservan tipo, código y confianza del modelo.
+    """
+
+    @abstractmethod
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Bc3ClasificacionItem]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_many(self, items: Mapping[str, Bc3ClasificacionItem]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Bc3ResultCacheStats:
+        raise NotImplementedError
@@ -0,0 +1 @@
+# infrastructure/cache/__init__.py
@@ -0,0 +1,175 @@
+# infrastructure/cache/sqlite_bc3_result_cache.py
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Sequence
+
+from domain.models.bc3_classification_models import Bc3ClasificacionItem
+from domain.ports.bc3_result_cache import (
+    Bc3ResultCache,
+    Bc3ResultCacheStats,
+)
+
+logger = logging.getLogger(__name__)
+
+_CACHED_FIELDS = {"tipo", "codigo_interno", "confianza_pct"}
+
+# SQLite limita el nº de parámetros por sentencia; se consulta por tramos.
+_LOOKUP_CHUNK = 500
+
+
+class SqliteBc3ResultCache(Bc3ResultCache):
+    """
+    Cache persistente en un único fichero SQLite con expulsión LRU por
+    tamaño: al superar `max_bytes` se borran las entradas usadas hace más
+    tiempo. Los contadores de hits/misses son del proceso actual.
+    """
+
+    def __init__(
+        self,
+        *,
+        path: str | Path,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self._path = Path(path)
+        self._max_bytes = max(1, int(max_bytes))
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self._path),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bc3_results (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS bc3_results_last_used "
+            "ON bc3_results(last_used)"
+        )
+
+        logger.info(
+            "Cache de resultados BC3 abierta. path=%s max_bytes=%s",
+            self._path,
+            self._max_bytes,
+        )
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Bc3ClasificacionItem]:
+        unique_keys = list(dict.fromkeys(keys))
+        found: Dict[str, Bc3ClasificacionItem] = {}
+        if not unique_keys:
+            return found
+
+        with self._lock:
+            for start in range(0, len(unique_keys), _LOOKUP_CHUNK):
+                chunk = unique_keys[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT key, payload FROM bc3_results WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, payload in rows:
+                    try:
+                        found[key] = Bc3ClasificacionItem.model_validate(
+                            {"id": "", **json.loads(payload)}
+                        )
+                    except Exception as exc:
+                        logger.warning(
+                            "Entrada corrupta en cache de resultados BC3; se ignora. key=%s error=%s",
+                            key,
+                            exc,
+                        )
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE bc3_results SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+
+            self._hits += len(found)
+            self._misses += len(unique_keys) - len(found)
+
+        return found
+
+    def put_many(self, items: Mapping[str, Bc3ClasificacionItem]) -> None:
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, item in items.items():
+            payload = item.model_dump_json(include=_CACHED_FIELDS)
+            rows.append((key, payload, len(key) + len(payload), now))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO bc3_results (key, payload, size, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._evict_locked()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Bc3ResultCacheStats:
+        with self._lock:
+            entries, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM bc3_results"
+            ).fetchone()
+            return Bc3ResultCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                entries=int(entries),
+                size_bytes=int(size_bytes),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict_locked(self) -> None:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM bc3_results"
+        ).fetchone()
+        excess = int(total) - self._max_bytes
+        if excess <= 0:
+            return
+
+        cursor = self._conn.execute(
+            "SELECT key, size FROM bc3_results ORDER BY last_used ASC"
+        )
+        doomed = []
+        for key, size in cursor:
+            doomed.append((key,))
+            excess -= int(size)
+            if excess <= 0:
+                break
+
+        self._conn.executemany("DELETE FROM bc3_results WHERE key = ?", doomed)
+        logger.info(
+            "Cache de resultados BC3: expulsadas %s entradas por tamaño (max_bytes=%s)",
+            len(doomed),
+            self._max_bytes,
+        )
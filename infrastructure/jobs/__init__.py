@@ -0,0 +1 @@
+# infrastructure/jobs/__init__.py
@@ -0,0 +1,29 @@
+# infrastructure/jobs/inline_bc3_job_queue.py
+from __future__ import annotations
+
+import logging
+from typing import Callable
+
+from domain.ports.bc3_job_queue import Bc3JobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class InlineBc3JobQueue(Bc3JobQueue):
+    """
+    Ejecuta cada trabajo en el propio `submit`, sin hilos. Sustituto local
+    de la cola para pruebas: el trabajo ya ha terminado al volver.
+    """
+
+    def submit(self, job_id: str, task: Callable[[], None]) -> bool:
+        try:
+            task()
+        except Exception:
+            logger.exception("Trabajo BC3 terminó con error. job_id=%s", job_id)
+        return True
+
+    def pending(self) -> int:
+        return 0
+
+    def shutdown(self) -> None:
+        return None
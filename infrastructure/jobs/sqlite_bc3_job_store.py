@@ -0,0 +1,283 @@
+# infrastructure/jobs/sqlite_bc3_job_store.py
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping
+
+from domain.models.bc3_classification_models import Bc3ClasificacionItem
+from domain.ports.bc3_job_store import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    Bc3JobRecord,
+    Bc3JobStore,
+)
+
+logger = logging.getLogger(__name__)
+
+_JOB_COLUMNS = (
+    "job_id, status, meta, items_total, batches_done, batches_total, "
+    "error, created_at, updated_at"
+)
+
+
+class SqliteBc3JobStore(Bc3JobStore):
+    """
+    Trabajos BC3 en un único fichero SQLite: una fila por trabajo y una por
+    item resuelto. Los trabajos terminados (o fallidos) hace más de
+    `retention_s` segundos se borran al abrir y, como mucho una vez cada
+    `purge_interval_s`, al crear uno nuevo.
+    """
+
+    def __init__(
+        self,
+        *,
+        path: str | Path,
+        retention_s: float = 24 * 3600,
+        purge_interval_s: float = 3600.0,
+    ) -> None:
+        self._path = Path(path)
+        self._retention_s = max(0.0, float(retention_s))
+        self._purge_interval_s = max(0.0, float(purge_interval_s))
+        self._lock = threading.Lock()
+        self._next_purge_at = 0.0
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self._path),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bc3_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                meta TEXT NOT NULL,
+                items_total INTEGER NOT NULL,
+                batches_done INTEGER NOT NULL DEFAULT 0,
+                batches_total INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bc3_job_items (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (job_id, position)
+            )
+            """
+        )
+        self._purge_finished()
+
+        logger.info(
+            "Almacén de trabajos BC3 abierto. path=%s retention_s=%s",
+            self._path,
+            self._retention_s,
+        )
+
+    def create(
+        self,
+        job_id: str,
+        request: Dict[str, Any],
+        meta: Dict[str, Any],
+        items_total: int,
+    ) -> Bc3JobRecord:
+        if time.monotonic() >= self._next_purge_at:
+            try:
+                self._purge_finished()
+            except Exception as exc:
+                logger.warning("No se pudieron purgar los trabajos BC3 caducados. error=%s", exc)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO bc3_jobs (request, {_JOB_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, 0, 0, NULL, ?, ?)",
+                (
+                    json.dumps(request, ensure_ascii=False),
+                    job_id,
+                    JOB_QUEUED,
+                    json.dumps(meta, ensure_ascii=False),
+                    int(items_total),
+                    now,
+                    now,
+                ),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Bc3JobRecord | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM bc3_jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            (items_done,) = self._conn.execute(
+                "SELECT COUNT(*) FROM bc3_job_items WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._to_record(row, int(items_done))
+
+    def load_request(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT request FROM bc3_jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"Trabajo BC3 desconocido: {job_id}")
+        return json.loads(row[0])
+
+    def claim(self, job_id: str) -> bool:
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE bc3_jobs SET status = ?, updated_at = ? "
+                "WHERE job_id = ? AND status = ?",
+                (JOB_RUNNING, time.time(), job_id, JOB_QUEUED),
+            ).rowcount
+        return claimed == 1
+
+    def requeue_running(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE bc3_jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (JOB_QUEUED, time.time(), JOB_RUNNING),
+            ).rowcount
+
+    def record_progress(
+        self,
+        job_id: str,
+        items: Mapping[int, Bc3ClasificacionItem],
+        batches_done: int,
+        batches_total: int,
+    ) -> None:
+        rows = [
+            (job_id, int(position), item.model_dump_json())
+            for position, item in items.items()
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO bc3_job_items (job_id, position, payload) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute(
+                    "UPDATE bc3_jobs SET batches_done = ?, batches_total = ?, "
+                    "updated_at = ? WHERE job_id = ?",
+                    (int(batches_done), int(batches_total), time.time(), job_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def mark_done(self, job_id: str) -> None:
+        self._set_status(job_id, JOB_DONE)
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        self._set_status(job_id, JOB_FAILED, error=error)
+
+    def items(self, job_id: str) -> List[Bc3ClasificacionItem]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM bc3_job_items WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        return [Bc3ClasificacionItem.model_validate_json(payload) for (payload,) in rows]
+
+    def unfinished(self) -> List[Bc3JobRecord]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_JOB_COLUMNS} FROM bc3_jobs WHERE status IN (?, ?) "
+                "ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+        return [self._to_record(row, 0) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _set_status(self, job_id: str, status: str, *, error: str | None = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE bc3_jobs SET status = ?, error = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+    def _purge_finished(self) -> None:
+        if not self._retention_s:
+            self._next_purge_at = float("inf")
+            return
+
+        self._next_purge_at = time.monotonic() + self._purge_interval_s
+        cutoff = time.time() - self._retention_s
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "DELETE FROM bc3_job_items WHERE job_id IN ("
+                    "SELECT job_id FROM bc3_jobs WHERE status IN (?, ?) "
+                    "AND updated_at < ?)",
+                    (JOB_DONE, JOB_FAILED, cutoff),
+                )
+                removed = self._conn.execute(
+                    "DELETE FROM bc3_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                    (JOB_DONE, JOB_FAILED, cutoff),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if removed:
+            logger.info(
+                "Trabajos BC3 caducados purgados. borrados=%s retention_s=%s",
+                removed,
+                self._retention_s,
+            )
+
+    @staticmethod
+    def _to_record(row: tuple, items_done: int) -> Bc3JobRecord:
+        (
+            job_id,
+            status,
+            meta,
+            items_total,
+            batches_done,
+            batches_total,
+            error,
+            created_at,
+            updated_at,
+        ) = row
+        return Bc3JobRecord(
+            job_id=job_id,
+            status=status,
+            meta=json.loads(meta),
+            items_total=int(items_total),
+            items_done=items_done,
+            batches_done=int(batches_done),
+            batches_total=int(batches_total),
+            error=error,
+            created_at=float(created_at),
+            updated_at=float(updated_at),
+        )
@@ -0,0 +1,58 @@
+# infrastructure/jobs/thread_pool_bc3_job_queue.py
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from domain.ports.bc3_job_queue import Bc3JobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadPoolBc3JobQueue(Bc3JobQueue):
+    """
+    Pool de `max_workers` hilos del propio proceso. Admite como mucho
+    `max_pending` trabajos entre en cola y en ejecución; el resto se
+    rechaza para no acumular trabajo sin límite.
+    """
+
+    def __init__(self, *, max_workers: int = 2, max_pending: int = 100) -> None:
+        self._max_pending = max(1, int(max_pending))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_workers)),
+            thread_name_prefix="bc3-job",
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def submit(self, job_id: str, task: Callable[[], None]) -> bool:
+        with self._lock:
+            if self._pending >= self._max_pending:
+                logger.warning(
+                    "Cola de trabajos BC3 llena; se rechaza. job_id=%s pendientes=%s",
+                    job_id,
+                    self._pending,
+                )
+                return False
+            self._pending += 1
+
+        self._executor.submit(self._run, job_id, task)
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str, task: Callable[[], None]) -> None:
+        try:
+            task()
+        except Exception:
+            logger.exception("Trabajo BC3 terminó con error. job_id=%s", job_id)
+        finally:
+            with self._lock:
+                self._pending -= 1
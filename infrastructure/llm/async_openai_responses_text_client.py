@@ -0,0 +1,142 @@
+# infrastructure/llm/async_openai_responses_text_client.py
+from __future__ import annotations
+
+import logging
+from typing import Any, Type
+
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+
+from domain.models.llm_usage import LlmUsageSink
+from infrastructure.llm.openai_rate_limiter import (
+    OpenAIRateLimiter,
+    estimate_request_tokens,
+)
+from infrastructure.llm.openai_responses_text_client import (
+    build_text_request,
+    usage_from_response,
+)
+from infrastructure.llm.openai_sdk_compat import (
+    patch_openai_pydantic_compat,
+    resolve_openai_base_url,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOpenAIResponsesTextClient:
+    """
+    Variante asíncrona de `OpenAIResponsesTextClient` sobre `AsyncOpenAI`:
+    mismo request y mismo parseo estructurado, sin ocupar un hilo por
+    llamada en vuelo.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        rate_limiter: OpenAIRateLimiter | None = None,
+        lane: str = "interactive",
+    ) -> None:
+        patch_openai_pydantic_compat()
+        http_client = self._build_http_client()
+        client_kwargs: dict[str, Any] = {
+            "api_key": api_key,
+            "base_url": resolve_openai_base_url(base_url),
+            "http_client": http_client,
+        }
+        if rate_limiter is not None:
+            # Los reintentos ante 429/5xx los gestiona el planificador.
+            client_kwargs["max_retries"] = 0
+
+        self._rate_limiter = rate_limiter
+        self._lane = lane
+        self._client = AsyncOpenAI(**client_kwargs)
+
+    @staticmethod
+    def _build_http_client():
+        try:
+            from openai import DefaultAsyncHttpxClient
+
+            return DefaultAsyncHttpxClient()
+        except Exception:
+            import httpx
+
+            return httpx.AsyncClient()
+
+    async def extract_structured(
+        self,
+        *,
+        model: str,
+        system: str,
+        task: str,
+        payload: dict[str, Any],
+        response_model: Type[BaseModel],
+        prompt_cache_key: str | None = None,
+        prompt_cache_retention: str | None = None,
+        usage_sink: LlmUsageSink | None = None,
+        context_text: str | None = None,
+        timeout_s: float | None = None,
+    ) -> BaseModel:
+        request_kwargs = build_text_request(
+            model=model,
+            system=system,
+            task=task,
+            payload=payload,
+            response_model=response_model,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+            context_text=context_text,
+        )
+
+        try:
+            response = await self._parse(request_kwargs, timeout_s)
+        except TypeError:
+            logger.warning(
+                "El SDK actual no acepta prompt_cache_key/prompt_cache_retention. "
+                "Se reintenta sin parámetros de cache."
+            )
+            request_kwargs.pop("prompt_cache_key", None)
+            request_kwargs.pop("prompt_cache_retention", None)
+            response = await self._parse(request_kwargs, timeout_s)
+
+        if usage_sink is not None:
+            usage = usage_from_response(response)
+            if usage is not None:
+                usage_sink(usage)
+
+        if response.output_parsed is None:
+            raise ValueError("OpenAI no devolvió output_parsed en la respuesta.")
+
+        return response.output_parsed
+
+    async def _parse(
+        self,
+        request_kwargs: dict[str, Any],
+        timeout_s: float | None = None,
+    ) -> Any:
+        if self._rate_limiter is None:
+            if timeout_s is not None:
+                return await self._client.responses.parse(**request_kwargs, timeout=timeout_s)
+            return await self._client.responses.parse(**request_kwargs)
+
+        async def _send(remaining_s: float | None) -> Any:
+            options: dict[str, Any] = {}
+            if remaining_s is not None:
+                options["timeout"] = remaining_s
+            raw = await self._client.responses.with_raw_response.parse(
+                **request_kwargs,
+                **options,
+            )
+            self._rate_limiter.observe_headers(raw.headers)
+            return raw.parse()
+
+        return await self._rate_limiter.call_async(
+            _send,
+            estimated_tokens=estimate_request_tokens(request_kwargs),
+            lane=self._lane,
+            timeout_s=timeout_s,
+        )
+
+    async def aclose(self) -> None:
+        await self._client.close()
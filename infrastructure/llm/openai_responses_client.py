@@ -4,23 +4,47 @@ from __future__ import annotations
 import base64
 import logging
 import re
-from typing import Type
+from typing import Any, Type
 
 from openai import OpenAI
 from pydantic import BaseModel
 
 from domain.models.llm_attachment import LlmAttachment
 from domain.ports.llm_client import LlmVisionClient
-from infrastructure.llm.openai_sdk_compat import patch_openai_pydantic_compat
+from infrastructure.llm.openai_rate_limiter import (
+    OpenAIRateLimiter,
+    estimate_request_tokens,
+)
+from infrastructure.llm.openai_sdk_compat import (
+    patch_openai_pydantic_compat,
+    resolve_openai_base_url,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class OpenAIResponsesVisionClient(LlmVisionClient):
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        rate_limiter: OpenAIRateLimiter | None = None,
+        lane: str = "interactive",
+    ) -> None:
         patch_openai_pydantic_compat()
         http_client = self._build_http_client()
-        self._client = OpenAI(api_key=api_key, http_client=http_client)
+        client_kwargs: dict[str, Any] = {
+            "api_key": api_key,
+            "base_url": resolve_openai_base_url(base_url),
+            "http_client": http_client,
+        }
+        if rate_limiter is not None:
+            # Los reintentos ante 429/5xx los gestiona el planificador.
+            client_kwargs["max_retries"] = 0
+
+        self._rate_limiter = rate_limiter
+        self._lane = lane
+        self._client = OpenAI(**client_kwargs)
 
     @staticmethod
     def _build_http_client():
@@ -84,14 +108,44 @@ class OpenAIResponsesVisionClient(LlmVisionClient):
                 },
             ]
 
-        response = self._client.responses.parse(
-            model=model,
-            instructions=instructions,
-            input=[{"role": "user", "content": content}],
-            text_format=response_model,
+        response = self._parse(
+            {
+                "model": model,
+                "instructions": instructions,
+                "input": [{"role": "user", "content": content}],
+                "text_format": response_model,
+            }
         )
 
         if response.output_parsed is None:
             raise ValueError("OpenAI no devolvió output_parsed en la respuesta.")
 
         return response.output_parsed
+
+    def _parse(
+        self,
+        request_kwargs: dict[str, Any],
+        timeout_s: float | None = None,
+    ) -> Any:
+        if self._rate_limiter is None:
+            if timeout_s is not None:
+                return self._client.responses.parse(**request_kwargs, timeout=timeout_s)
+            return self._client.responses.parse(**request_kwargs)
+
+        def _send(remaining_s: float | None) -> Any:
+            options: dict[str, Any] = {}
+            if remaining_s is not None:
+                options["timeout"] = remaining_s
+            raw = self._client.responses.with_raw_response.parse(
+                **request_kwargs,
+                **options,
+            )
+            self._rate_limiter.observe_headers(raw.headers)
+            return raw.parse()
+
+        return self._rate_limiter.call(
+            _send,
+            estimated_tokens=estimate_request_tokens(request_kwargs),
+            lane=self._lane,
+            timeout_s=timeout_s,
+        )
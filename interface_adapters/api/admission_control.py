@@ -0,0 +1,250 @@
+# interface_adapters/api/admission_control.py
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Mapping, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SERVICE_TIME_WEIGHT = 0.2
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class AdmissionLimit:
+    max_concurrent: int
+    max_queued: int
+
+
+@dataclass(frozen=True)
+class AdmissionRejection:
+    status_code: int
+    retry_after_s: int
+    detail: str
+
+
+@dataclass(frozen=True)
+class AdmissionStats:
+    in_flight: int
+    queued: int
+    max_concurrent: int
+    max_queued: int
+    admitted: int
+    rejected_queue_full: int
+    rejected_timeout: int
+    avg_service_s: float
+
+
+class _Waiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+        self.granted = False
+
+    def wake(self) -> None:
+        self.loop.call_soon_threadsafe(self._set)
+
+    def _set(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class _Lane:
+    def __init__(self, limit: AdmissionLimit) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: deque[_Waiter] = deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.avg_service_s = 0.0
+
+
+class AdmissionController:
+    """
+    Límite de trabajo simultáneo por grupo de endpoints: hasta
+    `max_concurrent` en curso y `max_queued` esperando turno (FIFO). Con la
+    cola llena se rechaza al momento (429) y quien espera más de
+    `queue_timeout_s` sale con 503; ambos llevan un Retry-After estimado con
+    el tiempo medio de servicio del grupo.
+    """
+
+    def __init__(
+        self,
+        *,
+        limits: Mapping[str, AdmissionLimit],
+        queue_timeout_s: float = 30.0,
+    ) -> None:
+        self._queue_timeout_s = max(0.0, float(queue_timeout_s))
+        self._lock = threading.Lock()
+        self._lanes = {
+            key: _Lane(limit)
+            for key, limit in limits.items()
+            if limit.max_concurrent > 0
+        }
+
+    async def acquire(self, key: str) -> AdmissionRejection | None:
+        """None si el request entra; si no, el rechazo a devolver."""
+        lane = self._lanes.get(key)
+        if lane is None:
+            return None
+
+        with self._lock:
+            if lane.in_flight < lane.limit.max_concurrent and not lane.waiters:
+                lane.in_flight += 1
+                lane.admitted += 1
+                return None
+            if len(lane.waiters) >= lane.limit.max_queued:
+                lane.rejected_queue_full += 1
+                return self._reject_locked(
+                    lane,
+                    429,
+                    f"Demasiados requests en cola para {key}.",
+                )
+            waiter = _Waiter(asyncio.get_running_loop())
+            lane.waiters.append(waiter)
+
+        try:
+            await asyncio.wait({waiter.future}, timeout=self._queue_timeout_s or None)
+        except asyncio.CancelledError:
+            # Cliente desconectado mientras esperaba: si ya tenía el turno,
+            # se pasa al siguiente.
+            with self._lock:
+                if not waiter.granted:
+                    lane.waiters.remove(waiter)
+                    raise
+            self.release(key, None)
+            raise
+
+        with self._lock:
+            if waiter.granted:
+                lane.admitted += 1
+                return None
+            lane.waiters.remove(waiter)
+            lane.rejected_timeout += 1
+            return self._reject_locked(
+                lane,
+                503,
+                f"Tiempo de espera agotado en la cola de {key}.",
+            )
+
+    def release(self, key: str, elapsed_s: float | None) -> None:
+        lane = self._lanes.get(key)
+        if lane is None:
+            return
+
+        with self._lock:
+            if elapsed_s is not None:
+                if lane.avg_service_s:
+                    lane.avg_service_s += _SERVICE_TIME_WEIGHT * (
+                        elapsed_s - lane.avg_service_s
+                    )
+                else:
+                    lane.avg_service_s = elapsed_s
+
+            if lane.waiters:
+                # El hueco pasa directamente al primero de la cola.
+                waiter = lane.waiters.popleft()
+                waiter.granted = True
+                waiter.wake()
+                return
+            lane.in_flight -= 1
+
+    def stats(self) -> Dict[str, AdmissionStats]:
+        with self._lock:
+            return {
+                key: AdmissionStats(
+                    in_flight=lane.in_flight,
+                    queued=len(lane.waiters),
+                    max_concurrent=lane.limit.max_concurrent,
+                    max_queued=lane.limit.max_queued,
+                    admitted=lane.admitted,
+                    rejected_queue_full=lane.rejected_queue_full,
+                    rejected_timeout=lane.rejected_timeout,
+                    avg_service_s=round(lane.avg_service_s, 3),
+                )
+                for key, lane in self._lanes.items()
+            }
+
+    @staticmethod
+    def _reject_locked(lane: _Lane, status_code: int, detail: str) -> AdmissionRejection:
+        # Tiempo hasta que se vacíe lo que hay por delante, al menos 1 s.
+        ahead = len(lane.waiters) + 1
+        retry_after_s = lane.avg_service_s * ahead / lane.limit.max_concurrent
+        logger.warning(
+            "Admisión rechazada. status=%s en_curso=%s en_cola=%s detalle=%s",
+            status_code,
+            lane.in_flight,
+            len(lane.waiters),
+            detail,
+        )
+        return AdmissionRejection(
+            status_code=status_code,
+            retry_after_s=max(1, math.ceil(retry_after_s)),
+            detail=detail,
+        )
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI: aplica el `AdmissionController` a las rutas de
+    `routes` ((método, path) -> grupo) antes de leer el cuerpo del request,
+    así una avalancha de subidas no se acumula en memoria. El hueco se
+    libera cuando termina la respuesta (incluidas las de streaming).
+    """
+
+    def __init__(
+        self,
+        app: Callable[[Scope, Receive, Send], Awaitable[None]],
+        *,
+        controller: AdmissionController,
+        routes: Mapping[Tuple[str, str], str],
+    ) -> None:
+        self._app = app
+        self._controller = controller
+        self._routes = dict(routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        key = None
+        if scope["type"] == "http":
+            key = self._routes.get((scope["method"], scope["path"]))
+        if key is None:
+            await self._app(scope, receive, send)
+            return
+
+        rejection = await self._controller.acquire(key)
+        if rejection is not None:
+            await self._send_rejection(send, rejection)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            self._controller.release(key, time.perf_counter() - started)
+
+    @staticmethod
+    async def _send_rejection(send: Send, rejection: AdmissionRejection) -> None:
+        body = json.dumps({"detail": rejection.detail}, ensure_ascii=False).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": rejection.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(rejection.retry_after_s).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -1,29 +1,54 @@
 # interface_adapters/api/app.py
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import json
 import logging
 import mimetypes
+from dataclasses import asdict
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
 
 from application.pipelines.bc3_classification_pipeline import Bc3ClassificationPipeline
+from application.pipelines.bc3_micro_batcher import Bc3MicroBatcher
+from application.services.bc3_batch_planner import Bc3BatchPlanner
+from application.services.bc3_job_service import Bc3JobService
+from application.services.bounded_call_executor import BoundedCallExecutor
 from application.services.catalog_candidate_selector import CatalogCandidateSelector
+from application.services.llm_circuit_breaker import LlmCircuitBreaker
 from application.services.prompted_extraction_service import PromptedExtractionService
 from application.services.prompted_text_extraction_service import PromptedTextExtractionService
+from application.services.request_coalescer import RequestCoalescer
 from application.services.schema_registry import SchemaRegistry
 from config.settings import Settings
 from domain.models.bc3_classification_models import Bc3ClassificationRequest
 from domain.models.llm_attachment import LlmAttachment
+from domain.ports.bc3_job_queue import Bc3JobQueue
+from domain.ports.bc3_job_store import JOB_DONE, Bc3JobRecord
+from infrastructure.cache.jsonl_bc3_job_journal import JsonlBc3JobJournal
+from infrastructure.cache.sqlite_bc3_result_cache import SqliteBc3ResultCache
+from infrastructure.catalog.compact_catalog_yaml_repository import CompactCatalogYamlRepository
 from infrastructure.catalog.product_catalog_cache import ProductCatalogCache
+from infrastructure.jobs.sqlite_bc3_job_store import SqliteBc3JobStore
+from infrastructure.jobs.thread_pool_bc3_job_queue import ThreadPoolBc3JobQueue
+from infrastructure.llm.async_openai_responses_text_client import (
+    AsyncOpenAIResponsesTextClient,
+)
+from infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from infrastructure.llm.openai_responses_client import OpenAIResponsesVisionClient
 from infrastructure.llm.openai_responses_text_client import OpenAIResponsesTextClient
 from infrastructure.prompts.yaml_prompt_repository import YamlPromptRepository
+from interface_adapters.api.admission_control import (
+    AdmissionControlMiddleware,
+    AdmissionController,
+    AdmissionLimit,
+)
 from interface_adapters.api.bc3_models import Bc3ClassifyApiRequest
 
 logger = logging.getLogger(__name__)
@@ -47,34 +72,218 @@ def _sha256_obj(obj: Dict[str, Any]) -> str:
     return hashlib.sha256(raw).hexdigest()
 
 
-def build_app(settings: Settings) -> FastAPI:
+def _ndjson_line(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _epoch_iso(value: float) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+def _job_status(record: Bc3JobRecord) -> Dict[str, Any]:
+    return {
+        "job_id": record.job_id,
+        "status": record.status,
+        "progress": {
+            "batches_done": record.batches_done,
+            "batches_total": record.batches_total,
+            "items_done": record.items_done,
+            "items_total": record.items_total,
+        },
+        "error": record.error,
+        "created_at_utc": _epoch_iso(record.created_at),
+        "updated_at_utc": _epoch_iso(record.updated_at),
+    }
+
+
+def build_app(
+    settings: Settings,
+    *,
+    bc3_job_queue: Bc3JobQueue | None = None,
+) -> FastAPI:
+    """
+    `bc3_job_queue` sustituye al pool de hilos de los trabajos BC3 (p. ej.
+    `InlineBc3JobQueue` en pruebas).
+    """
     prompt_repo = YamlPromptRepository(settings.prompts_yaml_path)
     schema_registry = SchemaRegistry()
 
-    llm_vision = OpenAIResponsesVisionClient(api_key=settings.openai_api_key)
+    # Un único planificador: visión y texto comparten las cuotas de la cuenta.
+    rate_limiter = OpenAIRateLimiter(
+        requests_per_minute=settings.openai_rpm_limit,
+        tokens_per_minute=settings.openai_tpm_limit,
+        max_retries=settings.openai_rate_limit_max_retries,
+        backoff_base_s=settings.openai_backoff_base_s,
+        backoff_max_s=settings.openai_backoff_max_s,
+    )
+    llm_vision = OpenAIResponsesVisionClient(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        rate_limiter=rate_limiter,
+    )
     extractor_vision = PromptedExtractionService(
         llm_client=llm_vision,
         prompt_repo=prompt_repo,
         schema_registry=schema_registry,
         model=settings.openai_model,
     )
+    # La extracción por visión usa el SDK síncrono: va a un pool propio para
+    # no bloquear el event loop mientras espera a OpenAI.
+    vision_executor = BoundedCallExecutor(
+        name="vision",
+        max_workers=settings.vision_max_concurrency,
+        warn_queue_depth=settings.vision_queue_warn_depth,
+    )
 
-    llm_text = OpenAIResponsesTextClient(api_key=settings.openai_api_key)
+    llm_text = OpenAIResponsesTextClient(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        rate_limiter=rate_limiter,
+    )
+    # /v1/bc3/classify corre sobre el event loop con el cliente asíncrono.
+    llm_text_async = AsyncOpenAIResponsesTextClient(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        rate_limiter=rate_limiter,
+    )
     extractor_text = PromptedTextExtractionService(
         llm_client=llm_text,
         prompt_repo=prompt_repo,
         schema_registry=schema_registry,
         model=settings.openai_model,
+        async_llm_client=llm_text_async,
+    )
+    # Los trabajos asíncronos van por el carril bulk: no adelantan a las
+    # llamadas interactivas en el planificador compartido.
+    extractor_text_jobs = PromptedTextExtractionService(
+        llm_client=OpenAIResponsesTextClient(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            rate_limiter=rate_limiter,
+            lane="bulk",
+        ),
+        prompt_repo=prompt_repo,
+        schema_registry=schema_registry,
+        model=settings.openai_model,
+    )
+
+    circuit_breaker = LlmCircuitBreaker(
+        failure_threshold=settings.bc3_llm_circuit_failure_threshold,
+        cooldown_s=settings.bc3_llm_circuit_cooldown_s,
     )
 
-    bc3_pipeline = Bc3ClassificationPipeline(
-        extractor=extractor_text,
-        selector=CatalogCandidateSelector(),
+    result_cache = None
+    if settings.bc3_result_cache_enabled:
+        result_cache = SqliteBc3ResultCache(
+            path=settings.bc3_result_cache_path,
+            max_bytes=settings.bc3_result_cache_max_mb * 1024 * 1024,
+        )
+
+    def _build_bc3_pipeline(
+        extractor: PromptedTextExtractionService,
+        *,
+        request_deadline_s: float,
+    ) -> Bc3ClassificationPipeline:
+        return Bc3ClassificationPipeline(
+            extractor=extractor,
+            selector=CatalogCandidateSelector(
+                prefilter_limit=settings.bc3_selector_prefilter_limit,
+                full_rerank=settings.bc3_selector_full_rerank,
+                similarity=settings.bc3_selector_similarity,
+            ),
+            catalog_repository=CompactCatalogYamlRepository(settings.bc3_catalog_yaml_path),
+            prompt_cache_enabled=settings.bc3_use_prompt_cache,
+            prompt_cache_key_prefix=settings.bc3_prompt_cache_key_prefix,
+            prompt_cache_retention=settings.bc3_prompt_cache_retention,
+            selector_engine=settings.bc3_selector_engine,
+            dedup_enabled=settings.bc3_dedup_enabled,
+            fast_path_enabled=settings.bc3_fast_path_enabled,
+            fast_path_min_confidence=settings.bc3_fast_path_min_confidence,
+            fast_path_min_margin=settings.bc3_fast_path_min_margin,
+            result_cache=result_cache,
+            llm_max_concurrency=settings.bc3_llm_max_concurrency,
+            llm_retry_budget=settings.bc3_llm_retry_budget,
+            prompt_layout=settings.bc3_prompt_layout,
+            circuit_breaker=circuit_breaker,
+            llm_call_timeout_s=settings.bc3_llm_call_timeout_s,
+            request_deadline_s=request_deadline_s,
+            batch_planner=Bc3BatchPlanner(
+                max_input_tokens=settings.bc3_batch_max_input_tokens,
+                max_output_tokens=settings.bc3_batch_max_output_tokens,
+            ),
+        )
+
+    bc3_pipeline = _build_bc3_pipeline(
+        extractor_text,
+        request_deadline_s=settings.bc3_request_deadline_s,
     )
+    bc3_micro_batcher = None
+    if settings.bc3_micro_batch_enabled:
+        bc3_micro_batcher = Bc3MicroBatcher(
+            pipeline=bc3_pipeline,
+            max_wait_ms=settings.bc3_micro_batch_max_wait_ms,
+            max_items=settings.bc3_micro_batch_max_items,
+        )
+    bc3_coalescer = None
+    if settings.bc3_coalesce_enabled:
+        bc3_coalescer = RequestCoalescer(
+            ttl_s=settings.bc3_coalesce_ttl_s,
+            max_entries=settings.bc3_coalesce_max_entries,
+        )
+    bc3_job_service = None
+    if settings.bc3_jobs_enabled:
+        job_journal = None
+        if settings.bc3_job_journal_enabled:
+            job_journal = JsonlBc3JobJournal(
+                directory=settings.bc3_job_journal_dir,
+                max_age_s=settings.bc3_job_journal_max_age_h * 3600,
+            )
+        bc3_job_service = Bc3JobService(
+            # Sin plazo por request: un trabajo largo no debe acabar en fallback.
+            pipeline=_build_bc3_pipeline(extractor_text_jobs, request_deadline_s=0),
+            store=SqliteBc3JobStore(
+                path=settings.bc3_jobs_store_path,
+                retention_s=settings.bc3_jobs_retention_h * 3600,
+            ),
+            queue=bc3_job_queue
+            or ThreadPoolBc3JobQueue(
+                max_workers=settings.bc3_jobs_max_workers,
+                max_pending=settings.bc3_jobs_max_pending,
+            ),
+            journal=job_journal,
+        )
+        bc3_job_service.resume_unfinished()
     catalog_cache = ProductCatalogCache()
 
     app = FastAPI(title="OCR + BC3 Classifier Service", version="0.6.0")
 
+    admission = None
+    if settings.api_admission_enabled:
+        bc3_limit = AdmissionLimit(
+            max_concurrent=settings.api_bc3_max_concurrent,
+            max_queued=settings.api_bc3_max_queued,
+        )
+        admission = AdmissionController(
+            limits={
+                "extract": AdmissionLimit(
+                    max_concurrent=settings.api_extract_max_concurrent,
+                    max_queued=settings.api_extract_max_queued,
+                ),
+                "bc3_classify": bc3_limit,
+            },
+            queue_timeout_s=settings.api_admission_queue_timeout_s,
+        )
+        # Antes que CORS: los 429/503 también llevan sus cabeceras.
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            controller=admission,
+            routes={
+                ("POST", "/v1/extract"): "extract",
+                ("POST", "/v1/bc3/classify"): "bc3_classify",
+                ("POST", "/v1/bc3/classify/stream"): "bc3_classify",
+            },
+        )
+
     if settings.cors_allow_origins:
         origins = _parse_origins(settings.cors_allow_origins)
         if origins:
@@ -89,7 +298,21 @@ def build_app(settings: Settings) -> FastAPI:
 
     @app.get("/health")
     def health() -> Dict[str, Any]:
-        return {"ok": True}
+        circuit = circuit_breaker.snapshot()
+        health = {
+            "ok": True,
+            "llm_available": circuit.state != "open",
+            "llm_circuit": asdict(circuit),
+            "llm_rate_limit": asdict(rate_limiter.stats()),
+            "vision_executor": asdict(vision_executor.stats()),
+        }
+        if bc3_coalescer is not None:
+            health["coalescer"] = asdict(bc3_coalescer.stats())
+        if admission is not None:
+            health["admission"] = {
+                key: asdict(stats) for key, stats in admission.stats().items()
+            }
+        return health
 
     @app.post("/v1/extract")
     async def extract(
@@ -121,7 +344,8 @@ def build_app(settings: Settings) -> FastAPI:
                 data=data,
             )
 
-        parsed, schema_name = extractor_vision.extract(
+        parsed, schema_name = await vision_executor.run(
+            extractor_vision.extract,
             prompt_key=prompt_key,
             attachment=attachment,
         )
@@ -148,8 +372,9 @@ def build_app(settings: Settings) -> FastAPI:
         catalog_cache.clear()
         return {"ok": True}
 
-    @app.post("/v1/bc3/classify")
-    def bc3_classify(req_dict: Dict[str, Any]) -> Dict[str, Any]:
+    def _prepare_bc3_request(
+        req_dict: Dict[str, Any],
+    ) -> tuple[Bc3ClassificationRequest, Dict[str, Any], str]:
         try:
             api_req = Bc3ClassifyApiRequest.model_validate(req_dict)
         except ValidationError as exc:
@@ -198,12 +423,6 @@ def build_app(settings: Settings) -> FastAPI:
             llm_batch_size=llm_batch_size,
         )
 
-        try:
-            result = bc3_pipeline.run(domain_req)
-        except Exception as exc:
-            logger.exception("Error BC3 classify")
-            raise HTTPException(status_code=500, detail=str(exc)) from exc
-
         sha_payload = {
             "prompt_key": api_req.prompt_key,
             "bc3_id": api_req.bc3_id,
@@ -217,22 +436,145 @@ def build_app(settings: Settings) -> FastAPI:
         }
         source_sha256 = _sha256_obj(sha_payload)
 
+        meta = {
+            "prompt_key": api_req.prompt_key,
+            "schema": "bc3_clasificacion_resultado",
+            "source_filename": (api_req.bc3_id or "bc3") + ".json",
+            "source_mime_type": "application/json",
+            "source_sha256": source_sha256,
+            "model": settings.openai_model,
+            "processed_at_utc": _utc_iso(),
+            "context": {
+                "catalog_source": catalog_source,
+                "llm_batch_size": llm_batch_size,
+                "descompuestos_count": len(api_req.descompuestos),
+            },
+        }
+        # El sha del sobre no incluye un catálogo inline; para agrupar
+        # duplicados la clave sí debe distinguirlo.
+        coalesce_key = source_sha256
+        if catalog_source["mode"] == "inline":
+            coalesce_key = _sha256_obj(
+                {
+                    "source_sha256": source_sha256,
+                    "catalogo": [
+                        item.model_dump(exclude_none=True) for item in catalogo
+                    ],
+                }
+            )
+        return domain_req, meta, coalesce_key
+
+    @app.post("/v1/bc3/classify")
+    async def bc3_classify(req_dict: Dict[str, Any]) -> Dict[str, Any]:
+        # La carga del catálogo xlsx es bloqueante: va a un hilo.
+        domain_req, meta, coalesce_key = await asyncio.to_thread(
+            _prepare_bc3_request,
+            req_dict,
+        )
+
+        async def _classify() -> Dict[str, Any]:
+            if bc3_micro_batcher is not None:
+                result = await bc3_micro_batcher.run_async(domain_req)
+            else:
+                result = await bc3_pipeline.run_async(domain_req)
+            return {
+                "meta": meta,
+                "data": result.model_dump(),
+            }
+
+        try:
+            if bc3_coalescer is not None:
+                return await bc3_coalescer.run_async(coalesce_key, _classify)
+            return await _classify()
+        except Exception as exc:
+            logger.exception("Error BC3 classify")
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    def _require_job_service() -> Bc3JobService:
+        if bc3_job_service is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Trabajos BC3 desactivados (BC3_JOBS_ENABLED=false).",
+            )
+        return bc3_job_service
+
+    def _require_job(job_id: str) -> Bc3JobRecord:
+        record = _require_job_service().get(job_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Trabajo desconocido: {job_id}")
+        return record
+
+    @app.post("/v1/bc3/jobs", status_code=202)
+    def bc3_job_create(req_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión asíncrona de /v1/bc3/classify para presupuestos grandes:
+        devuelve el id del trabajo sin esperar a la clasificación.
+        """
+        service = _require_job_service()
+        domain_req, meta, _ = _prepare_bc3_request(req_dict)
+
+        record = service.submit(domain_req, meta)
+        if record is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Cola de trabajos BC3 llena. Reintenta más tarde.",
+            )
+
         return {
-            "meta": {
-                "prompt_key": api_req.prompt_key,
-                "schema": "bc3_clasificacion_resultado",
-                "source_filename": (api_req.bc3_id or "bc3") + ".json",
-                "source_mime_type": "application/json",
-                "source_sha256": source_sha256,
-                "model": settings.openai_model,
-                "processed_at_utc": _utc_iso(),
-                "context": {
-                    "catalog_source": catalog_source,
-                    "llm_batch_size": llm_batch_size,
-                    "descompuestos_count": len(api_req.descompuestos),
-                },
+            **_job_status(record),
+            "status_url": f"/v1/bc3/jobs/{record.job_id}",
+            "result_url": f"/v1/bc3/jobs/{record.job_id}/result",
+        }
+
+    @app.get("/v1/bc3/jobs/{job_id}")
+    def bc3_job_status(job_id: str, include_results: bool = True) -> Dict[str, Any]:
+        """Estado, progreso por lotes y, si se piden, los items ya resueltos."""
+        record = _require_job(job_id)
+        body = _job_status(record)
+        if include_results:
+            body["resultados"] = [
+                item.model_dump() for item in bc3_job_service.items(job_id)
+            ]
+        return body
+
+    @app.get("/v1/bc3/jobs/{job_id}/result")
+    def bc3_job_result(job_id: str) -> Dict[str, Any]:
+        """Sobre final (mismo formato que /v1/bc3/classify)."""
+        record = _require_job(job_id)
+        if record.status != JOB_DONE:
+            raise HTTPException(status_code=409, detail=_job_status(record))
+
+        return {
+            "meta": record.meta,
+            "data": {
+                "resultados": [
+                    item.model_dump() for item in bc3_job_service.items(job_id)
+                ],
             },
-            "data": result.model_dump(),
         }
 
+    @app.post("/v1/bc3/classify/stream")
+    def bc3_classify_stream(req_dict: Dict[str, Any]) -> StreamingResponse:
+        """
+        Igual que /v1/bc3/classify pero en NDJSON: una línea `meta`, una
+        línea `item` por descompuesto según se resuelve cada lote y una línea
+        `end` (o `error` si el pipeline falla a mitad).
+        """
+        domain_req, meta, _ = _prepare_bc3_request(req_dict)
+
+        def _lines() -> Iterator[bytes]:
+            yield _ndjson_line({"type": "meta", "meta": meta})
+            count = 0
+            try:
+                for item in bc3_pipeline.run_iter(domain_req):
+                    count += 1
+                    yield _ndjson_line({"type": "item", "item": item.model_dump()})
+            except Exception as exc:
+                logger.exception("Error BC3 classify stream")
+                yield _ndjson_line({"type": "error", "detail": str(exc), "count": count})
+                return
+            yield _ndjson_line({"type": "end", "count": count})
+
+        return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
     return app
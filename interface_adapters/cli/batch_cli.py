@@ -6,6 +6,7 @@ from pathlib import Path
 
 from config.settings import Settings
 from infrastructure.prompts.yaml_prompt_repository import YamlPromptRepository
+from infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from infrastructure.llm.openai_responses_client import OpenAIResponsesVisionClient
 from infrastructure.document.pdf_renderer import PdfRenderer
 from infrastructure.document.file_loader import FileLoader
@@ -16,7 +17,18 @@ from application.pipelines.batch_folder_pipeline import BatchFolderPipeline, Bat
 
 def build_batch_pipeline(settings: Settings) -> BatchFolderPipeline:
     prompt_repo = YamlPromptRepository(settings.prompts_yaml_path)
-    llm_client = OpenAIResponsesVisionClient(settings.openai_api_key)
+    rate_limiter = OpenAIRateLimiter(
+        requests_per_minute=settings.openai_rpm_limit,
+        tokens_per_minute=settings.openai_tpm_limit,
+        max_retries=settings.openai_rate_limit_max_retries,
+        backoff_base_s=settings.openai_backoff_base_s,
+        backoff_max_s=settings.openai_backoff_max_s,
+    )
+    llm_client = OpenAIResponsesVisionClient(
+        api_key=settings.openai_api_key,
+        rate_limiter=rate_limiter,
+        lane="bulk",
+    )
     extractor = OcrExtractorService(llm_client=llm_client, prompt_repo=prompt_repo, model=settings.openai_model)
     ocr_pipeline = OcrExtractionPipeline(extractor=extractor)
 
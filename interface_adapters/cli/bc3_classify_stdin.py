@@ -18,9 +18,11 @@ from application.services.schema_registry import SchemaRegistry
 from config.logging_config import configure_logging
 from config.settings import Settings
 from domain.models.bc3_classification_models import Bc3ClassificationRequest
+from infrastructure.cache.jsonl_bc3_job_journal import JsonlBc3JobJournal
 from infrastructure.catalog.compact_catalog_yaml_repository import (
     CompactCatalogYamlRepository,
 )
+from infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from infrastructure.llm.openai_responses_text_client import OpenAIResponsesTextClient
 from infrastructure.prompts.yaml_prompt_repository import YamlPromptRepository
 
@@ -82,7 +84,18 @@ def main() -> int:
     schema_registry = SchemaRegistry()
     catalog_repo = CompactCatalogYamlRepository(settings.bc3_catalog_yaml_path)
 
-    llm_text = OpenAIResponsesTextClient(api_key=settings.openai_api_key)
+    rate_limiter = OpenAIRateLimiter(
+        requests_per_minute=settings.openai_rpm_limit,
+        tokens_per_minute=settings.openai_tpm_limit,
+        max_retries=settings.openai_rate_limit_max_retries,
+        backoff_base_s=settings.openai_backoff_base_s,
+        backoff_max_s=settings.openai_backoff_max_s,
+    )
+    llm_text = OpenAIResponsesTextClient(
+        api_key=settings.openai_api_key,
+        rate_limiter=rate_limiter,
+        lane=settings.llm_lane,
+    )
     extractor_text = PromptedTextExtractionService(
         llm_client=llm_text,
         prompt_repo=prompt_repo,
@@ -90,6 +103,13 @@ def main() -> int:
         model=settings.openai_model,
     )
 
+    job_journal = None
+    if settings.bc3_job_journal_enabled:
+        job_journal = JsonlBc3JobJournal(
+            directory=settings.bc3_job_journal_dir,
+            max_age_s=settings.bc3_job_journal_max_age_h * 3600,
+        )
+
     pipeline = Bc3ClassificationPipeline(
         extractor=extractor_text,
         selector=CatalogCandidateSelector(),
@@ -111,7 +131,7 @@ def main() -> int:
         [item.id for item in req.descompuestos],
     )
 
-    result = pipeline.run(req)
+    result = pipeline.run(req, journal=job_journal)
 
     meta_sha = _sha256_json(req.model_dump(exclude_none=True))
     envelope = {
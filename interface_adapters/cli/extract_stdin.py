@@ -14,6 +14,7 @@ from typing import Any, Dict
 from config.logging_config import configure_logging
 from config.settings import Settings
 from infrastructure.prompts.yaml_prompt_repository import YamlPromptRepository
+from infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from infrastructure.llm.openai_responses_client import OpenAIResponsesVisionClient
 from application.services.schema_registry import SchemaRegistry
 from application.services.prompted_extraction_service import PromptedExtractionService
@@ -91,7 +92,18 @@ def main() -> int:
 
     # Construcción servicios (misma lógica que tu API)
     prompt_repo = YamlPromptRepository(settings.prompts_yaml_path)
-    llm_client = OpenAIResponsesVisionClient(api_key=settings.openai_api_key)
+    rate_limiter = OpenAIRateLimiter(
+        requests_per_minute=settings.openai_rpm_limit,
+        tokens_per_minute=settings.openai_tpm_limit,
+        max_retries=settings.openai_rate_limit_max_retries,
+        backoff_base_s=settings.openai_backoff_base_s,
+        backoff_max_s=settings.openai_backoff_max_s,
+    )
+    llm_client = OpenAIResponsesVisionClient(
+        api_key=settings.openai_api_key,
+        rate_limiter=rate_limiter,
+        lane=settings.llm_lane,
+    )
     schema_registry = SchemaRegistry()
 
     extractor = PromptedExtractionService(
@@ -16,6 +16,7 @@ from config.settings import Settings
 from domain.models.llm_attachment import LlmAttachment
 from infrastructure.fs.input_scanner import InputScanner
 from infrastructure.fs.output_writer import OutputWriter
+from infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from infrastructure.llm.openai_responses_client import OpenAIResponsesVisionClient
 from infrastructure.prompts.yaml_prompt_repository import YamlPromptRepository
 
@@ -36,7 +37,18 @@ def run_batch(settings: Settings) -> int:
     - Opcionalmente genera un Excel SOLO para residuos (simulación servicio 3, borrable)
     """
     prompt_repo = YamlPromptRepository(settings.prompts_yaml_path)
-    llm_client = OpenAIResponsesVisionClient(api_key=settings.openai_api_key)
+    rate_limiter = OpenAIRateLimiter(
+        requests_per_minute=settings.openai_rpm_limit,
+        tokens_per_minute=settings.openai_tpm_limit,
+        max_retries=settings.openai_rate_limit_max_retries,
+        backoff_base_s=settings.openai_backoff_base_s,
+        backoff_max_s=settings.openai_backoff_max_s,
+    )
+    llm_client = OpenAIResponsesVisionClient(
+        api_key=settings.openai_api_key,
+        rate_limiter=rate_limiter,
+        lane="bulk",
+    )
 
     from application.services.schema_registry import SchemaRegistry
     from application.services.prompted_extraction_service import PromptedExtractionService
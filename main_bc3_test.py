@@ -9,7 +9,9 @@ from pathlib import Path
 from typing import Any, Dict
 
 from application.pipelines.bc3_classification_pipeline import Bc3ClassificationPipeline
+from application.services.bc3_batch_planner import Bc3BatchPlanner
 from application.services.catalog_candidate_selector import CatalogCandidateSelector
+from application.services.llm_circuit_breaker import LlmCircuitBreaker
 from application.services.prompted_text_extraction_service import (
     PromptedTextExtractionService,
 )
@@ -17,9 +19,12 @@ from application.services.schema_registry import SchemaRegistry
 from config.logging_config import configure_logging
 from config.settings import Settings
 from domain.models.bc3_classification_models import Bc3ClassificationRequest
+from infrastructure.cache.jsonl_bc3_job_journal import JsonlBc3JobJournal
+from infrastructure.cache.sqlite_bc3_result_cache import SqliteBc3ResultCache
 from infrastructure.catalog.compact_catalog_yaml_repository import (
     CompactCatalogYamlRepository,
 )
+from infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from infrastructure.llm.openai_responses_text_client import OpenAIResponsesTextClient
 from infrastructure.prompts.yaml_prompt_repository import YamlPromptRepository
 
@@ -68,7 +73,18 @@ def main() -> int:
 
     prompt_repo = YamlPromptRepository(settings.prompts_yaml_path)
     schema_registry = SchemaRegistry()
-    llm_text = OpenAIResponsesTextClient(api_key=settings.openai_api_key)
+    rate_limiter = OpenAIRateLimiter(
+        requests_per_minute=settings.openai_rpm_limit,
+        tokens_per_minute=settings.openai_tpm_limit,
+        max_retries=settings.openai_rate_limit_max_retries,
+        backoff_base_s=settings.openai_backoff_base_s,
+        backoff_max_s=settings.openai_backoff_max_s,
+    )
+    llm_text = OpenAIResponsesTextClient(
+        api_key=settings.openai_api_key,
+        rate_limiter=rate_limiter,
+        lane=settings.llm_lane,
+    )
     catalog_repo = CompactCatalogYamlRepository(settings.bc3_catalog_yaml_path)
 
     extractor_text = PromptedTextExtractionService(
@@ -78,17 +94,56 @@ def main() -> int:
         model=settings.openai_model,
     )
 
+    circuit_breaker = LlmCircuitBreaker(
+        failure_threshold=settings.bc3_llm_circuit_failure_threshold,
+        cooldown_s=settings.bc3_llm_circuit_cooldown_s,
+    )
+
+    job_journal = None
+    if settings.bc3_job_journal_enabled:
+        job_journal = JsonlBc3JobJournal(
+            directory=settings.bc3_job_journal_dir,
+            max_age_s=settings.bc3_job_journal_max_age_h * 3600,
+        )
+
+    result_cache = None
+    if settings.bc3_result_cache_enabled:
+        result_cache = SqliteBc3ResultCache(
+            path=settings.bc3_result_cache_path,
+            max_bytes=settings.bc3_result_cache_max_mb * 1024 * 1024,
+        )
+
     pipeline = Bc3ClassificationPipeline(
         extractor=extractor_text,
-        selector=CatalogCandidateSelector(),
+        selector=CatalogCandidateSelector(
+            prefilter_limit=settings.bc3_selector_prefilter_limit,
+            full_rerank=settings.bc3_selector_full_rerank,
+            similarity=settings.bc3_selector_similarity,
+        ),
         catalog_repository=catalog_repo,
         prompt_cache_enabled=settings.bc3_use_prompt_cache,
         prompt_cache_key_prefix=settings.bc3_prompt_cache_key_prefix,
         prompt_cache_retention=settings.bc3_prompt_cache_retention,
+        selector_engine=settings.bc3_selector_engine,
+        dedup_enabled=settings.bc3_dedup_enabled,
+        fast_path_enabled=settings.bc3_fast_path_enabled,
+        fast_path_min_confidence=settings.bc3_fast_path_min_confidence,
+        fast_path_min_margin=settings.bc3_fast_path_min_margin,
+        result_cache=result_cache,
+        llm_max_concurrency=settings.bc3_llm_max_concurrency,
+        llm_retry_budget=settings.bc3_llm_retry_budget,
+        prompt_layout=settings.bc3_prompt_layout,
+        circuit_breaker=circuit_breaker,
+        llm_call_timeout_s=settings.bc3_llm_call_timeout_s,
+        request_deadline_s=settings.bc3_request_deadline_s,
+        batch_planner=Bc3BatchPlanner(
+            max_input_tokens=settings.bc3_batch_max_input_tokens,
+            max_output_tokens=settings.bc3_batch_max_output_tokens,
+        ),
     )
 
     try:
-        result = pipeline.run(req)
+        result = pipeline.run(req, journal=job_journal)
     except Exception as exc:
         logger.exception("Fallo ejecutando pipeline BC3: %s", exc)
         return 2
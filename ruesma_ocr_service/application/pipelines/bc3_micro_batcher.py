@@ -0,0 +1,165 @@
+# ruesma_ocr_service/application/pipelines/bc3_micro_batcher.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from ruesma_ocr_service.application.pipelines.bc3_classification_pipeline import (
+    Bc3ClassificationPipeline,
+)
+from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionResultado,
+    Bc3ClassificationRequest,
+)
+
+logger = logging.getLogger(__name__)
+
+# Requests que se pueden fusionar: mismo prompt, top_k y tamaño de lote.
+_GroupKey = Tuple[str, int, int]
+
+
+@dataclass
+class _PendingGroup:
+    requests: List[Bc3ClassificationRequest] = field(default_factory=list)
+    futures: List[Future] = field(default_factory=list)
+    items: int = 0
+    timer: threading.Timer | None = None
+
+
+class Bc3MicroBatcher:
+    """
+    Junta los descompuestos de requests concurrentes compatibles durante
+    como mucho `max_wait_ms` (o hasta `max_items`) y los clasifica en una
+    sola ejecución del pipeline: lotes LLM llenos y un prefijo de catálogo
+    por lote en lugar de uno por request. Cada llamante recibe sus items en
+    su orden y con sus ids. Un request que por sí solo llega a `max_items`
+    no espera y va directo al pipeline.
+    """
+
+    def __init__(
+        self,
+        *,
+        pipeline: Bc3ClassificationPipeline,
+        max_wait_ms: float = 20.0,
+        max_items: int = 20,
+        max_concurrent_runs: int = 8,
+    ) -> None:
+        self._pipeline = pipeline
+        self._max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._max_items = max(1, int(max_items))
+        self._lock = threading.Lock()
+        self._groups: Dict[_GroupKey, _PendingGroup] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_concurrent_runs)),
+            thread_name_prefix="bc3-microlote",
+        )
+
+    def run(self, req: Bc3ClassificationRequest) -> Bc3ClasificacionResultado:
+        if len(req.descompuestos) >= self._max_items:
+            return self._pipeline.run(req)
+        return self._submit(req).result()
+
+    async def run_async(
+        self,
+        req: Bc3ClassificationRequest,
+    ) -> Bc3ClasificacionResultado:
+        if len(req.descompuestos) >= self._max_items:
+            return await self._pipeline.run_async(req)
+        return await asyncio.wrap_future(self._submit(req))
+
+    def _submit(self, req: Bc3ClassificationRequest) -> Future:
+        future: Future = Future()
+        key = (req.prompt_key, req.top_k_candidates, req.llm_batch_size)
+        with self._lock:
+            group = self._groups.get(key)
+            if (
+                group is not None
+                and group.items + len(req.descompuestos) > self._max_items
+            ):
+                # No cabe: el grupo abierto sale ya y este abre uno nuevo.
+                self._dispatch_locked(key)
+                group = None
+            if group is None:
+                group = _PendingGroup()
+                group.timer = threading.Timer(
+                    self._max_wait_s,
+                    self._on_timeout,
+                    args=(key, group),
+                )
+                group.timer.daemon = True
+                self._groups[key] = group
+                group.timer.start()
+
+            group.requests.append(req)
+            group.futures.append(future)
+            group.items += len(req.descompuestos)
+            if group.items >= self._max_items:
+                self._dispatch_locked(key)
+        return future
+
+    def _on_timeout(self, key: _GroupKey, group: _PendingGroup) -> None:
+        with self._lock:
+            if self._groups.get(key) is group:
+                self._dispatch_locked(key)
+
+    def _dispatch_locked(self, key: _GroupKey) -> None:
+        group = self._groups.pop(key)
+        if group.timer is not None:
+            group.timer.cancel()
+        self._executor.submit(self._flush, group)
+
+    def _flush(self, group: _PendingGroup) -> None:
+        if len(group.requests) == 1:
+            try:
+                group.futures[0].set_result(self._pipeline.run(group.requests[0]))
+            except BaseException as exc:
+                group.futures[0].set_exception(exc)
+            return
+
+        try:
+            result = self._pipeline.run(self._merge(group.requests))
+        except BaseException as exc:
+            for future in group.futures:
+                future.set_exception(exc)
+            return
+
+        logger.info(
+            "BC3 microlote. requests=%s items=%s",
+            len(group.requests),
+            group.items,
+        )
+        offset = 0
+        for req, future in zip(group.requests, group.futures):
+            count = len(req.descompuestos)
+            items = [
+                item.model_copy(update={"id": original.id})
+                for original, item in zip(
+                    req.descompuestos,
+                    result.resultados[offset:offset + count],
+                )
+            ]
+            offset += count
+            future.set_result(Bc3ClasificacionResultado(resultados=items))
+
+    @staticmethod
+    def _merge(requests: List[Bc3ClassificationRequest]) -> Bc3ClassificationRequest:
+        """
+        Los ids se prefijan con el índice del request ("<k>.<id>") para que
+        no choquen dentro de un lote; el reparto es por posición.
+        """
+        deadlines = [req.deadline_s for req in requests if req.deadline_s]
+        return requests[0].model_copy(
+            update={
+                "bc3_id": None,
+                "deadline_s": min(deadlines) if deadlines else None,
+                "descompuestos": [
+                    item.model_copy(update={"id": f"{index}.{item.id}"})
+                    for index, req in enumerate(requests)
+                    for item in req.descompuestos
+                ],
+            }
+        )
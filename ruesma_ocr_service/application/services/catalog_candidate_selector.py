@@ -1,151 +1,436 @@
 # ruesma_ocr_service/application/services/catalog_candidate_selector.py
 from __future__ import annotations
 
-import re
-import unicodedata
-from difflib import SequenceMatcher
-from typing import List, Sequence
-
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from ruesma_ocr_service.application.services.catalog_batch_scorer import (
+    VectorizedCatalogScorer,
+)
+from ruesma_ocr_service.application.services.catalog_feature_index import (
+    CatalogFeatureIndex,
+    IndexedCatalogEntry,
+    QueryFeatures,
+    char_ngrams,
+    domain_bonus,
+    domain_flags,
+    normalize_text,
+    tokenize,
+)
+from ruesma_ocr_service.application.services.catalog_similarity import (
+    SimilarityKernel,
+    TrigramDiceKernel,
+    build_similarity_kernel,
+)
 from ruesma_ocr_service.domain.models.bc3_classification_models import (
     Bc3CatalogoItem,
     Bc3DescompuestoInput,
     Bc3PromptCandidate,
 )
 
-_STOPWORDS = {
-    "a",
-    "al",
-    "con",
-    "de",
-    "del",
-    "e",
-    "el",
-    "en",
-    "entre",
-    "la",
-    "las",
-    "lo",
-    "los",
-    "o",
-    "para",
-    "por",
-    "que",
-    "se",
-    "sin",
-    "su",
-    "sus",
-    "u",
-    "un",
-    "una",
-    "uno",
-    "unos",
-    "unas",
-    "y",
-}
-
-_SYNONYM_GROUPS = {
-    "alquiler": {"alquiler", "renting"},
-    "demolicion": {"demolicion", "demoliciones", "derribo", "derribos", "desmontaje"},
-    "instalacion": {"instalacion", "instalaciones", "montaje", "colocacion"},
-    "mobiliario": {"mobiliario", "mueble", "muebles", "enser", "enseres"},
-    "proteccion": {"proteccion", "protecciones"},
-    "residuos": {"residuo", "residuos", "escombro", "escombros"},
-    "retirada": {"retirada", "retirar", "despeje", "evacuacion"},
-    "suministro": {"suministro", "aporte", "material", "materiales"},
-}
-
-_VARIANT_TO_CANONICAL = {
-    variant: canonical
-    for canonical, variants in _SYNONYM_GROUPS.items()
-    for variant in variants
-}
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FocusedRanking:
+    """
+    Cabeza del ranking del selector más la posición y el candidato de un
+    código concreto (normalmente el elegido por el LLM). La cabeza y sus
+    scores coinciden con los de `select`; `focus_rank` es la posición del
+    código en el catálogo completo, aunque haya prefiltro BM25.
+    """
+
+    top: Tuple[Bc3PromptCandidate, ...]
+    focus_code: str | None = None
+    focus_rank: int | None = None
+    focus_candidate: Bc3PromptCandidate | None = None
+
+    def covers(self, code: str) -> bool:
+        if code == self.focus_code:
+            return True
+        return any(cand.codigo == code for cand in self.top)
+
+    def rank_of(self, code: str) -> int | None:
+        for position, cand in enumerate(self.top, start=1):
+            if cand.codigo == code:
+                return position
+        if code == self.focus_code:
+            return self.focus_rank
+        return None
+
+    def candidate_for(self, code: str) -> Bc3PromptCandidate | None:
+        for cand in self.top:
+            if cand.codigo == code:
+                return cand
+        if code == self.focus_code:
+            return self.focus_candidate
+        return None
+
+    @classmethod
+    def from_candidates(
+        cls,
+        candidates: Sequence[Bc3PromptCandidate],
+        *,
+        focus_code: str | None = None,
+    ) -> "FocusedRanking":
+        return cls(top=tuple(candidates), focus_code=focus_code)
 
 
 class CatalogCandidateSelector:
+    def __init__(
+        self,
+        *,
+        max_cached_indexes: int = 4,
+        prefilter_limit: int = 300,
+        full_rerank: bool = False,
+        similarity: SimilarityKernel | str | None = None,
+    ) -> None:
+        self._similarity = (
+            similarity
+            if isinstance(similarity, SimilarityKernel)
+            else build_similarity_kernel(similarity)
+        )
+        self._max_cached_indexes = max(1, int(max_cached_indexes))
+        self._prefilter_limit = max(1, int(prefilter_limit))
+        self._full_rerank = bool(full_rerank)
+        self._indexes: OrderedDict[str, CatalogFeatureIndex] = OrderedDict()
+        self._indexes_lock = threading.Lock()
+        self._batch_scorers: Dict[str, VectorizedCatalogScorer] = {}
+
+    @property
+    def similarity_kernel(self) -> SimilarityKernel:
+        return self._similarity
+
+    def index_for(
+        self,
+        *,
+        cache_key: str,
+        catalogo: Sequence[Bc3CatalogoItem],
+    ) -> CatalogFeatureIndex:
+        """
+        Devuelve el índice de rasgos del catálogo identificado por `cache_key`
+        (normalmente `CompactCatalogBundle.prompt_cache_key`), construyéndolo
+        solo la primera vez.
+        """
+        with self._indexes_lock:
+            index = self._indexes.get(cache_key)
+            if index is not None:
+                self._indexes.move_to_end(cache_key)
+                return index
+
+        index = CatalogFeatureIndex.build(catalogo=catalogo, cache_key=cache_key)
+
+        with self._indexes_lock:
+            self._indexes[cache_key] = index
+            self._indexes.move_to_end(cache_key)
+            while len(self._indexes) > self._max_cached_indexes:
+                evicted_key, _ = self._indexes.popitem(last=False)
+                self._batch_scorers.pop(evicted_key, None)
+
+        return index
+
     def select(
         self,
         *,
         descompuesto: Bc3DescompuestoInput,
-        catalogo: Sequence[Bc3CatalogoItem],
+        catalogo: Sequence[Bc3CatalogoItem] | None = None,
         top_k: int,
+        index: CatalogFeatureIndex | None = None,
+        full_rerank: bool | None = None,
     ) -> List[Bc3PromptCandidate]:
-        if not catalogo:
+        if index is None:
+            index = CatalogFeatureIndex.build(catalogo=catalogo or ())
+        if not index.entries:
             raise ValueError("El catálogo está vacío. No se puede clasificar.")
 
         top_k = max(1, int(top_k))
-        query_text = self._build_query_text(descompuesto)
-        query_normalized = self._normalize_text(query_text)
-        query_tokens = self._tokenize(query_normalized)
-        group_hint = self._infer_group_hint(query_normalized)
-
-        scored: list[tuple[Bc3CatalogoItem, float]] = []
-        for item in catalogo:
-            score = self._score_item(
-                item=item,
-                query_tokens=query_tokens,
-                query_text=query_normalized,
-                group_hint=group_hint,
-            )
-            scored.append((item, score))
+        query = self._build_query_features(descompuesto)
+        rerank_all = self._full_rerank if full_rerank is None else full_rerank
+
+        scored: list[tuple[IndexedCatalogEntry, float]] = []
+        for entry in self._candidate_entries(
+            index=index,
+            query=query,
+            full_rerank=rerank_all,
+        ):
+            score = self._score_entry(entry=entry, query=query)
+            scored.append((entry, score))
 
-        scored.sort(key=lambda row: (-row[1], row[0].codigo))
-        selected = scored[:top_k] or [(catalogo[0], 0.0)]
+        scored.sort(key=lambda row: (-row[1], row[0].code))
+        selected = scored[:top_k] or [(index.entries[0], 0.0)]
 
         return [
-            Bc3PromptCandidate(
-                codigo=item.codigo,
-                descripcion_grupo=item.descripcion_grupo,
-                descripcion_familia=item.descripcion_familia,
-                descripcion_producto=item.descripcion_producto,
-                descripcion_completa=item.descripcion_completa,
-                tags=self._build_tags(item=item, group_hint=group_hint),
-                score=round(float(score), 4),
+            self._to_prompt_candidate(
+                entry=entry,
+                score=score,
+                group_hint=query.group_hint,
             )
-            for item, score in selected
+            for entry, score in selected
         ]
 
-    def _score_item(
+    def select_focused(
         self,
         *,
-        item: Bc3CatalogoItem,
-        query_tokens: set[str],
-        query_text: str,
+        descompuesto: Bc3DescompuestoInput,
+        index: CatalogFeatureIndex,
+        focus_code: str | None = None,
+        top_n: int = 3,
+        full_rerank: bool | None = None,
+    ) -> FocusedRanking:
+        """
+        Variante acotada de `select`: puntúa las mismas entradas pero solo
+        materializa las `top_n` mejores (heap) y el rango/score de
+        `focus_code`, sin ordenar ni construir candidatos para todo el
+        catálogo. Con prefiltro, el rango de `focus_code` cuesta además una
+        pasada de scoring sobre las entradas que el prefiltro dejó fuera.
+        """
+        if not index.entries:
+            raise ValueError("El catálogo está vacío. No se puede clasificar.")
+
+        query = self._build_query_features(descompuesto)
+        rerank_all = self._full_rerank if full_rerank is None else full_rerank
+
+        scored: list[tuple[float, str, IndexedCatalogEntry]] = [
+            (-self._score_entry(entry=entry, query=query), entry.code, entry)
+            for entry in self._candidate_entries(
+                index=index,
+                query=query,
+                full_rerank=rerank_all,
+            )
+        ]
+        if not scored:
+            scored = [(-0.0, index.entries[0].code, index.entries[0])]
+
+        head = heapq.nsmallest(
+            max(1, int(top_n)),
+            scored,
+            key=lambda row: (row[0], row[1]),
+        )
+        top = tuple(
+            self._to_prompt_candidate(
+                entry=entry,
+                score=-neg_score,
+                group_hint=query.group_hint,
+            )
+            for neg_score, _, entry in head
+        )
+
+        focus_rank = None
+        focus_candidate = None
+        focus_row = None
+        if focus_code:
+            focus_row = next(
+                (row for row in scored if row[1] == focus_code),
+                None,
+            )
+            if focus_row is None:
+                # Fuera del prefiltro BM25: se puntúa solo esa entrada.
+                focus_entry = next(
+                    (entry for entry in index.entries if entry.code == focus_code),
+                    None,
+                )
+                if focus_entry is not None:
+                    focus_row = (
+                        -self._score_entry(entry=focus_entry, query=query),
+                        focus_entry.code,
+                        focus_entry,
+                    )
+        if focus_row is not None:
+            focus_key = (focus_row[0], focus_row[1])
+            focus_rank = 1 + sum(
+                1 for neg_score, code, _ in scored
+                if (neg_score, code) < focus_key
+            )
+            if len(scored) < len(index.entries):
+                # Con prefiltro, también cuentan las entradas que no pasaron.
+                prefiltered = {code for _, code, _ in scored}
+                focus_rank += sum(
+                    1 for entry in index.entries
+                    if entry.code not in prefiltered
+                    and (-self._score_entry(entry=entry, query=query), entry.code)
+                    < focus_key
+                )
+            focus_candidate = self._to_prompt_candidate(
+                entry=focus_row[2],
+                score=-focus_row[0],
+                group_hint=query.group_hint,
+            )
+
+        return FocusedRanking(
+            top=top,
+            focus_code=focus_code,
+            focus_rank=focus_rank,
+            focus_candidate=focus_candidate,
+        )
+
+    def select_many(
+        self,
+        *,
+        descompuestos: Sequence[Bc3DescompuestoInput],
+        index: CatalogFeatureIndex,
+        top_k: int,
+    ) -> List[List[Bc3PromptCandidate]]:
+        """
+        Rankea todos los descompuestos de un request en una sola pasada
+        matricial. Si numpy no está disponible, o el kernel de similitud no
+        es el de trigramas, recae en `select` por item.
+        """
+        if not index.entries:
+            raise ValueError("El catálogo está vacío. No se puede clasificar.")
+
+        queries = [self._build_query_features(item) for item in descompuestos]
+        scorer = None
+        if isinstance(self._similarity, TrigramDiceKernel):
+            scorer = self._batch_scorer_for(index)
+        if scorer is None:
+            return [
+                self.select(descompuesto=item, index=index, top_k=top_k)
+                for item in descompuestos
+            ]
+
+        rankings = scorer.rank(queries, top_k=top_k)
+        return [
+            [
+                self._to_prompt_candidate(
+                    entry=index.entries[position],
+                    score=score,
+                    group_hint=query.group_hint,
+                )
+                for position, score in ranking
+            ]
+            for query, ranking in zip(queries, rankings)
+        ]
+
+    def _batch_scorer_for(
+        self,
+        index: CatalogFeatureIndex,
+    ) -> VectorizedCatalogScorer | None:
+        if index.cache_key:
+            with self._indexes_lock:
+                scorer = self._batch_scorers.get(index.cache_key)
+            if scorer is not None and scorer.index is index:
+                return scorer
+
+        try:
+            scorer = VectorizedCatalogScorer(index)
+        except RuntimeError as exc:
+            logger.warning(
+                "Scorer vectorizado no disponible; se usa el selector por item. error=%s",
+                exc,
+            )
+            return None
+
+        if index.cache_key:
+            with self._indexes_lock:
+                self._batch_scorers[index.cache_key] = scorer
+        return scorer
+
+    def _to_prompt_candidate(
+        self,
+        *,
+        entry: IndexedCatalogEntry,
+        score: float,
         group_hint: str | None,
-    ) -> float:
-        product_text = self._normalize_text(item.descripcion_producto)
-        family_text = self._normalize_text(item.descripcion_familia)
-        group_text = self._normalize_text(item.descripcion_grupo)
-        full_text = self._normalize_text(item.descripcion_completa or item.search_text())
+    ) -> Bc3PromptCandidate:
+        return Bc3PromptCandidate(
+            codigo=entry.item.codigo,
+            descripcion_grupo=entry.item.descripcion_grupo,
+            descripcion_familia=entry.item.descripcion_familia,
+            descripcion_producto=entry.item.descripcion_producto,
+            descripcion_completa=entry.item.descripcion_completa,
+            tags=self._build_tags(item=entry.item, group_hint=group_hint),
+            score=round(float(score), 4),
+        )
 
-        product_tokens = self._tokenize(product_text)
-        family_tokens = self._tokenize(family_text)
-        group_tokens = self._tokenize(group_text)
-        full_tokens = self._tokenize(full_text)
+    def _candidate_entries(
+        self,
+        *,
+        index: CatalogFeatureIndex,
+        query: QueryFeatures,
+        full_rerank: bool,
+    ) -> Sequence[IndexedCatalogEntry]:
+        """
+        Con `full_rerank` (o catálogos pequeños) se puntúa todo el catálogo,
+        como hasta ahora. En otro caso, solo las entradas que el prefiltro
+        BM25 deja pasar llegan al scorer difuso; si la consulta no comparte
+        ningún token con el catálogo se vuelve al recorrido exhaustivo.
+        """
+        if full_rerank or len(index.entries) <= self._prefilter_limit:
+            return index.entries
+
+        positions = index.bm25_candidates(
+            query.tokens,
+            limit=self._prefilter_limit,
+        )
+        if not positions:
+            return index.entries
 
-        score = 0.0
-        score += self._weighted_overlap(query_tokens, product_tokens) * 5.5
-        score += self._weighted_overlap(query_tokens, family_tokens) * 3.0
-        score += self._weighted_overlap(query_tokens, group_tokens) * 2.0
-        score += self._weighted_overlap(query_tokens, full_tokens) * 1.5
+        return [index.entries[position] for position in positions]
 
-        score += SequenceMatcher(None, query_text, product_text).ratio() * 40.0
-        score += SequenceMatcher(None, query_text, family_text).ratio() * 16.0
-        score += SequenceMatcher(None, query_text, full_text).ratio() * 20.0
+    def _build_query_features(
+        self,
+        descompuesto: Bc3DescompuestoInput,
+    ) -> QueryFeatures:
+        query_normalized = self._normalize_text(
+            self._build_query_text(descompuesto)
+        )
+        query_tokens = self._tokenize(query_normalized)
+        return QueryFeatures(
+            text=query_normalized,
+            tokens=query_tokens,
+            grams=char_ngrams(query_normalized),
+            group_hint=self._infer_group_hint(query_normalized),
+            domain_flags=domain_flags(query_tokens),
+        )
+
+    def _score_entry(
+        self,
+        *,
+        entry: IndexedCatalogEntry,
+        query: QueryFeatures,
+    ) -> float:
+        query_text = query.text
+        query_tokens = query.tokens
 
+        score = 0.0
+        score += self._weighted_overlap(query_tokens, entry.product_tokens) * 5.5
+        score += self._weighted_overlap(query_tokens, entry.family_tokens) * 3.0
+        score += self._weighted_overlap(query_tokens, entry.group_tokens) * 2.0
+        score += self._weighted_overlap(query_tokens, entry.full_tokens) * 1.5
+
+        similarity = self._similarity.similarity
+        score += similarity(
+            query=query,
+            text=entry.product_text,
+            grams=entry.product_grams,
+        ) * 40.0
+        score += similarity(
+            query=query,
+            text=entry.family_text,
+            grams=entry.family_grams,
+        ) * 16.0
+        score += similarity(
+            query=query,
+            text=entry.full_text,
+            grams=entry.full_grams,
+        ) * 20.0
+
+        product_text = entry.product_text
         if product_text and product_text in query_text:
             score += 18.0
         elif query_text and query_text in product_text:
             score += 10.0
 
-        score += self._domain_bonus(
-            query_tokens=query_tokens,
-            full_tokens=full_tokens,
-        )
-        score += self._group_bonus(
-            group_hint=group_hint,
-            group_text=group_text,
-            full_text=full_text,
+        score += domain_bonus(
+            query_flags=query.domain_flags,
+            entry_flags=entry.domain_flags,
         )
+        if query.group_hint:
+            score += entry.group_bonus_by_hint.get(query.group_hint, 0.0)
 
         return score
 
@@ -161,31 +446,17 @@ class CatalogCandidateSelector:
 
     @staticmethod
     def _normalize_text(text: str) -> str:
-        normalized = unicodedata.normalize("NFKD", text or "")
-        normalized = "".join(
-            char for char in normalized if not unicodedata.combining(char)
-        )
-        normalized = normalized.lower()
-        normalized = re.sub(r"[^a-z0-9]+", " ", normalized)
-        return re.sub(r"\s+", " ", normalized).strip()
+        return normalize_text(text)
 
     @classmethod
     def _tokenize(cls, normalized_text: str) -> set[str]:
-        if not normalized_text:
-            return set()
-
-        tokens: set[str] = set()
-        for raw_token in normalized_text.split():
-            if len(raw_token) <= 1:
-                continue
-            if raw_token in _STOPWORDS:
-                continue
-            token = _VARIANT_TO_CANONICAL.get(raw_token, raw_token)
-            tokens.add(token)
-        return tokens
+        return tokenize(normalized_text)
 
     @staticmethod
-    def _weighted_overlap(left: set[str], right: set[str]) -> float:
+    def _weighted_overlap(
+        left: set[str] | frozenset[str],
+        right: set[str] | frozenset[str],
+    ) -> float:
         if not left or not right:
             return 0.0
 
@@ -195,62 +466,6 @@ class CatalogCandidateSelector:
             score += 1.0 + min(len(token), 12) / 12.0
         return score
 
-    @staticmethod
-    def _domain_bonus(*, query_tokens: set[str], full_tokens: set[str]) -> float:
-        score = 0.0
-
-        if {"retirada", "demolicion"} & query_tokens and {"retirada", "demolicion"} & full_tokens:
-            score += 14.0
-
-        if {"mobiliario"} & query_tokens and {"mobiliario"} & full_tokens:
-            score += 10.0
-
-        if {"residuos"} & query_tokens and {"residuos"} & full_tokens:
-            score += 8.0
-
-        if {"instalacion"} & query_tokens and {"instalacion"} & full_tokens:
-            score += 8.0
-
-        if {"suministro"} & query_tokens and {"suministro"} & full_tokens:
-            score += 8.0
-
-        return score
-
-    @staticmethod
-    def _group_bonus(
-        *,
-        group_hint: str | None,
-        group_text: str,
-        full_text: str,
-    ) -> float:
-        if group_hint == "SUMINISTRO":
-            if "materia" in group_text or "suministro" in full_text:
-                return 22.0
-
-        if group_hint == "MONTAJE":
-            if "mano de obra" in group_text or "montaje" in full_text:
-                return 22.0
-
-        if group_hint == "SUMINISTRO_CON_MONTAJE":
-            if "aporte" in group_text or (
-                "suministro" in full_text and "montaje" in full_text
-            ):
-                return 28.0
-
-        if group_hint == "MAQUINARIA_ALQUILER":
-            if "alquiler" in group_text:
-                return 26.0
-
-        if group_hint == "MAQUINARIA_COMPRA":
-            if "maquinaria" in group_text and "alquiler" not in group_text:
-                return 20.0
-
-        if group_hint == "MEDIOS_AUXILIARES":
-            if "medios auxiliares" in group_text:
-                return 26.0
-
-        return 0.0
-
     @staticmethod
     def _build_tags(
         *,
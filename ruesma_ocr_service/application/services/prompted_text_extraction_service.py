@@ -1,6 +1,7 @@
 # ruesma_ocr_service/application/services/prompted_text_extraction_service.py
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any, Dict, Iterable, Type
 
@@ -8,10 +9,15 @@ from pydantic import BaseModel
 
 from ruesma_ocr_service.application.services.schema_registry import SchemaRegistry
 from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionCompacta,
     Bc3ClasificacionItem,
     Bc3ClasificacionResultado,
 )
-from ruesma_ocr_service.domain.ports.prompt_repository import PromptRepository
+from ruesma_ocr_service.domain.models.llm_usage import LlmUsageSink
+from ruesma_ocr_service.domain.ports.prompt_repository import (
+    PromptRepository,
+    PromptSpec,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -34,12 +40,18 @@ class PromptedTextExtractionService:
         prompt_repo: PromptRepository,
         schema_registry: SchemaRegistry,
         model: str,
+        async_llm_client: Any | None = None,
     ) -> None:
         self._llm = llm_client
+        self._async_llm = async_llm_client
         self._prompts = prompt_repo
         self._schemas = schema_registry
         self._model = model
 
+    @property
+    def model(self) -> str:
+        return self._model
+
     def extract(
         self,
         *,
@@ -47,7 +59,96 @@ class PromptedTextExtractionService:
         payload: Dict[str, Any],
         prompt_cache_key: str | None = None,
         prompt_cache_retention: str | None = None,
+        usage_sink: LlmUsageSink | None = None,
+        context_text: str | None = None,
+        timeout_s: float | None = None,
     ) -> tuple[BaseModel, str]:
+        spec, response_model, task = self._resolve_prompt(
+            prompt_key=prompt_key,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+        )
+
+        parsed = self._llm.extract_structured(
+            model=self._model,
+            system=spec.system,
+            task=task,
+            payload=payload,
+            response_model=response_model,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+            usage_sink=usage_sink,
+            context_text=context_text,
+            timeout_s=timeout_s,
+        )
+
+        parsed = self._postprocess(
+            schema_name=spec.schema,
+            payload=payload,
+            parsed=parsed,
+        )
+        return parsed, spec.schema
+
+    async def extract_async(
+        self,
+        *,
+        prompt_key: str,
+        payload: Dict[str, Any],
+        prompt_cache_key: str | None = None,
+        prompt_cache_retention: str | None = None,
+        usage_sink: LlmUsageSink | None = None,
+        context_text: str | None = None,
+        timeout_s: float | None = None,
+    ) -> tuple[BaseModel, str]:
+        """
+        Igual que `extract` pero sobre el cliente asíncrono. Sin cliente
+        asíncrono configurado, ejecuta `extract` en un hilo.
+        """
+        if self._async_llm is None:
+            return await asyncio.to_thread(
+                self.extract,
+                prompt_key=prompt_key,
+                payload=payload,
+                prompt_cache_key=prompt_cache_key,
+                prompt_cache_retention=prompt_cache_retention,
+                usage_sink=usage_sink,
+                context_text=context_text,
+                timeout_s=timeout_s,
+            )
+
+        spec, response_model, task = self._resolve_prompt(
+            prompt_key=prompt_key,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+        )
+
+        parsed = await self._async_llm.extract_structured(
+            model=self._model,
+            system=spec.system,
+            task=task,
+            payload=payload,
+            response_model=response_model,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+            usage_sink=usage_sink,
+            context_text=context_text,
+            timeout_s=timeout_s,
+        )
+
+        parsed = self._postprocess(
+            schema_name=spec.schema,
+            payload=payload,
+            parsed=parsed,
+        )
+        return parsed, spec.schema
+
+    def _resolve_prompt(
+        self,
+        *,
+        prompt_key: str,
+        prompt_cache_key: str | None,
+        prompt_cache_retention: str | None,
+    ) -> tuple[PromptSpec, Type[BaseModel], str]:
         spec = self._prompts.get(prompt_key)
         response_model: Type[BaseModel] = self._schemas.get(spec.schema)
 
@@ -63,22 +164,24 @@ class PromptedTextExtractionService:
             bool(prompt_cache_key),
             prompt_cache_retention,
         )
+        return spec, response_model, task
 
-        parsed = self._llm.extract_structured(
-            model=self._model,
-            system=spec.system,
-            task=task,
-            payload=payload,
-            response_model=response_model,
-            prompt_cache_key=prompt_cache_key,
-            prompt_cache_retention=prompt_cache_retention,
-        )
+    def _postprocess(
+        self,
+        *,
+        schema_name: str,
+        payload: Dict[str, Any],
+        parsed: BaseModel,
+    ) -> BaseModel:
+        if schema_name == "bc3_clasificacion_compacta":
+            parsed = Bc3ClasificacionCompacta.model_validate(parsed).expand()
+        elif schema_name != "bc3_clasificacion_resultado":
+            return parsed
 
-        parsed = self._normalize_bc3_result_without_catalog_fallback(
+        return self._normalize_bc3_result_without_catalog_fallback(
             payload=payload,
             result=Bc3ClasificacionResultado.model_validate(parsed),
         )
-        return parsed, spec.schema
 
     @staticmethod
     def _iter_input_items(payload: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
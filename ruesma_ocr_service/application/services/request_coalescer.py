@@ -0,0 +1,138 @@
+# ruesma_ocr_service/application/services/request_coalescer.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RequestCoalescerStats:
+    executions: int
+    coalesced: int
+    cache_hits: int
+    in_flight: int
+    entries: int
+    ttl_s: float
+    max_entries: int
+
+
+class RequestCoalescer:
+    """
+    Single-flight por clave: mientras una ejecución está en vuelo, los
+    duplicados concurrentes esperan su resultado en lugar de lanzar otra.
+    El resultado se guarda además `ttl_s` segundos (LRU de `max_entries`)
+    para los reintentos que llegan justo después. Los errores no se
+    guardan: el siguiente intento vuelve a ejecutar. El valor devuelto se
+    comparte entre llamantes; no debe mutarse.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_s: float = 30.0,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl_s = max(0.0, float(ttl_s))
+        self._max_entries = max(0, int(max_entries))
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._done: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._executions = 0
+        self._coalesced = 0
+        self._cache_hits = 0
+
+    def run(self, key: str, fn: Callable[[], Any]) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        return self._lead(key, future, fn)
+
+    async def run_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            value = await fn()
+        except BaseException as exc:
+            self._finish(key, future, exc=exc)
+            raise
+        self._finish(key, future, value=value)
+        return value
+
+    def stats(self) -> RequestCoalescerStats:
+        with self._lock:
+            return RequestCoalescerStats(
+                executions=self._executions,
+                coalesced=self._coalesced,
+                cache_hits=self._cache_hits,
+                in_flight=len(self._in_flight),
+                entries=len(self._done),
+                ttl_s=self._ttl_s,
+                max_entries=self._max_entries,
+            )
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            cached = self._done.get(key)
+            if cached is not None:
+                expires_at, value = cached
+                if expires_at > self._clock():
+                    self._done.move_to_end(key)
+                    self._cache_hits += 1
+                    future: Future = Future()
+                    future.set_result(value)
+                    return future, False
+                del self._done[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                logger.info("Request duplicado en vuelo: se espera al original. key=%s", key)
+                return future, False
+
+            future = Future()
+            self._in_flight[key] = future
+            self._executions += 1
+            return future, True
+
+    def _lead(self, key: str, future: Future, fn: Callable[[], Any]) -> Any:
+        try:
+            value = fn()
+        except BaseException as exc:
+            self._finish(key, future, exc=exc)
+            raise
+        self._finish(key, future, value=value)
+        return value
+
+    def _finish(
+        self,
+        key: str,
+        future: Future,
+        *,
+        value: Any = None,
+        exc: BaseException | None = None,
+    ) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if exc is None and self._ttl_s and self._max_entries:
+                self._done[key] = (self._clock() + self._ttl_s, value)
+                self._done.move_to_end(key)
+                while len(self._done) > self._max_entries:
+                    self._done.popitem(last=False)
+
+        if exc is None:
+            future.set_result(value)
+        else:
+            future.set_exception(exc)
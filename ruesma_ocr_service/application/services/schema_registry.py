@@ -6,7 +6,9 @@ from typing import Dict, Type
 from pydantic import BaseModel
 
 from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionCompacta,
     Bc3ClasificacionResultado,
+    Bc3FamiliaCompacta,
 )
 
 
@@ -14,6 +16,8 @@ class SchemaRegistry:
     def __init__(self) -> None:
         self._schemas: Dict[str, Type[BaseModel]] = {
             "bc3_clasificacion_resultado": Bc3ClasificacionResultado,
+            "bc3_clasificacion_compacta": Bc3ClasificacionCompacta,
+            "bc3_familia_compacta": Bc3FamiliaCompacta,
         }
 
     def get(self, schema_name: str) -> Type[BaseModel]:
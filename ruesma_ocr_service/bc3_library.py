@@ -1,32 +1,51 @@
 # ruesma_ocr_service/bc3_library.py
 from __future__ import annotations
 
+import copy
 import hashlib
 import json
 import logging
+from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
 
 from ruesma_ocr_service.application.pipelines.bc3_classification_pipeline import (
     Bc3ClassificationPipeline,
 )
+from ruesma_ocr_service.application.pipelines.bc3_micro_batcher import Bc3MicroBatcher
+from ruesma_ocr_service.application.services.bc3_batch_planner import Bc3BatchPlanner
 from ruesma_ocr_service.application.services.catalog_candidate_selector import (
     CatalogCandidateSelector,
 )
+from ruesma_ocr_service.application.services.llm_circuit_breaker import (
+    LlmCircuitBreaker,
+)
 from ruesma_ocr_service.application.services.prompted_text_extraction_service import (
     PromptedTextExtractionService,
 )
+from ruesma_ocr_service.application.services.request_coalescer import RequestCoalescer
 from ruesma_ocr_service.application.services.schema_registry import SchemaRegistry
 from ruesma_ocr_service.config.logging_config import configure_logging
 from ruesma_ocr_service.config.runtime_env import load_runtime_dotenv
 from ruesma_ocr_service.config.settings import Settings
 from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionResultado,
     Bc3ClassificationRequest,
 )
+from ruesma_ocr_service.infrastructure.cache.jsonl_bc3_job_journal import (
+    JsonlBc3JobJournal,
+)
+from ruesma_ocr_service.infrastructure.cache.sqlite_bc3_result_cache import (
+    SqliteBc3ResultCache,
+)
 from ruesma_ocr_service.infrastructure.catalog.compact_catalog_yaml_repository import (
     CompactCatalogYamlRepository,
 )
+from ruesma_ocr_service.infrastructure.llm.async_openai_responses_text_client import (
+    AsyncOpenAIResponsesTextClient,
+)
+from ruesma_ocr_service.infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from ruesma_ocr_service.infrastructure.llm.openai_responses_text_client import (
     OpenAIResponsesTextClient,
 )
@@ -66,25 +85,96 @@ class Bc3ClassifierLibrary:
             self._settings.bc3_catalog_yaml_path,
         )
 
+        self._rate_limiter = OpenAIRateLimiter(
+            requests_per_minute=self._settings.openai_rpm_limit,
+            tokens_per_minute=self._settings.openai_tpm_limit,
+            max_retries=self._settings.openai_rate_limit_max_retries,
+            backoff_base_s=self._settings.openai_backoff_base_s,
+            backoff_max_s=self._settings.openai_backoff_max_s,
+        )
         llm_text = OpenAIResponsesTextClient(
             api_key=self._settings.openai_api_key,
+            base_url=self._settings.openai_base_url,
+            rate_limiter=self._rate_limiter,
+            lane=self._settings.llm_lane,
+        )
+        llm_text_async = AsyncOpenAIResponsesTextClient(
+            api_key=self._settings.openai_api_key,
+            base_url=self._settings.openai_base_url,
+            rate_limiter=self._rate_limiter,
+            lane=self._settings.llm_lane,
         )
         extractor_text = PromptedTextExtractionService(
             llm_client=llm_text,
+            async_llm_client=llm_text_async,
             prompt_repo=prompt_repo,
             schema_registry=schema_registry,
             model=self._settings.openai_model,
         )
 
+        self._circuit_breaker = LlmCircuitBreaker(
+            failure_threshold=self._settings.bc3_llm_circuit_failure_threshold,
+            cooldown_s=self._settings.bc3_llm_circuit_cooldown_s,
+        )
+
+        self._job_journal = None
+        if self._settings.bc3_job_journal_enabled:
+            self._job_journal = JsonlBc3JobJournal(
+                directory=self._settings.bc3_job_journal_dir,
+                max_age_s=self._settings.bc3_job_journal_max_age_h * 3600,
+            )
+
+        result_cache = None
+        if self._settings.bc3_result_cache_enabled:
+            result_cache = SqliteBc3ResultCache(
+                path=self._settings.bc3_result_cache_path,
+                max_bytes=self._settings.bc3_result_cache_max_mb * 1024 * 1024,
+            )
+
         self._pipeline = Bc3ClassificationPipeline(
             extractor=extractor_text,
-            selector=CatalogCandidateSelector(),
+            selector=CatalogCandidateSelector(
+                prefilter_limit=self._settings.bc3_selector_prefilter_limit,
+                full_rerank=self._settings.bc3_selector_full_rerank,
+                similarity=self._settings.bc3_selector_similarity,
+            ),
             catalog_repository=catalog_repo,
             prompt_cache_enabled=self._settings.bc3_use_prompt_cache,
             prompt_cache_key_prefix=self._settings.bc3_prompt_cache_key_prefix,
             prompt_cache_retention=self._settings.bc3_prompt_cache_retention,
+            selector_engine=self._settings.bc3_selector_engine,
+            dedup_enabled=self._settings.bc3_dedup_enabled,
+            fast_path_enabled=self._settings.bc3_fast_path_enabled,
+            fast_path_min_confidence=self._settings.bc3_fast_path_min_confidence,
+            fast_path_min_margin=self._settings.bc3_fast_path_min_margin,
+            result_cache=result_cache,
+            llm_max_concurrency=self._settings.bc3_llm_max_concurrency,
+            llm_retry_budget=self._settings.bc3_llm_retry_budget,
+            prompt_layout=self._settings.bc3_prompt_layout,
+            circuit_breaker=self._circuit_breaker,
+            llm_call_timeout_s=self._settings.bc3_llm_call_timeout_s,
+            request_deadline_s=self._settings.bc3_request_deadline_s,
+            batch_planner=Bc3BatchPlanner(
+                max_input_tokens=self._settings.bc3_batch_max_input_tokens,
+                max_output_tokens=self._settings.bc3_batch_max_output_tokens,
+            ),
         )
 
+        self._micro_batcher = None
+        if self._settings.bc3_micro_batch_enabled:
+            self._micro_batcher = Bc3MicroBatcher(
+                pipeline=self._pipeline,
+                max_wait_ms=self._settings.bc3_micro_batch_max_wait_ms,
+                max_items=self._settings.bc3_micro_batch_max_items,
+            )
+
+        self._coalescer = None
+        if self._settings.bc3_coalesce_enabled:
+            self._coalescer = RequestCoalescer(
+                ttl_s=self._settings.bc3_coalesce_ttl_s,
+                max_entries=self._settings.bc3_coalesce_max_entries,
+            )
+
         logger.info(
             (
                 "Bc3ClassifierLibrary inicializada. model=%s catalog_yaml=%s "
@@ -127,7 +217,79 @@ class Bc3ClassifierLibrary:
 
         return cls(settings)
 
+    def health(self) -> Dict[str, Any]:
+        """
+        Estado del acceso al LLM en este proceso: circuit breaker y
+        planificador de rate limit.
+        """
+        circuit = self._circuit_breaker.snapshot()
+        health = {
+            "ok": True,
+            "llm_available": circuit.state != "open",
+            "llm_circuit": asdict(circuit),
+            "llm_rate_limit": asdict(self._rate_limiter.stats()),
+        }
+        if self._coalescer is not None:
+            health["coalescer"] = asdict(self._coalescer.stats())
+        return health
+
     def classify(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        req = self._prepare_request(payload)
+        if self._coalescer is None:
+            return self._classify(req)
+        envelope = self._coalescer.run(
+            _sha256_json(req.model_dump(exclude_none=True)),
+            lambda: self._classify(req),
+        )
+        return copy.deepcopy(envelope)
+
+    async def classify_async(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión asíncrona de `classify` para servidores con event loop:
+        mismo sobre de salida, llamadas al LLM sin bloquear hilos.
+        """
+        req = self._prepare_request(payload)
+        if self._coalescer is None:
+            return await self._classify_async(req)
+        envelope = await self._coalescer.run_async(
+            _sha256_json(req.model_dump(exclude_none=True)),
+            lambda: self._classify_async(req),
+        )
+        return copy.deepcopy(envelope)
+
+    def classify_stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Variante en streaming de `classify`: un registro `meta` (mismo
+        contenido que en el sobre), un registro `item` por descompuesto en
+        cuanto su lote está reparado y un `end` final. Cada registro es una
+        línea NDJSON; el orden de los items es el de resolución, no el de
+        entrada (usa `item.id`).
+        """
+        req = self._prepare_request(payload)
+        yield {"type": "meta", "meta": self._build_meta(req)}
+
+        count = 0
+        for item in self._pipeline.run_iter(req):
+            count += 1
+            yield {"type": "item", "item": item.model_dump()}
+
+        yield {"type": "end", "count": count}
+
+    def _classify(self, req: Bc3ClassificationRequest) -> Dict[str, Any]:
+        if self._micro_batcher is not None:
+            result = self._micro_batcher.run(req)
+        else:
+            result = self._pipeline.run(req)
+        return self._build_envelope(req, result)
+
+    async def _classify_async(self, req: Bc3ClassificationRequest) -> Dict[str, Any]:
+        if self._micro_batcher is not None:
+            result = await self._micro_batcher.run_async(req)
+        else:
+            result = await self._pipeline.run_async(req)
+        return self._build_envelope(req, result)
+
+    def _prepare_request(self, payload: Dict[str, Any]) -> Bc3ClassificationRequest:
         req = Bc3ClassificationRequest.model_validate(payload)
 
         effective_batch_size = int(
@@ -156,28 +318,41 @@ class Bc3ClassifierLibrary:
             req.llm_batch_size,
             req.top_k_candidates,
         )
+        return req
 
-        result = self._pipeline.run(req)
+    def _build_envelope(
+        self,
+        req: Bc3ClassificationRequest,
+        result: Bc3ClasificacionResultado,
+    ) -> Dict[str, Any]:
+        return {
+            "meta": self._build_meta(req),
+            "data": result.model_dump(),
+        }
+
+    def _build_meta(self, req: Bc3ClassificationRequest) -> Dict[str, Any]:
         meta_sha = _sha256_json(req.model_dump(exclude_none=True))
 
         return {
-            "meta": {
-                "prompt_key": req.prompt_key,
-                "schema": "bc3_clasificacion_resultado",
-                "source_filename": (req.bc3_id or "bc3") + ".json",
-                "source_mime_type": "application/json",
-                "source_sha256": meta_sha,
-                "model": self._settings.openai_model,
-                "processed_at_utc": _utc_iso(),
-                "context": {
-                    "llm_batch_size": req.llm_batch_size,
-                    "descompuestos_count": len(req.descompuestos),
-                    "catalog_yaml_path": self._settings.bc3_catalog_yaml_path,
-                    "prompt_cache_enabled": self._settings.bc3_use_prompt_cache,
-                    "prompt_cache_retention": self._settings.bc3_prompt_cache_retention,
-                },
+            "prompt_key": req.prompt_key,
+            "schema": "bc3_clasificacion_resultado",
+            "source_filename": (req.bc3_id or "bc3") + ".json",
+            "source_mime_type": "application/json",
+            "source_sha256": meta_sha,
+            "model": self._settings.openai_model,
+            "processed_at_utc": _utc_iso(),
+            "context": {
+                "llm_batch_size": req.llm_batch_size,
+                "llm_max_concurrency": self._settings.bc3_llm_max_concurrency,
+                "llm_retry_budget": self._settings.bc3_llm_retry_budget,
+                "prompt_layout": self._settings.bc3_prompt_layout,
+                "descompuestos_count": len(req.descompuestos),
+                "catalog_yaml_path": self._settings.bc3_catalog_yaml_path,
+                "prompt_cache_enabled": self._settings.bc3_use_prompt_cache,
+                "prompt_cache_retention": self._settings.bc3_prompt_cache_retention,
+                "dedup_enabled": self._settings.bc3_dedup_enabled,
+                "fast_path_enabled": self._settings.bc3_fast_path_enabled,
             },
-            "data": result.model_dump(),
         }
 
     def classify_from_json_file(self, json_path: str | Path) -> Dict[str, Any]:
@@ -191,7 +366,12 @@ class Bc3ClassifierLibrary:
         payload = json.loads(text.lstrip("\ufeff"))
         if not isinstance(payload, dict):
             raise ValueError("El JSON raíz debe ser un objeto.")
-        return self.classify(payload)
+
+        # Trabajos largos desde fichero: con BC3_JOB_JOURNAL_ENABLED, relanzar
+        # el mismo JSON tras una caída reanuda desde el último lote anotado.
+        req = self._prepare_request(payload)
+        result = self._pipeline.run(req, journal=self._job_journal)
+        return self._build_envelope(req, result)
 
 
 class Bc3Classifier(Bc3ClassifierLibrary):
@@ -12,9 +12,13 @@ from typing import Any, Dict
 from ruesma_ocr_service.application.pipelines.bc3_classification_pipeline import (
     Bc3ClassificationPipeline,
 )
+from ruesma_ocr_service.application.services.bc3_batch_planner import Bc3BatchPlanner
 from ruesma_ocr_service.application.services.catalog_candidate_selector import (
     CatalogCandidateSelector,
 )
+from ruesma_ocr_service.application.services.llm_circuit_breaker import (
+    LlmCircuitBreaker,
+)
 from ruesma_ocr_service.application.services.prompted_text_extraction_service import (
     PromptedTextExtractionService,
 )
@@ -25,9 +29,16 @@ from ruesma_ocr_service.config.settings import Settings
 from ruesma_ocr_service.domain.models.bc3_classification_models import (
     Bc3ClassificationRequest,
 )
+from ruesma_ocr_service.infrastructure.cache.jsonl_bc3_job_journal import (
+    JsonlBc3JobJournal,
+)
+from ruesma_ocr_service.infrastructure.cache.sqlite_bc3_result_cache import (
+    SqliteBc3ResultCache,
+)
 from ruesma_ocr_service.infrastructure.catalog.compact_catalog_yaml_repository import (
     CompactCatalogYamlRepository,
 )
+from ruesma_ocr_service.infrastructure.llm.openai_rate_limiter import OpenAIRateLimiter
 from ruesma_ocr_service.infrastructure.llm.openai_responses_text_client import (
     OpenAIResponsesTextClient,
 )
@@ -97,7 +108,19 @@ def main() -> int:
     schema_registry = SchemaRegistry()
     catalog_repo = CompactCatalogYamlRepository(settings.bc3_catalog_yaml_path)
 
-    llm_text = OpenAIResponsesTextClient(api_key=settings.openai_api_key)
+    rate_limiter = OpenAIRateLimiter(
+        requests_per_minute=settings.openai_rpm_limit,
+        tokens_per_minute=settings.openai_tpm_limit,
+        max_retries=settings.openai_rate_limit_max_retries,
+        backoff_base_s=settings.openai_backoff_base_s,
+        backoff_max_s=settings.openai_backoff_max_s,
+    )
+    llm_text = OpenAIResponsesTextClient(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url,
+        rate_limiter=rate_limiter,
+        lane=settings.llm_lane,
+    )
     extractor_text = PromptedTextExtractionService(
         llm_client=llm_text,
         prompt_repo=prompt_repo,
@@ -105,13 +128,52 @@ def main() -> int:
         model=settings.openai_model,
     )
 
+    circuit_breaker = LlmCircuitBreaker(
+        failure_threshold=settings.bc3_llm_circuit_failure_threshold,
+        cooldown_s=settings.bc3_llm_circuit_cooldown_s,
+    )
+
+    job_journal = None
+    if settings.bc3_job_journal_enabled:
+        job_journal = JsonlBc3JobJournal(
+            directory=settings.bc3_job_journal_dir,
+            max_age_s=settings.bc3_job_journal_max_age_h * 3600,
+        )
+
+    result_cache = None
+    if settings.bc3_result_cache_enabled:
+        result_cache = SqliteBc3ResultCache(
+            path=settings.bc3_result_cache_path,
+            max_bytes=settings.bc3_result_cache_max_mb * 1024 * 1024,
+        )
+
     pipeline = Bc3ClassificationPipeline(
         extractor=extractor_text,
-        selector=CatalogCandidateSelector(),
+        selector=CatalogCandidateSelector(
+            prefilter_limit=settings.bc3_selector_prefilter_limit,
+            full_rerank=settings.bc3_selector_full_rerank,
+            similarity=settings.bc3_selector_similarity,
+        ),
         catalog_repository=catalog_repo,
         prompt_cache_enabled=settings.bc3_use_prompt_cache,
         prompt_cache_key_prefix=settings.bc3_prompt_cache_key_prefix,
         prompt_cache_retention=settings.bc3_prompt_cache_retention,
+        selector_engine=settings.bc3_selector_engine,
+        dedup_enabled=settings.bc3_dedup_enabled,
+        fast_path_enabled=settings.bc3_fast_path_enabled,
+        fast_path_min_confidence=settings.bc3_fast_path_min_confidence,
+        fast_path_min_margin=settings.bc3_fast_path_min_margin,
+        result_cache=result_cache,
+        llm_max_concurrency=settings.bc3_llm_max_concurrency,
+        llm_retry_budget=settings.bc3_llm_retry_budget,
+        prompt_layout=settings.bc3_prompt_layout,
+        circuit_breaker=circuit_breaker,
+        llm_call_timeout_s=settings.bc3_llm_call_timeout_s,
+        request_deadline_s=settings.bc3_request_deadline_s,
+        batch_planner=Bc3BatchPlanner(
+            max_input_tokens=settings.bc3_batch_max_input_tokens,
+            max_output_tokens=settings.bc3_batch_max_output_tokens,
+        ),
     )
 
     logger.info(
@@ -125,7 +187,7 @@ def main() -> int:
         [item.id for item in req.descompuestos],
     )
 
-    result = pipeline.run(req)
+    result = pipeline.run(req, journal=job_journal)
 
     meta_sha = _sha256_json(req.model_dump(exclude_none=True))
     envelope = {
@@ -22,6 +22,15 @@ class Settings(BaseSettings):
         "gpt-5.2",
         validation_alias=AliasChoices("OPENAI_MODEL", "OPENAI_MODEL_NAME"),
     )
+    openai_base_url: str | None = Field(default=None, alias="OPENAI_BASE_URL")
+
+    # Planificador de llamadas compartido por los clientes OpenAI del proceso.
+    openai_rpm_limit: int = Field(0, alias="OPENAI_RPM_LIMIT")
+    openai_tpm_limit: int = Field(0, alias="OPENAI_TPM_LIMIT")
+    openai_rate_limit_max_retries: int = Field(5, alias="OPENAI_RATE_LIMIT_MAX_RETRIES")
+    openai_backoff_base_s: float = Field(1.0, alias="OPENAI_BACKOFF_BASE_S")
+    openai_backoff_max_s: float = Field(60.0, alias="OPENAI_BACKOFF_MAX_S")
+    llm_lane: str = Field("interactive", alias="LLM_LANE")
 
     prompts_yaml_path: str = Field(
         default_factory=default_prompts_yaml_path,
@@ -42,6 +51,65 @@ class Settings(BaseSettings):
     )
     bc3_llm_batch_size: int = Field(5, alias="BC3_LLM_BATCH_SIZE")
     bc3_default_top_k: int = Field(20, alias="BC3_DEFAULT_TOP_K")
+    bc3_llm_max_concurrency: int = Field(4, alias="BC3_LLM_MAX_CONCURRENCY")
+    bc3_micro_batch_enabled: bool = Field(False, alias="BC3_MICRO_BATCH_ENABLED")
+    bc3_micro_batch_max_wait_ms: float = Field(20.0, alias="BC3_MICRO_BATCH_MAX_WAIT_MS")
+    bc3_micro_batch_max_items: int = Field(20, alias="BC3_MICRO_BATCH_MAX_ITEMS")
+    bc3_coalesce_enabled: bool = Field(False, alias="BC3_COALESCE_ENABLED")
+    bc3_coalesce_ttl_s: float = Field(30.0, alias="BC3_COALESCE_TTL_S")
+    bc3_coalesce_max_entries: int = Field(256, alias="BC3_COALESCE_MAX_ENTRIES")
+    bc3_llm_retry_budget: int = Field(3, alias="BC3_LLM_RETRY_BUDGET")
+    bc3_llm_circuit_failure_threshold: int = Field(
+        5,
+        alias="BC3_LLM_CIRCUIT_FAILURE_THRESHOLD",
+    )
+    bc3_llm_circuit_cooldown_s: float = Field(30.0, alias="BC3_LLM_CIRCUIT_COOLDOWN_S")
+    bc3_llm_call_timeout_s: float = Field(120.0, alias="BC3_LLM_CALL_TIMEOUT_S")
+    bc3_request_deadline_s: float = Field(0.0, alias="BC3_REQUEST_DEADLINE_S")
+    bc3_batch_max_input_tokens: int = Field(
+        3000,
+        alias="BC3_BATCH_MAX_INPUT_TOKENS",
+    )
+    bc3_batch_max_output_tokens: int = Field(
+        1500,
+        alias="BC3_BATCH_MAX_OUTPUT_TOKENS",
+    )
+    bc3_selector_prefilter_limit: int = Field(
+        300,
+        alias="BC3_SELECTOR_PREFILTER_LIMIT",
+    )
+    bc3_selector_full_rerank: bool = Field(
+        False,
+        alias="BC3_SELECTOR_FULL_RERANK",
+    )
+    bc3_selector_engine: str = Field("scalar", alias="BC3_SELECTOR_ENGINE")
+    bc3_selector_similarity: str = Field(
+        "trigram",
+        alias="BC3_SELECTOR_SIMILARITY",
+    )
+    bc3_dedup_enabled: bool = Field(True, alias="BC3_DEDUP_ENABLED")
+    bc3_fast_path_enabled: bool = Field(False, alias="BC3_FAST_PATH_ENABLED")
+    bc3_fast_path_min_confidence: float = Field(
+        85.0,
+        alias="BC3_FAST_PATH_MIN_CONFIDENCE",
+    )
+    bc3_fast_path_min_margin: float = Field(
+        0.25,
+        alias="BC3_FAST_PATH_MIN_MARGIN",
+    )
+    bc3_result_cache_enabled: bool = Field(
+        False,
+        alias="BC3_RESULT_CACHE_ENABLED",
+    )
+    bc3_result_cache_path: str = Field(
+        "cache/bc3_results.sqlite3",
+        alias="BC3_RESULT_CACHE_PATH",
+    )
+    bc3_result_cache_max_mb: int = Field(256, alias="BC3_RESULT_CACHE_MAX_MB")
+
+    bc3_job_journal_enabled: bool = Field(False, alias="BC3_JOB_JOURNAL_ENABLED")
+    bc3_job_journal_dir: str = Field("cache/bc3_journal", alias="BC3_JOB_JOURNAL_DIR")
+    bc3_job_journal_max_age_h: float = Field(72.0, alias="BC3_JOB_JOURNAL_MAX_AGE_H")
 
     bc3_use_prompt_cache: bool = Field(True, alias="BC3_USE_PROMPT_CACHE")
     bc3_prompt_cache_key_prefix: str = Field(
@@ -52,6 +120,7 @@ class Settings(BaseSettings):
         "24h",
         alias="BC3_PROMPT_CACHE_RETENTION",
     )
+    bc3_prompt_layout: str = Field("prefix", alias="BC3_PROMPT_LAYOUT")
 
     bc3_ingestor_json_path: str = Field(
         "input/request.json",
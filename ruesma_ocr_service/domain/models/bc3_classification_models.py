@@ -1,7 +1,7 @@
 # ruesma_ocr_service/domain/models/bc3_classification_models.py
 from __future__ import annotations
 
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
@@ -87,6 +87,68 @@ class Bc3ClasificacionResultado(BaseModel):
     resultados: List[Bc3ClasificacionItem] = Field(default_factory=list)
 
 
+# Esquema de salida que se pide al LLM: solo lo que decide el modelo, con
+# claves cortas. El tipo va como tipo_id del catálogo compacto (I =
+# INDETERMINADO) y el resto de campos se rellenan localmente.
+Bc3TipoCodigo = Literal["S", "M", "A", "C", "L", "X", "I"]
+
+BC3_TIPO_BY_CODIGO: Dict[str, Bc3TipoClasificacion] = {
+    "S": "SUMINISTRO",
+    "M": "MONTAJE",
+    "A": "SUMINISTRO_CON_MONTAJE",
+    "C": "MAQUINARIA_COMPRA",
+    "L": "MAQUINARIA_ALQUILER",
+    "X": "MEDIOS_AUXILIARES",
+    "I": "INDETERMINADO",
+}
+
+
+class Bc3ClasificacionCompactaItem(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    i: str
+    c: Optional[str] = None
+    t: Bc3TipoCodigo = "I"
+    p: float = Field(default=0.0, ge=0, le=100)
+
+    def expand(self) -> "Bc3ClasificacionItem":
+        return Bc3ClasificacionItem(
+            id=self.i,
+            tipo=BC3_TIPO_BY_CODIGO.get(self.t, "INDETERMINADO"),
+            codigo_interno=self.c,
+            confianza_pct=self.p,
+        )
+
+
+class Bc3ClasificacionCompacta(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    r: List[Bc3ClasificacionCompactaItem] = Field(default_factory=list)
+
+    def expand(self) -> Bc3ClasificacionResultado:
+        return Bc3ClasificacionResultado(
+            resultados=[item.expand() for item in self.r]
+        )
+
+
+class Bc3FamiliaCompactaItem(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    i: str
+    f: List[str] = Field(default_factory=list)
+
+
+class Bc3FamiliaCompacta(BaseModel):
+    """
+    Salida de la primera etapa del modo jerárquico: familias del catálogo
+    candidatas por descompuesto (el tipo lo decide la segunda etapa).
+    """
+
+    model_config = ConfigDict(extra="ignore")
+
+    r: List[Bc3FamiliaCompactaItem] = Field(default_factory=list)
+
+
 class Bc3ClassificationRequest(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
@@ -94,6 +156,8 @@ class Bc3ClassificationRequest(BaseModel):
     bc3_id: Optional[str] = None
     top_k_candidates: int = Field(default=20, ge=1, le=200)
     llm_batch_size: int = Field(default=5, ge=1, le=100)
+    # Plazo total del request en segundos (None = el configurado en el servicio).
+    deadline_s: Optional[float] = Field(default=None, gt=0)
 
     descompuestos: List[Bc3DescompuestoInput] = Field(default_factory=list)
 
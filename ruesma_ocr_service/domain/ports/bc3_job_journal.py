@@ -0,0 +1,35 @@
+# ruesma_ocr_service/domain/ports/bc3_job_journal.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Dict, Mapping
+
+from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionItem,
+)
+
+
+class Bc3JobJournal(ABC):
+    """
+    Diario de un trabajo BC3 para reanudarlo tras una caída. La clave del
+    trabajo la construye el pipeline (request, modelo, layout y versión de
+    catálogo); cada entrada guarda los items reparados de un lote por su
+    posición en el request.
+    """
+
+    @abstractmethod
+    def load(self, job_key: str) -> Dict[int, Bc3ClasificacionItem]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def append(
+        self,
+        job_key: str,
+        batch_index: int,
+        items: Mapping[int, Bc3ClasificacionItem],
+    ) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete(self, job_key: str) -> None:
+        raise NotImplementedError
@@ -0,0 +1 @@
+# ruesma_ocr_service/infrastructure/cache/__init__.py
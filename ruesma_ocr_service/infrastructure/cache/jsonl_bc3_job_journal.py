@@ -0,0 +1,160 @@
+# ruesma_ocr_service/infrastructure/cache/jsonl_bc3_job_journal.py
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping
+
+from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionItem,
+)
+from ruesma_ocr_service.domain.ports.bc3_job_journal import Bc3JobJournal
+
+logger = logging.getLogger(__name__)
+
+
+class JsonlBc3JobJournal(Bc3JobJournal):
+    """
+    Un fichero JSONL de solo añadir por trabajo (`<job_key>.jsonl`): una
+    línea por lote, escrita y sincronizada a disco al repararse. Una última
+    línea cortada por la caída se descarta al leer, truncando el fichero
+    para que el siguiente lote empiece en línea nueva. El diario se borra
+    cuando el trabajo termina y, al abrir, se purgan los de trabajos que
+    nunca se reanudaron en `max_age_s` segundos.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str | Path,
+        max_age_s: float = 72 * 3600,
+    ) -> None:
+        self._directory = Path(directory)
+        self._max_age_s = max(0.0, float(max_age_s))
+        self._lock = threading.Lock()
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self.purge_stale()
+
+    def load(self, job_key: str) -> Dict[int, Bc3ClasificacionItem]:
+        path = self._path(job_key)
+        items: Dict[int, Bc3ClasificacionItem] = {}
+        if not path.exists():
+            return items
+
+        with self._lock:
+            self._truncate_torn_tail(path)
+
+        batches = 0
+        with path.open("r", encoding="utf-8") as handle:
+            for line_number, line in enumerate(handle, start=1):
+                try:
+                    entry = json.loads(line)
+                    for position, raw in entry["items"].items():
+                        items[int(position)] = Bc3ClasificacionItem.model_validate(raw)
+                except Exception as exc:
+                    logger.warning(
+                        "Línea ilegible en el diario BC3; se ignora. path=%s linea=%s error=%s",
+                        path,
+                        line_number,
+                        exc,
+                    )
+                    continue
+                batches += 1
+
+        logger.info(
+            "Diario BC3 encontrado: se reanuda el trabajo. path=%s lotes=%s items=%s",
+            path,
+            batches,
+            len(items),
+        )
+        return items
+
+    def append(
+        self,
+        job_key: str,
+        batch_index: int,
+        items: Mapping[int, Bc3ClasificacionItem],
+    ) -> None:
+        line = json.dumps(
+            {
+                "batch": batch_index,
+                "items": {
+                    str(position): item.model_dump(mode="json")
+                    for position, item in items.items()
+                },
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        with self._lock:
+            with self._path(job_key).open("a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def complete(self, job_key: str) -> None:
+        with self._lock:
+            self._path(job_key).unlink(missing_ok=True)
+
+    def purge_stale(self) -> int:
+        if not self._max_age_s:
+            return 0
+
+        cutoff = time.time() - self._max_age_s
+        removed = 0
+        for path in self._directory.glob("*.jsonl"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError as exc:
+                logger.warning("No se pudo purgar el diario BC3. path=%s error=%s", path, exc)
+
+        if removed:
+            logger.info(
+                "Diarios BC3 caducados purgados. directorio=%s borrados=%s max_age_s=%s",
+                self._directory,
+                removed,
+                self._max_age_s,
+            )
+        return removed
+
+    @staticmethod
+    def _truncate_torn_tail(path: Path) -> None:
+        with path.open("rb+") as handle:
+            size = handle.seek(0, os.SEEK_END)
+            if not size:
+                return
+            handle.seek(size - 1)
+            if handle.read(1) == b"\n":
+                return
+
+            # Se retrocede por bloques hasta el último salto de línea.
+            end = size
+            keep = 0
+            while end > 0:
+                start = max(0, end - 65536)
+                handle.seek(start)
+                newline = handle.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    keep = start + newline + 1
+                    break
+                end = start
+
+            handle.truncate(keep)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+        logger.warning(
+            "Última línea del diario BC3 cortada; se descarta. path=%s bytes=%s",
+            path,
+            size - keep,
+        )
+
+    def _path(self, job_key: str) -> Path:
+        return self._directory / f"{job_key}.jsonl"
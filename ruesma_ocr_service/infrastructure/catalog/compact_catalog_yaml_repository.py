@@ -5,7 +5,7 @@ import hashlib
 import logging
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import yaml
 
@@ -64,6 +64,72 @@ class CompactCatalogBundle:
     def to_bc3_catalog_items(self) -> List[Bc3CatalogoItem]:
         return [entry.to_bc3_catalog_item() for entry in self.entries]
 
+    def codes_by_family(self) -> Dict[str, List[str]]:
+        grouped: Dict[str, List[str]] = {}
+        for entry in self.entries:
+            grouped.setdefault(entry.family_id, []).append(entry.code)
+        return grouped
+
+    def family_legend_text(self, *, examples_per_family: int = 3) -> str:
+        """
+        Leyenda para la primera etapa del modo jerárquico: una línea por
+        familia con sus tipos, grupos y unas descripciones de ejemplo.
+        """
+        types: Dict[str, str] = {}
+        groups: Dict[str, str] = {}
+        families: Dict[str, List[CatalogEntry]] = {}
+        for entry in self.entries:
+            types[entry.type_code] = entry.type_name
+            if entry.group_id:
+                groups[entry.group_id] = entry.group_name or ""
+            families.setdefault(entry.family_id, []).append(entry)
+
+        lines: List[str] = ["BC3FAMv1", f"V={self.version}", "T"]
+        lines.extend(f"{key}={types[key]}" for key in sorted(types))
+        if groups:
+            lines.append("G")
+            lines.extend(f"{key}={groups[key]}" for key in sorted(groups))
+
+        lines.append("F")
+        for family_id in sorted(families):
+            members = families[family_id]
+            lines.append(
+                "|".join(
+                    [
+                        family_id,
+                        ",".join(sorted({entry.type_code for entry in members})),
+                        ",".join(sorted({entry.group_id for entry in members if entry.group_id})),
+                        members[0].family_name,
+                        ";".join(
+                            entry.description
+                            for entry in members[:examples_per_family]
+                        ),
+                    ]
+                )
+            )
+
+        lines.append("END")
+        return "\n".join(lines)
+
+    def slice_prompt_text(self, codes: Iterable[str]) -> str:
+        """
+        Mismo formato BC3CATv1 que `prompt_text` pero solo con los códigos
+        indicados y las leyendas de tipo/grupo/familia que usan.
+        """
+        wanted = set(codes)
+        entries = [entry for entry in self.entries if entry.code in wanted]
+        return CompactCatalogYamlRepository._build_prompt_text(
+            version=self.version,
+            types={entry.type_code: entry.type_name for entry in entries},
+            groups={
+                entry.group_id: entry.group_name or ""
+                for entry in entries
+                if entry.group_id
+            },
+            families={entry.family_id: entry.family_name for entry in entries},
+            entries=entries,
+        )
+
 
 class CompactCatalogYamlRepository:
     def __init__(self, yaml_path: str | Path) -> None:
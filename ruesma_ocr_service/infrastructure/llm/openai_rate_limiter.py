@@ -0,0 +1,478 @@
+# ruesma_ocr_service/infrastructure/llm/openai_rate_limiter.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Mapping, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LLM_LANES = ("interactive", "bulk")
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+_RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+# Estimación previa de una llamada (se corrige con el uso real al terminar):
+# ~4 caracteres por token de texto, un fijo por adjunto y margen de salida.
+_CHARS_PER_TOKEN = 4
+_ATTACHMENT_TOKENS = 1500
+_OUTPUT_TOKENS = 500
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# Espera máxima entre comprobaciones mientras se aguarda turno.
+_POLL_MAX_S = 0.25
+
+
+class LlmDeadlineExceededError(TimeoutError):
+    """
+    El plazo de la llamada venció esperando turno en el planificador, antes
+    de enviar nada a OpenAI: no dice nada de la salud del proveedor.
+    """
+
+
+def estimate_request_tokens(request_kwargs: Mapping[str, Any]) -> int:
+    chars = len(str(request_kwargs.get("instructions") or ""))
+    attachments = 0
+    for message in request_kwargs.get("input") or []:
+        for part in message.get("content") or []:
+            if part.get("type") == "input_text":
+                chars += len(str(part.get("text") or ""))
+            else:
+                attachments += 1
+    return chars // _CHARS_PER_TOKEN + attachments * _ATTACHMENT_TOKENS + _OUTPUT_TOKENS
+
+
+def response_total_tokens(response: Any) -> int | None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    total = getattr(usage, "total_tokens", None)
+    if total is None:
+        total = int(getattr(usage, "input_tokens", 0) or 0) + int(
+            getattr(usage, "output_tokens", 0) or 0
+        )
+    return int(total)
+
+
+def _parse_duration_s(raw: str | None) -> float | None:
+    """
+    Formatos de las cabeceras de OpenAI: "20ms", "1s", "6m0s", "1h2m3.5s"
+    o segundos sin unidad (retry-after).
+    """
+    if raw is None:
+        return None
+    text = str(raw).strip().lower()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART_RE.findall(text)
+    if not parts:
+        return None
+    return sum(float(value) * _DURATION_UNITS[unit] for value, unit in parts)
+
+
+def _header(headers: Mapping[str, Any] | None, name: str) -> str | None:
+    if headers is None:
+        return None
+    try:
+        value = headers.get(name)
+    except Exception:
+        return None
+    return None if value is None else str(value)
+
+
+def _int_header(headers: Mapping[str, Any] | None, name: str) -> int | None:
+    value = _header(headers, name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def _retry_after_s(headers: Mapping[str, Any] | None) -> float | None:
+    retry_after_ms = _header(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+    return _parse_duration_s(_header(headers, "retry-after"))
+
+
+@dataclass(frozen=True)
+class RateLimitStats:
+    calls: int
+    rate_limited: int
+    retries: int
+    waited_s: float
+
+
+class OpenAIRateLimiter:
+    """
+    Planificador compartido por los clientes OpenAI de un proceso: cubos de
+    tokens para peticiones y tokens por minuto (0 = sin límite local),
+    ajuste con las cabeceras x-ratelimit-* de cada respuesta, pausa global
+    con backoff exponencial y jitter ante un 429, y dos carriles: "bulk"
+    solo avanza cuando no hay llamadas "interactive" esperando.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_retries: int = 5,
+        backoff_base_s: float = 1.0,
+        backoff_max_s: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self._rpm = max(0, int(requests_per_minute))
+        self._tpm = max(0, int(tokens_per_minute))
+        self._max_retries = max(0, int(max_retries))
+        self._backoff_base_s = max(0.0, float(backoff_base_s))
+        self._backoff_max_s = max(self._backoff_base_s, float(backoff_max_s))
+        self._clock = clock
+        self._rng = rng
+
+        self._lock = threading.Lock()
+        now = self._clock()
+        self._request_level = float(self._rpm)
+        self._token_level = float(self._tpm)
+        self._refilled_at = now
+        self._paused_until = now
+        self._waiting = {lane: 0 for lane in LLM_LANES}
+
+        self._calls = 0
+        self._rate_limited = 0
+        self._retries = 0
+        self._waited_s = 0.0
+
+    def call(
+        self,
+        send: Callable[[float | None], T],
+        *,
+        estimated_tokens: int,
+        lane: str = "interactive",
+        usage_tokens: Callable[[T], int | None] | None = None,
+        timeout_s: float | None = None,
+    ) -> T:
+        """
+        Ejecuta `send` cuando hay turno y lo reintenta si procede. Con
+        `timeout_s`, esperas y reintentos no pasan de ese plazo y `send`
+        recibe el tiempo que queda para usarlo como timeout de la petición.
+        """
+        lane = self._check_lane(lane)
+        deadline = self._deadline(timeout_s)
+        attempt = 0
+        while True:
+            self._wait_turn(
+                estimated_tokens=estimated_tokens,
+                lane=lane,
+                deadline=deadline,
+            )
+            try:
+                result = send(self._remaining_s(deadline))
+            except Exception as exc:
+                delay = self._retry_delay(
+                    exc=exc,
+                    attempt=attempt,
+                    estimated_tokens=estimated_tokens,
+                    deadline=deadline,
+                )
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            self._settle(
+                result=result,
+                estimated_tokens=estimated_tokens,
+                usage_tokens=usage_tokens,
+            )
+            return result
+
+    async def call_async(
+        self,
+        send: Callable[[float | None], Awaitable[T]],
+        *,
+        estimated_tokens: int,
+        lane: str = "interactive",
+        usage_tokens: Callable[[T], int | None] | None = None,
+        timeout_s: float | None = None,
+    ) -> T:
+        lane = self._check_lane(lane)
+        deadline = self._deadline(timeout_s)
+        attempt = 0
+        while True:
+            await self._wait_turn_async(
+                estimated_tokens=estimated_tokens,
+                lane=lane,
+                deadline=deadline,
+            )
+            try:
+                result = await send(self._remaining_s(deadline))
+            except Exception as exc:
+                delay = self._retry_delay(
+                    exc=exc,
+                    attempt=attempt,
+                    estimated_tokens=estimated_tokens,
+                    deadline=deadline,
+                )
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self._settle(
+                result=result,
+                estimated_tokens=estimated_tokens,
+                usage_tokens=usage_tokens,
+            )
+            return result
+
+    def observe_headers(self, headers: Mapping[str, Any] | None) -> None:
+        """
+        Alinea los cubos locales con lo que el proveedor dice que queda (lo
+        que consumen otros procesos con la misma cuenta también cuenta).
+        """
+        remaining_requests = _int_header(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _int_header(headers, "x-ratelimit-remaining-tokens")
+        if remaining_requests is None and remaining_tokens is None:
+            return
+
+        with self._lock:
+            self._refill_locked()
+            if self._rpm and remaining_requests is not None:
+                self._request_level = min(
+                    self._request_level,
+                    float(remaining_requests),
+                )
+            if self._tpm and remaining_tokens is not None:
+                self._token_level = min(self._token_level, float(remaining_tokens))
+
+            if remaining_requests == 0:
+                self._pause_locked(
+                    _parse_duration_s(_header(headers, "x-ratelimit-reset-requests"))
+                )
+            if remaining_tokens == 0:
+                self._pause_locked(
+                    _parse_duration_s(_header(headers, "x-ratelimit-reset-tokens"))
+                )
+
+    def stats(self) -> RateLimitStats:
+        with self._lock:
+            return RateLimitStats(
+                calls=self._calls,
+                rate_limited=self._rate_limited,
+                retries=self._retries,
+                waited_s=round(self._waited_s, 3),
+            )
+
+    @staticmethod
+    def _check_lane(lane: str) -> str:
+        normalized = (lane or "interactive").strip().lower()
+        if normalized not in LLM_LANES:
+            raise ValueError(
+                f"Carril LLM '{lane}' no soportado. Disponibles: {', '.join(LLM_LANES)}"
+            )
+        return normalized
+
+    def _deadline(self, timeout_s: float | None) -> float | None:
+        if timeout_s is None or timeout_s <= 0:
+            return None
+        return self._clock() + float(timeout_s)
+
+    def _remaining_s(self, deadline: float | None) -> float | None:
+        if deadline is None:
+            return None
+        return max(0.001, deadline - self._clock())
+
+    def _check_deadline(self, deadline: float | None, wait_s: float) -> None:
+        if deadline is not None and self._clock() + wait_s >= deadline:
+            raise LlmDeadlineExceededError(
+                "Plazo agotado esperando turno para llamar a OpenAI."
+            )
+
+    def _wait_turn(
+        self,
+        *,
+        estimated_tokens: int,
+        lane: str,
+        deadline: float | None = None,
+    ) -> None:
+        with self._lock:
+            self._waiting[lane] += 1
+        try:
+            while True:
+                wait_s = self._try_reserve(estimated_tokens=estimated_tokens, lane=lane)
+                if wait_s <= 0:
+                    return
+                self._check_deadline(deadline, wait_s)
+                time.sleep(wait_s)
+        finally:
+            with self._lock:
+                self._waiting[lane] -= 1
+
+    async def _wait_turn_async(
+        self,
+        *,
+        estimated_tokens: int,
+        lane: str,
+        deadline: float | None = None,
+    ) -> None:
+        with self._lock:
+            self._waiting[lane] += 1
+        try:
+            while True:
+                wait_s = self._try_reserve(estimated_tokens=estimated_tokens, lane=lane)
+                if wait_s <= 0:
+                    return
+                self._check_deadline(deadline, wait_s)
+                await asyncio.sleep(wait_s)
+        finally:
+            with self._lock:
+                self._waiting[lane] -= 1
+
+    def _try_reserve(self, *, estimated_tokens: int, lane: str) -> float:
+        """
+        Reserva una petición y `estimated_tokens` si hay saldo; si no,
+        devuelve cuántos segundos esperar antes de volver a intentarlo.
+        """
+        with self._lock:
+            self._refill_locked()
+            now = self._clock()
+
+            wait_s = self._paused_until - now
+            if lane == "bulk" and self._waiting["interactive"] > 0:
+                wait_s = max(wait_s, 0.01)
+
+            tokens = 0.0
+            if self._tpm:
+                tokens = min(float(estimated_tokens), float(self._tpm))
+            if self._rpm and self._request_level < 1.0:
+                wait_s = max(wait_s, (1.0 - self._request_level) * 60.0 / self._rpm)
+            if self._tpm and self._token_level < tokens:
+                wait_s = max(wait_s, (tokens - self._token_level) * 60.0 / self._tpm)
+
+            if wait_s > 0:
+                wait_s = min(wait_s, _POLL_MAX_S)
+                self._waited_s += wait_s
+                return wait_s
+
+            if self._rpm:
+                self._request_level -= 1.0
+            if self._tpm:
+                self._token_level -= tokens
+            self._calls += 1
+            return 0.0
+
+    def _refill_locked(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._refilled_at)
+        self._refilled_at = now
+        if self._rpm:
+            self._request_level = min(
+                float(self._rpm),
+                self._request_level + elapsed * self._rpm / 60.0,
+            )
+        if self._tpm:
+            self._token_level = min(
+                float(self._tpm),
+                self._token_level + elapsed * self._tpm / 60.0,
+            )
+
+    def _pause_locked(self, delay_s: float | None) -> None:
+        if delay_s is None or delay_s <= 0:
+            return
+        self._paused_until = max(self._paused_until, self._clock() + delay_s)
+
+    def _retry_delay(
+        self,
+        *,
+        exc: Exception,
+        attempt: int,
+        estimated_tokens: int,
+        deadline: float | None = None,
+    ) -> float | None:
+        status = getattr(exc, "status_code", None)
+        retryable = (
+            status in _RETRYABLE_STATUS
+            or type(exc).__name__ in _RETRYABLE_ERROR_NAMES
+        )
+        if not retryable:
+            return None
+
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        retry_after = _retry_after_s(headers)
+        backoff = min(self._backoff_max_s, self._backoff_base_s * (2 ** attempt))
+        delay = backoff * self._rng()
+        if retry_after is not None:
+            delay = retry_after + delay * 0.1
+
+        with self._lock:
+            # La petición fallida no consumió cuota: se devuelve lo reservado.
+            if self._tpm:
+                self._token_level = min(
+                    float(self._tpm),
+                    self._token_level + min(float(estimated_tokens), float(self._tpm)),
+                )
+            if status == 429:
+                self._rate_limited += 1
+                # El límite es de cuenta: se pausan todas las llamadas.
+                self._pause_locked(delay)
+            if attempt >= self._max_retries:
+                return None
+            if deadline is not None and self._clock() + delay >= deadline:
+                return None
+            self._retries += 1
+
+        logger.warning(
+            "OpenAI no disponible temporalmente (status=%s). Reintento %s/%s en %.2fs. error=%s",
+            status,
+            attempt + 1,
+            self._max_retries,
+            delay,
+            exc,
+        )
+        return delay
+
+    def _settle(
+        self,
+        *,
+        result: Any,
+        estimated_tokens: int,
+        usage_tokens: Callable[[Any], int | None] | None,
+    ) -> None:
+        if not self._tpm:
+            return
+        if usage_tokens is not None:
+            actual = usage_tokens(result)
+        else:
+            actual = response_total_tokens(result)
+        if actual is None:
+            return
+
+        with self._lock:
+            reserved = min(float(estimated_tokens), float(self._tpm))
+            self._token_level = min(
+                float(self._tpm),
+                self._token_level + reserved - float(actual),
+            )
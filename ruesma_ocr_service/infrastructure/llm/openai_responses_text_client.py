@@ -7,15 +7,118 @@ from typing import Any, Type
 
 from pydantic import BaseModel
 
+from ruesma_ocr_service.domain.models.llm_usage import LlmUsage, LlmUsageSink
+from ruesma_ocr_service.infrastructure.llm.openai_rate_limiter import (
+    OpenAIRateLimiter,
+    estimate_request_tokens,
+)
 from ruesma_ocr_service.infrastructure.llm.openai_sdk_compat import (
     patch_openai_pydantic_compat,
+    resolve_openai_base_url,
 )
 
 logger = logging.getLogger(__name__)
 
 
+def should_retry_without_cache(
+    *,
+    exc: Exception,
+    prompt_cache_requested: bool,
+) -> bool:
+    if not prompt_cache_requested:
+        return False
+
+    detail = str(exc).lower()
+    return (
+        "prompt_cache_key" in detail
+        or "prompt_cache_retention" in detail
+    )
+
+
+def usage_from_response(response: Any) -> LlmUsage | None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+
+    details = getattr(usage, "input_tokens_details", None)
+    return LlmUsage(
+        input_tokens=int(getattr(usage, "input_tokens", 0) or 0),
+        output_tokens=int(getattr(usage, "output_tokens", 0) or 0),
+        cached_input_tokens=int(getattr(details, "cached_tokens", 0) or 0),
+    )
+
+
+def build_text_request(
+    *,
+    model: str,
+    system: str,
+    task: str,
+    payload: dict[str, Any],
+    response_model: Type[BaseModel],
+    prompt_cache_key: str | None = None,
+    prompt_cache_retention: str | None = None,
+    context_text: str | None = None,
+) -> dict[str, Any]:
+    """
+    kwargs de `responses.parse` compartidos por el cliente síncrono y el
+    asíncrono. Con `context_text`, la tarea y ese texto van en un primer
+    bloque estable y el payload en un segundo bloque: el prefijo que ve el
+    proveedor es idéntico byte a byte entre llamadas.
+    """
+    payload_text = json.dumps(
+        payload,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=False,
+    )
+    if context_text:
+        content_texts = [f"{task}\n\n{context_text}", f"INPUT_JSON:\n{payload_text}"]
+    else:
+        content_texts = [f"{task}\n\nINPUT_JSON:\n{payload_text}"]
+
+    logger.info(
+        "OpenAI TEXT call. model=%s schema=%s chars=%s cache_key=%s cache_retention=%s prefijo_estable=%s",
+        model,
+        response_model.__name__,
+        sum(len(text) for text in content_texts),
+        bool(prompt_cache_key),
+        prompt_cache_retention,
+        bool(context_text),
+    )
+
+    request_kwargs: dict[str, Any] = {
+        "model": model,
+        "instructions": system,
+        "input": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "input_text",
+                        "text": text,
+                    }
+                    for text in content_texts
+                ],
+            }
+        ],
+        "text_format": response_model,
+    }
+
+    if prompt_cache_key:
+        request_kwargs["prompt_cache_key"] = prompt_cache_key
+    if prompt_cache_retention:
+        request_kwargs["prompt_cache_retention"] = prompt_cache_retention
+    return request_kwargs
+
+
 class OpenAIResponsesTextClient:
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str | None = None,
+        rate_limiter: OpenAIRateLimiter | None = None,
+        lane: str = "interactive",
+    ) -> None:
         patch_openai_pydantic_compat()
         http_client = self._build_http_client()
         try:
@@ -26,7 +129,18 @@ class OpenAIResponsesTextClient:
                 "Instala las dependencias del servicio 2 antes de usar la librería."
             ) from exc
 
-        self._client = OpenAI(api_key=api_key, http_client=http_client)
+        client_kwargs: dict[str, Any] = {
+            "api_key": api_key,
+            "base_url": resolve_openai_base_url(base_url),
+            "http_client": http_client,
+        }
+        if rate_limiter is not None:
+            # Los reintentos ante 429/5xx los gestiona el planificador.
+            client_kwargs["max_retries"] = 0
+
+        self._rate_limiter = rate_limiter
+        self._lane = lane
+        self._client = OpenAI(**client_kwargs)
 
     @staticmethod
     def _build_http_client():
@@ -44,21 +158,6 @@ class OpenAIResponsesTextClient:
                     "No se pudo construir el cliente HTTP para OpenAI."
                 ) from exc
 
-    @staticmethod
-    def _should_retry_without_cache(
-        *,
-        exc: Exception,
-        prompt_cache_requested: bool,
-    ) -> bool:
-        if not prompt_cache_requested:
-            return False
-
-        detail = str(exc).lower()
-        return (
-            "prompt_cache_key" in detail
-            or "prompt_cache_retention" in detail
-        )
-
     def extract_structured(
         self,
         *,
@@ -69,48 +168,23 @@ class OpenAIResponsesTextClient:
         response_model: Type[BaseModel],
         prompt_cache_key: str | None = None,
         prompt_cache_retention: str | None = None,
+        usage_sink: LlmUsageSink | None = None,
+        context_text: str | None = None,
+        timeout_s: float | None = None,
     ) -> BaseModel:
-        payload_text = json.dumps(
-            payload,
-            ensure_ascii=False,
-            separators=(",", ":"),
-            sort_keys=False,
+        request_kwargs = build_text_request(
+            model=model,
+            system=system,
+            task=task,
+            payload=payload,
+            response_model=response_model,
+            prompt_cache_key=prompt_cache_key,
+            prompt_cache_retention=prompt_cache_retention,
+            context_text=context_text,
         )
-        user_text = f"{task}\n\nINPUT_JSON:\n{payload_text}"
-
-        logger.info(
-            "OpenAI TEXT call. model=%s schema=%s chars=%s cache_key=%s cache_retention=%s",
-            model,
-            response_model.__name__,
-            len(user_text),
-            bool(prompt_cache_key),
-            prompt_cache_retention,
-        )
-
-        request_kwargs: dict[str, Any] = {
-            "model": model,
-            "instructions": system,
-            "input": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "input_text",
-                            "text": user_text,
-                        }
-                    ],
-                }
-            ],
-            "text_format": response_model,
-        }
-
-        if prompt_cache_key:
-            request_kwargs["prompt_cache_key"] = prompt_cache_key
-        if prompt_cache_retention:
-            request_kwargs["prompt_cache_retention"] = prompt_cache_retention
 
         try:
-            response = self._client.responses.parse(**request_kwargs)
+            response = self._parse(request_kwargs, timeout_s)
         except TypeError:
             logger.warning(
                 "El SDK actual no acepta prompt_cache_key/prompt_cache_retention. "
@@ -118,9 +192,9 @@ class OpenAIResponsesTextClient:
             )
             request_kwargs.pop("prompt_cache_key", None)
             request_kwargs.pop("prompt_cache_retention", None)
-            response = self._client.responses.parse(**request_kwargs)
+            response = self._parse(request_kwargs, timeout_s)
         except Exception as exc:
-            if self._should_retry_without_cache(
+            if should_retry_without_cache(
                 exc=exc,
                 prompt_cache_requested=bool(prompt_cache_key),
             ):
@@ -131,11 +205,44 @@ class OpenAIResponsesTextClient:
                 )
                 request_kwargs.pop("prompt_cache_key", None)
                 request_kwargs.pop("prompt_cache_retention", None)
-                response = self._client.responses.parse(**request_kwargs)
+                response = self._parse(request_kwargs, timeout_s)
             else:
                 raise
 
+        if usage_sink is not None:
+            usage = usage_from_response(response)
+            if usage is not None:
+                usage_sink(usage)
+
         if response.output_parsed is None:
             raise ValueError("OpenAI no devolvió output_parsed en la respuesta.")
 
         return response.output_parsed
+
+    def _parse(
+        self,
+        request_kwargs: dict[str, Any],
+        timeout_s: float | None = None,
+    ) -> Any:
+        if self._rate_limiter is None:
+            if timeout_s is not None:
+                return self._client.responses.parse(**request_kwargs, timeout=timeout_s)
+            return self._client.responses.parse(**request_kwargs)
+
+        def _send(remaining_s: float | None) -> Any:
+            options: dict[str, Any] = {}
+            if remaining_s is not None:
+                options["timeout"] = remaining_s
+            raw = self._client.responses.with_raw_response.parse(
+                **request_kwargs,
+                **options,
+            )
+            self._rate_limiter.observe_headers(raw.headers)
+            return raw.parse()
+
+        return self._rate_limiter.call(
+            _send,
+            estimated_tokens=estimate_request_tokens(request_kwargs),
+            lane=self._lane,
+            timeout_s=timeout_s,
+        )
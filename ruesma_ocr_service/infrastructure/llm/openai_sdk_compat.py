@@ -2,11 +2,14 @@
 from __future__ import annotations
 
 import logging
+import os
 import threading
 from typing import Any
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
 _patch_lock = threading.Lock()
 _is_patched = False
 
@@ -43,3 +46,13 @@ def patch_openai_pydantic_compat() -> None:
 
         setattr(openai_compat, "model_dump", _patched_model_dump)
         _is_patched = True
+
+
+def resolve_openai_base_url(base_url: str | None) -> str:
+    """
+    `base_url` explícito para el cliente OpenAI. Con el valor vacío el SDK
+    leería OPENAI_BASE_URL del entorno, y `OPENAI_BASE_URL=` (vacío) deja
+    todas las llamadas en `APIConnectionError`.
+    """
+    resolved = (base_url or "").strip() or os.environ.get("OPENAI_BASE_URL", "").strip()
+    return resolved or DEFAULT_OPENAI_BASE_URL
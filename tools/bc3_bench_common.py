@@ -0,0 +1,106 @@
+# tools/bc3_bench_common.py
+from __future__ import annotations
+
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Sequence
+
+from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3DescompuestoInput,
+)
+from ruesma_ocr_service.infrastructure.catalog.compact_catalog_yaml_repository import (
+    CompactCatalogBundle,
+    CompactCatalogYamlRepository,
+)
+from ruesma_ocr_service.runtime_resources import default_bc3_catalog_yaml_path
+
+_TYPE_PREFIXES = {
+    "S": ("Suministro de", "Material:", ""),
+    "M": ("Montaje de", "Colocación de", "Mano de obra"),
+    "A": ("Suministro y montaje de", "Suministro e instalación de"),
+    "C": ("Maquinaria:", "Compra de"),
+    "L": ("Alquiler de", "Alquiler diario de"),
+    "X": ("Medios auxiliares:", ""),
+}
+
+_UNITS = ("ud", "m2", "ml", "m3", "h", "kg", "pa")
+
+
+@dataclass(frozen=True)
+class LabeledSample:
+    descompuesto: Bc3DescompuestoInput
+    expected_code: str
+
+
+def load_bundle(yaml_path: str | None = None) -> CompactCatalogBundle:
+    path = Path(yaml_path) if yaml_path else Path(default_bc3_catalog_yaml_path())
+    return CompactCatalogYamlRepository(path).get_bundle()
+
+
+def build_labeled_samples(
+    bundle: CompactCatalogBundle,
+    *,
+    count: int,
+    seed: int = 7,
+) -> List[LabeledSample]:
+    """
+    Genera descompuestos sintéticos a partir de las descripciones del propio
+    catálogo (con ruido: prefijos de tipo, palabras omitidas, unidades), de
+    forma que cada muestra conoce el código del que procede.
+    """
+    rng = random.Random(seed)
+    entries = list(bundle.entries)
+    samples: List[LabeledSample] = []
+
+    for idx in range(max(1, int(count))):
+        entry = rng.choice(entries)
+        words = entry.description.split()
+        if len(words) > 3 and rng.random() < 0.5:
+            words.pop(rng.randrange(len(words)))
+
+        prefix = rng.choice(_TYPE_PREFIXES.get(entry.type_code, ("",)))
+        descripcion = " ".join(part for part in [prefix, " ".join(words)] if part)
+        if entry.aliases and rng.random() < 0.3:
+            descripcion = f"{descripcion} ({rng.choice(entry.aliases)})"
+
+        samples.append(
+            LabeledSample(
+                descompuesto=Bc3DescompuestoInput(
+                    id=f"S{idx + 1:05d}",
+                    codigo_bc3=f"BENCH{idx + 1:05d}",
+                    descripcion=descripcion,
+                    capitulo=entry.family_name if rng.random() < 0.6 else None,
+                    partida=descripcion if rng.random() < 0.4 else None,
+                    unidad=rng.choice(_UNITS),
+                ),
+                expected_code=entry.code,
+            )
+        )
+
+    return samples
+
+
+def time_per_call(
+    func: Callable[[Bc3DescompuestoInput], object],
+    queries: Sequence[Bc3DescompuestoInput],
+) -> List[float]:
+    timings_ms: List[float] = []
+    for query in queries:
+        started = time.perf_counter()
+        func(query)
+        timings_ms.append((time.perf_counter() - started) * 1000.0)
+    return timings_ms
+
+
+def format_timings(label: str, timings_ms: Sequence[float]) -> str:
+    ordered = sorted(timings_ms)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (
+        f"{label:<28} n={len(ordered):<5} "
+        f"mean={statistics.fmean(ordered):8.2f} ms  "
+        f"p50={statistics.median(ordered):8.2f} ms  "
+        f"p95={p95:8.2f} ms  total={sum(ordered) / 1000.0:7.2f} s"
+    )
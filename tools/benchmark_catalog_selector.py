@@ -0,0 +1,75 @@
+# tools/benchmark_catalog_selector.py
+from __future__ import annotations
+
+import argparse
+
+from bc3_bench_common import (
+    build_labeled_samples,
+    format_timings,
+    load_bundle,
+    time_per_call,
+)
+
+from ruesma_ocr_service.application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mide la latencia por consulta del selector BC3 sin índice "
+            "(normalizando el catálogo en cada consulta) y con el índice "
+            "de rasgos precalculado por bundle."
+        )
+    )
+    parser.add_argument("--queries", type=int, default=50, help="Nº de consultas")
+    parser.add_argument("--catalog-yaml", default="", help="YAML de catálogo (opcional)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.catalog_yaml or None)
+    catalog_items = bundle.to_bc3_catalog_items()
+    queries = [
+        sample.descompuesto
+        for sample in build_labeled_samples(bundle, count=args.queries, seed=args.seed)
+    ]
+
+    selector = CatalogCandidateSelector()
+    top_k = len(catalog_items)
+
+    def _without_index(query):
+        return selector.select(
+            descompuesto=query,
+            catalogo=catalog_items,
+            top_k=top_k,
+        )
+
+    index = selector.index_for(
+        cache_key=bundle.prompt_cache_key,
+        catalogo=catalog_items,
+    )
+
+    def _with_index(query):
+        return selector.select(descompuesto=query, index=index, top_k=top_k)
+
+    before = time_per_call(_without_index, queries)
+    after = time_per_call(_with_index, queries)
+
+    mismatches = 0
+    for query in queries:
+        left = [(c.codigo, c.score) for c in _without_index(query)]
+        right = [(c.codigo, c.score) for c in _with_index(query)]
+        if left != right:
+            mismatches += 1
+
+    print(f"catálogo={len(catalog_items)} items  version={bundle.version}")
+    print(format_timings("antes (sin índice)", before))
+    print(format_timings("después (índice bundle)", after))
+    print(f"speedup medio: {sum(before) / max(sum(after), 1e-9):.2f}x")
+    print(f"rankings distintos: {mismatches}/{len(queries)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+# tools/benchmark_selector_batch.py
+from __future__ import annotations
+
+import argparse
+import time
+
+from bc3_bench_common import build_labeled_samples, load_bundle
+
+from ruesma_ocr_service.application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mide select_many (scorer vectorizado) sobre un presupuesto "
+            "sintético y su acuerdo top-1 con el selector por item."
+        )
+    )
+    parser.add_argument("--queries", type=int, default=10000, help="Líneas del presupuesto")
+    parser.add_argument(
+        "--agreement-sample",
+        type=int,
+        default=100,
+        help="Nº de líneas para comparar con el selector por item (full rerank)",
+    )
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--catalog-yaml", default="")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.catalog_yaml or None)
+    catalog_items = bundle.to_bc3_catalog_items()
+    samples = build_labeled_samples(bundle, count=args.queries, seed=args.seed)
+
+    selector = CatalogCandidateSelector()
+    index = selector.index_for(
+        cache_key=bundle.prompt_cache_key,
+        catalogo=catalog_items,
+    )
+
+    started = time.perf_counter()
+    batch_rankings = selector.select_many(
+        descompuestos=[sample.descompuesto for sample in samples],
+        index=index,
+        top_k=args.top_k,
+    )
+    batch_seconds = time.perf_counter() - started
+
+    sample_size = min(len(samples), max(1, args.agreement_sample))
+    top1_equal = 0
+    top1_in_top5 = 0
+    scalar_hits = 0
+    batch_hits = 0
+    started = time.perf_counter()
+    for sample, batch_ranking in zip(samples[:sample_size], batch_rankings):
+        scalar_ranking = selector.select(
+            descompuesto=sample.descompuesto,
+            index=index,
+            top_k=5,
+            full_rerank=True,
+        )
+        batch_codes = [cand.codigo for cand in batch_ranking[:5]]
+        top1_equal += int(scalar_ranking[0].codigo == batch_codes[0])
+        top1_in_top5 += int(scalar_ranking[0].codigo in batch_codes)
+        scalar_hits += int(scalar_ranking[0].codigo == sample.expected_code)
+        batch_hits += int(batch_codes[0] == sample.expected_code)
+    scalar_seconds = time.perf_counter() - started
+
+    estimated_scalar = scalar_seconds / sample_size * len(samples)
+    print(f"catálogo={len(catalog_items)} items  líneas={len(samples)}  top_k={args.top_k}")
+    print(f"select_many (vectorizado): {batch_seconds:8.2f} s")
+    print(
+        f"select por item (estimado): {estimated_scalar:8.2f} s "
+        f"(medido sobre {sample_size} líneas)"
+    )
+    print(
+        f"acuerdo top-1: {top1_equal}/{sample_size}  "
+        f"top-1 por item dentro del top-5 vectorizado: {top1_in_top5}/{sample_size}"
+    )
+    print(
+        f"acierto top-1 (etiqueta): por item={scalar_hits}/{sample_size} "
+        f"vectorizado={batch_hits}/{sample_size}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
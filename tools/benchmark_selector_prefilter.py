@@ -0,0 +1,128 @@
+# tools/benchmark_selector_prefilter.py
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import replace
+from typing import List
+
+from bc3_bench_common import (
+    build_labeled_samples,
+    format_timings,
+    load_bundle,
+    time_per_call,
+)
+
+from ruesma_ocr_service.application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+)
+from ruesma_ocr_service.infrastructure.catalog.compact_catalog_yaml_repository import (
+    CatalogEntry,
+)
+
+
+def _scaled_entries(entries: List[CatalogEntry], target: int, seed: int) -> List[CatalogEntry]:
+    """
+    Amplía el catálogo hasta `target` entradas clonando productos con códigos
+    nuevos y descripciones barajadas, para simular catálogos de 20k+.
+    """
+    rng = random.Random(seed)
+    scaled = list(entries)
+    serial = 0
+    while len(scaled) < target:
+        base = rng.choice(entries)
+        words = base.description.split()
+        rng.shuffle(words)
+        serial += 1
+        scaled.append(
+            replace(
+                base,
+                code=f"{base.code[:2]}Z{serial:06d}",
+                description=" ".join(words),
+            )
+        )
+    return scaled
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compara el selector BC3 exhaustivo (full rerank) frente al "
+            "prefiltro BM25 + scorer difuso: latencia y acuerdo top-1/top-5."
+        )
+    )
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--catalog-yaml", default="")
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=0,
+        help="Amplía el catálogo sintéticamente hasta N entradas (0 = sin ampliar)",
+    )
+    parser.add_argument("--prefilter-limit", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.catalog_yaml or None)
+    entries = list(bundle.entries)
+    if args.scale > len(entries):
+        entries = _scaled_entries(entries, args.scale, args.seed)
+    catalog_items = [entry.to_bc3_catalog_item() for entry in entries]
+
+    samples = build_labeled_samples(bundle, count=args.queries, seed=args.seed)
+    queries = [sample.descompuesto for sample in samples]
+
+    selector = CatalogCandidateSelector(prefilter_limit=args.prefilter_limit)
+    index = selector.index_for(
+        cache_key=f"{bundle.prompt_cache_key}:{len(entries)}",
+        catalogo=catalog_items,
+    )
+    top_k = len(catalog_items)
+
+    def _full(query):
+        return selector.select(
+            descompuesto=query,
+            index=index,
+            top_k=top_k,
+            full_rerank=True,
+        )
+
+    def _prefiltered(query):
+        return selector.select(
+            descompuesto=query,
+            index=index,
+            top_k=top_k,
+            full_rerank=False,
+        )
+
+    full_timings = time_per_call(_full, queries)
+    prefilter_timings = time_per_call(_prefiltered, queries)
+
+    top1_equal = 0
+    top5_equal = 0
+    full_hits = 0
+    prefilter_hits = 0
+    for sample in samples:
+        full_codes = [c.codigo for c in _full(sample.descompuesto)[:5]]
+        pre_codes = [c.codigo for c in _prefiltered(sample.descompuesto)[:5]]
+        top1_equal += int(full_codes[:1] == pre_codes[:1])
+        top5_equal += int(full_codes == pre_codes)
+        full_hits += int(full_codes[:1] == [sample.expected_code])
+        prefilter_hits += int(pre_codes[:1] == [sample.expected_code])
+
+    total = len(samples)
+    print(
+        f"catálogo={len(catalog_items)} items  prefilter_limit={args.prefilter_limit}"
+    )
+    print(format_timings("full rerank", full_timings))
+    print(format_timings("prefiltro BM25", prefilter_timings))
+    print(
+        f"speedup medio: {sum(full_timings) / max(sum(prefilter_timings), 1e-9):.2f}x"
+    )
+    print(f"acuerdo top-1: {top1_equal}/{total}  top-5 idéntico: {top5_equal}/{total}")
+    print(f"acierto top-1 (etiqueta): full={full_hits}/{total} prefiltro={prefilter_hits}/{total}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,433 @@
+# tools/fake_responses_server.py
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bc3_bench_common import load_bundle
+
+from ruesma_ocr_service.application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+)
+from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3DescompuestoInput,
+)
+
+_INPUT_MARKER = "INPUT_JSON:\n"
+
+# Imitación de la cache de prefijo de OpenAI: solo cuenta a partir de 1024
+# tokens de prefijo común y en tramos de 128 (tokens aproximados a 4 chars).
+_CHARS_PER_TOKEN = 4
+_CACHE_MIN_TOKENS = 1024
+_CACHE_CHUNK_TOKENS = 128
+_CACHE_RECENT_PROMPTS = 32
+
+# Líneas de item del catálogo compacto (BC3CATv1): <codigo>|<tipo_id>|...
+_CATALOG_LINE_RE = re.compile(r"^([^|\s]+)\|[A-Z]\|", re.MULTILINE)
+
+
+def _schema_instance(schema: dict, definitions: dict) -> object:
+    """
+    Instancia mínima válida de un esquema JSON estricto: null donde se
+    admite y un único elemento por lista.
+    """
+    ref = schema.get("$ref")
+    if ref:
+        return _schema_instance(definitions[ref.rsplit("/", 1)[-1]], definitions)
+    options = schema.get("anyOf")
+    if options:
+        if any(option.get("type") == "null" for option in options):
+            return None
+        return _schema_instance(options[0], definitions)
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        if "null" in kind:
+            return None
+        kind = kind[0]
+    if kind == "object":
+        return {
+            name: _schema_instance(prop, definitions)
+            for name, prop in (schema.get("properties") or {}).items()
+        }
+    if kind == "array":
+        return [_schema_instance(schema.get("items") or {}, definitions)]
+    defaults = {"string": "", "integer": 0, "number": 0, "boolean": False}
+    return defaults.get(kind)
+
+
+class _FakeResponsesState:
+    """
+    Clasifica cada item del lote con el selector local (top-1) y responde
+    con el mismo sobre que la Responses API, para poder ejercitar los
+    clientes síncrono y asíncrono sin red ni coste. Las peticiones sin
+    lote BC3 (p. ej. extracción por visión) reciben una instancia mínima
+    del esquema pedido.
+    """
+
+    def __init__(
+        self,
+        *,
+        catalog_yaml: str | None,
+        latency_ms: float,
+        fail_every: int,
+        rpm_limit: int = 0,
+    ) -> None:
+        bundle = load_bundle(catalog_yaml)
+        self._selector = CatalogCandidateSelector()
+        self._bundle = bundle
+        self._index = self._selector.index_for(
+            cache_key=bundle.prompt_cache_key,
+            catalogo=bundle.to_bc3_catalog_items(),
+        )
+        self._latency_s = max(0.0, latency_ms) / 1000.0
+        self._fail_every = max(0, int(fail_every))
+        self._rpm_limit = max(0, int(rpm_limit))
+        self._accepted_at: deque[float] = deque()
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._recent_prompts: deque[str] = deque(maxlen=_CACHE_RECENT_PROMPTS)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def handle(self, body: dict) -> tuple[int, dict, dict[str, str]]:
+        limited, headers = self._admit()
+        if limited:
+            return 429, {
+                "error": {
+                    "message": "Rate limit simulado: demasiadas peticiones por minuto.",
+                    "type": "requests",
+                    "param": None,
+                    "code": "rate_limit_exceeded",
+                }
+            }, headers
+
+        call_number = next(self._counter)
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self._latency_s)
+            if self._fail_every and call_number % self._fail_every == 0:
+                return 400, {
+                    "error": {
+                        "message": f"Fallo simulado en la llamada {call_number}.",
+                        "type": "invalid_request_error",
+                        "param": None,
+                        "code": None,
+                    }
+                }, headers
+            return 200, self._response(body), headers
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _admit(self) -> tuple[bool, dict[str, str]]:
+        """
+        Ventana deslizante de 60 s como el límite RPM de OpenAI: devuelve si
+        la petición se rechaza con 429 y las cabeceras x-ratelimit-*.
+        """
+        if not self._rpm_limit:
+            return False, {}
+
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted_at and now - self._accepted_at[0] >= 60.0:
+                self._accepted_at.popleft()
+            limited = len(self._accepted_at) >= self._rpm_limit
+            if limited:
+                self.rate_limited += 1
+            else:
+                self._accepted_at.append(now)
+            reset_s = 60.0 - (now - self._accepted_at[0]) if self._accepted_at else 0.0
+
+        headers = {
+            "x-ratelimit-limit-requests": str(self._rpm_limit),
+            "x-ratelimit-remaining-requests": str(
+                max(0, self._rpm_limit - len(self._accepted_at))
+            ),
+            "x-ratelimit-reset-requests": f"{reset_s:.3f}s",
+        }
+        if limited:
+            headers["retry-after-ms"] = str(int(reset_s * 1000))
+        return limited, headers
+
+    def _response(self, body: dict) -> dict:
+        lot = self._extract_lot(body)
+        prompt = self._prompt_text(body)
+        # Como un modelo real, solo puede elegir códigos que ve en el prompt.
+        visible = set(_CATALOG_LINE_RE.findall(prompt)) & self._bundle.codes
+        resultados = []
+        families: dict[str, list[str]] = {}
+        for raw in lot:
+            item = Bc3DescompuestoInput(
+                id=str(raw.get("i") or ""),
+                codigo_bc3=raw.get("b"),
+                unidad=raw.get("u"),
+                capitulo=raw.get("ca"),
+                subcapitulo=raw.get("sc"),
+                partida=raw.get("p"),
+                descripcion=str(raw.get("d") or ""),
+            )
+            top = self._selector.select(descompuesto=item, index=self._index, top_k=50)
+            if visible:
+                top = [candidate for candidate in top if candidate.codigo in visible]
+            top = top[:2]
+            families[item.id] = list(
+                dict.fromkeys(
+                    self._bundle.entries_by_code[candidate.codigo].family_id
+                    for candidate in top
+                )
+            )
+            decided = {
+                "id": item.id,
+                "tipo": "INDETERMINADO",
+                "codigo_interno": top[0].codigo if top else None,
+                "confianza_pct": 80.0,
+            }
+            resultados.append(decided)
+
+        if lot:
+            output = self._render_output(body, resultados, families)
+        else:
+            schema = ((body.get("text") or {}).get("format") or {}).get("schema") or {}
+            output = _schema_instance(schema, schema.get("$defs") or {})
+        text = json.dumps(output, ensure_ascii=False)
+        input_tokens = len(prompt) // _CHARS_PER_TOKEN
+        cached_tokens = self._cached_tokens(prompt)
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.cached_tokens += cached_tokens
+            self.output_tokens += len(text) // _CHARS_PER_TOKEN
+            self.calls += 1
+        return {
+            "id": f"resp_{uuid.uuid4().hex}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model") or "fake",
+            "status": "completed",
+            "output": [
+                {
+                    "id": f"msg_{uuid.uuid4().hex}",
+                    "type": "message",
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [
+                        {"type": "output_text", "text": text, "annotations": []}
+                    ],
+                }
+            ],
+            "parallel_tool_calls": False,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": cached_tokens},
+                "output_tokens": len(text) // _CHARS_PER_TOKEN,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + len(text) // _CHARS_PER_TOKEN,
+            },
+        }
+
+    @staticmethod
+    def _render_output(
+        body: dict,
+        resultados: list[dict],
+        families: dict[str, list[str]],
+    ) -> dict:
+        """
+        Respeta el esquema pedido como lo haría structured outputs en modo
+        estricto: todas las propiedades del item aparecen (null si el modelo
+        no las decide), para que los tokens de salida sean comparables.
+        """
+        schema = ((body.get("text") or {}).get("format") or {}).get("schema") or {}
+        definitions = (schema.get("$defs") or {}).values()
+        if any("f" in (definition.get("properties") or {}) for definition in definitions):
+            return {
+                "r": [
+                    {"i": item["id"], "f": families.get(item["id"], [])}
+                    for item in resultados
+                ]
+            }
+        if "r" in (schema.get("properties") or {}):
+            return {
+                "r": [
+                    {
+                        "i": item["id"],
+                        "c": item["codigo_interno"],
+                        "t": "I",
+                        "p": item["confianza_pct"],
+                    }
+                    for item in resultados
+                ]
+            }
+
+        item_fields: list[str] = []
+        for definition in definitions:
+            properties = definition.get("properties") or {}
+            if "codigo_interno" in properties:
+                item_fields = list(properties)
+        if not item_fields:
+            return {"resultados": resultados}
+        return {
+            "resultados": [
+                {field: item.get(field) for field in item_fields}
+                for item in resultados
+            ]
+        }
+
+    @staticmethod
+    def _prompt_text(body: dict) -> str:
+        parts = [str(body.get("instructions") or "")]
+        for message in body.get("input") or []:
+            for part in message.get("content") or []:
+                parts.append(str(part.get("text") or ""))
+        return "\n".join(parts)
+
+    def _cached_tokens(self, prompt: str) -> int:
+        with self._lock:
+            recent = list(self._recent_prompts)
+            self._recent_prompts.append(prompt)
+
+        common = 0
+        for previous in recent:
+            limit = min(len(previous), len(prompt))
+            size = 0
+            while size < limit and previous[size] == prompt[size]:
+                size += 1
+            common = max(common, size)
+
+        tokens = common // _CHARS_PER_TOKEN
+        if tokens < _CACHE_MIN_TOKENS:
+            return 0
+        return tokens - tokens % _CACHE_CHUNK_TOKENS
+
+    @staticmethod
+    def _extract_lot(body: dict) -> list:
+        for message in body.get("input") or []:
+            for part in message.get("content") or []:
+                text = part.get("text") or ""
+                if _INPUT_MARKER in text:
+                    payload = json.loads(text.split(_INPUT_MARKER, 1)[1])
+                    return list(payload.get("lot") or [])
+        return []
+
+
+def _build_handler(state: _FakeResponsesState):
+    class _Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            if not re.fullmatch(r"(/v1)?/responses", self.path.split("?", 1)[0]):
+                self._send(404, {"error": {"message": "Ruta no soportada."}})
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            status, data, headers = state.handle(body)
+            self._send(status, data, headers)
+
+        def _send(
+            self,
+            status: int,
+            data: dict,
+            headers: dict[str, str] | None = None,
+        ) -> None:
+            raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, format: str, *args) -> None:
+            return
+
+    return _Handler
+
+
+def serve(
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    catalog_yaml: str | None = None,
+    latency_ms: float = 200.0,
+    fail_every: int = 0,
+    rpm_limit: int = 0,
+) -> tuple[ThreadingHTTPServer, _FakeResponsesState]:
+    """
+    Arranca el servidor en un hilo y lo devuelve junto a su estado (para
+    leer `peak_in_flight` y los tokens acumulados). Úsalo con
+    OPENAI_BASE_URL=http://host:port/v1.
+    """
+    state = _FakeResponsesState(
+        catalog_yaml=catalog_yaml,
+        latency_ms=latency_ms,
+        fail_every=fail_every,
+        rpm_limit=rpm_limit,
+    )
+    server = ThreadingHTTPServer((host, port), _build_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Servidor local que imita POST /v1/responses para probar la "
+            "clasificación BC3 (síncrona y asíncrona) sin llamar a OpenAI."
+        )
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--catalog-yaml", default="")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument(
+        "--fail-every",
+        type=int,
+        default=0,
+        help="Responde 400 cada N llamadas (0 = nunca).",
+    )
+    parser.add_argument(
+        "--rpm-limit",
+        type=int,
+        default=0,
+        help="Responde 429 por encima de N peticiones por minuto (0 = sin límite).",
+    )
+    args = parser.parse_args()
+
+    server, _state = serve(
+        host=args.host,
+        port=args.port,
+        catalog_yaml=args.catalog_yaml or None,
+        latency_ms=args.latency_ms,
+        fail_every=args.fail_every,
+        rpm_limit=args.rpm_limit,
+    )
+    print(f"Fake Responses API en http://{args.host}:{args.port}/v1 (Ctrl+C para salir)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+# tools/load_test_extract.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import mimetypes
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from fake_responses_server import serve
+
+# PNG de 1x1: el servidor falso no mira el contenido.
+_TINY_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/x8AAwMCAO+ip1sAAAAASUVORK5CYII="
+)
+
+
+def _start_local_api(port: int):
+    import uvicorn
+
+    from config.settings import Settings
+    from interface_adapters.api.app import build_app
+
+    server = uvicorn.Server(
+        uvicorn.Config(build_app(Settings()), host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _extract(
+    client: httpx.AsyncClient,
+    *,
+    url: str,
+    prompt_key: str,
+    filename: str,
+    mime_type: str,
+    data: bytes,
+) -> tuple[int, float]:
+    started = time.perf_counter()
+    response = await client.post(
+        f"{url}/v1/extract",
+        data={"prompt_key": prompt_key},
+        files={"file": (filename, data, mime_type)},
+    )
+    return response.status_code, time.perf_counter() - started
+
+
+async def _run(args: argparse.Namespace, url: str) -> None:
+    if args.file:
+        path = Path(args.file)
+        data = path.read_bytes()
+        filename = path.name
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    else:
+        data, filename, mime_type = _TINY_PNG, "certificado.png", "image/png"
+
+    async with httpx.AsyncClient(timeout=None) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[
+                _extract(
+                    client,
+                    url=url,
+                    prompt_key=args.prompt_key,
+                    filename=filename,
+                    mime_type=mime_type,
+                    data=data,
+                )
+                for _ in range(args.requests)
+            ]
+        )
+        wall_s = time.perf_counter() - started
+        health = (await client.get(f"{url}/health")).json()
+
+    latencies = [latency for _status, latency in results]
+    statuses = sorted({status for status, _latency in results})
+    print(f"peticiones={args.requests}  estados={statuses}")
+    print(
+        f"total={wall_s:.2f}s  min={min(latencies):.2f}s  max={max(latencies):.2f}s  "
+        f"mediana={statistics.median(latencies):.2f}s  suma={sum(latencies):.2f}s"
+    )
+    # La más rápida ~ coste de una extracción sin esperas: ≈1 en paralelo, ≈N en serie.
+    print(f"total/min={wall_s / min(latencies):.2f}")
+    if "vision_executor" in health:
+        print(f"vision_executor={health['vision_executor']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Lanza N extracciones concurrentes contra /v1/extract. Sin --url "
+            "arranca la API en este proceso contra el servidor local que imita "
+            "la Responses API: con el pool de visión, el tiempo total debe "
+            "acercarse a la latencia máxima y no a la suma."
+        )
+    )
+    parser.add_argument("--url", default="", help="API ya arrancada (p. ej. http://127.0.0.1:8000).")
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--prompt-key", default="residuos_planta_es")
+    parser.add_argument("--file", default="", help="Documento a subir (por defecto un PNG mínimo).")
+    parser.add_argument("--latency-ms", type=float, default=1000.0)
+    parser.add_argument("--vision-max-concurrency", type=int, default=0)
+    parser.add_argument("--fake-port", type=int, default=8791)
+    parser.add_argument("--api-port", type=int, default=8792)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(_run(args, args.url.rstrip("/")))
+        return 0
+
+    fake_server, _state = serve(port=args.fake_port, latency_ms=args.latency_ms)
+    os.environ.update(
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "fake",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.fake_port}/v1",
+        BC3_JOBS_ENABLED="false",
+    )
+    if args.vision_max_concurrency:
+        os.environ["VISION_MAX_CONCURRENCY"] = str(args.vision_max_concurrency)
+
+    api_server = _start_local_api(args.api_port)
+    try:
+        asyncio.run(_run(args, f"http://127.0.0.1:{args.api_port}"))
+    finally:
+        api_server.should_exit = True
+        fake_server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+# tools/report_catalog_slice.py
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+
+from bc3_bench_common import build_labeled_samples, load_bundle
+
+from ruesma_ocr_service.application.pipelines.bc3_classification_pipeline import (
+    Bc3ClassificationPipeline,
+)
+from ruesma_ocr_service.application.services.bc3_batch_planner import (
+    Bc3BatchPlanner,
+)
+from ruesma_ocr_service.application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+)
+from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionResultado,
+    Bc3ClassificationRequest,
+)
+from ruesma_ocr_service.infrastructure.catalog.compact_catalog_yaml_repository import (
+    CompactCatalogYamlRepository,
+)
+from ruesma_ocr_service.runtime_resources import default_bc3_catalog_yaml_path
+
+# Mínimo de prefijo idéntico para que OpenAI lo sirva desde cache.
+_CACHE_MIN_TOKENS = 1024
+
+
+class _RecordingExtractor:
+    """
+    No llama a ningún LLM: guarda el bloque de catálogo y el lote de cada
+    llamada para estimar tokens y comprobar si el código esperado era
+    visible para el modelo.
+    """
+
+    model = "sin-llm"
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict]] = []
+
+    def extract(self, *, prompt_key, payload, context_text=None, **_kwargs):
+        catalog = context_text if context_text is not None else payload.get("cat") or ""
+        self.calls.append((catalog, payload))
+        return Bc3ClasificacionResultado(resultados=[]), "bc3_clasificacion_resultado"
+
+
+def _parse_ints(raw: str) -> list[int]:
+    return [int(part) for part in raw.split(",") if part.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compara el layout 'prefix' (catálogo completo, cacheable) con "
+            "'top_k' (extracto con los candidatos del lote): tokens de "
+            "catálogo+lote por request y cobertura del código esperado."
+        )
+    )
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--catalog-yaml", default="")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--top-ks", default="5,10,20,40")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    catalog_path = args.catalog_yaml or default_bc3_catalog_yaml_path()
+    repo = CompactCatalogYamlRepository(catalog_path)
+    samples = build_labeled_samples(
+        load_bundle(args.catalog_yaml or None),
+        count=args.queries,
+        seed=args.seed,
+    )
+    expected = {sample.descompuesto.id: sample.expected_code for sample in samples}
+    selector = CatalogCandidateSelector()
+    planner = Bc3BatchPlanner()
+
+    print(
+        f"consultas={len(samples)}  llm_batch_size={args.batch_size}  "
+        f"items_catalogo={len(repo.get_bundle().entries)}"
+    )
+    print(
+        "layout   top_k  llamadas  tokens_cat+lote  cacheables  no_cacheados  "
+        "cobertura_codigo"
+    )
+    runs = [("prefix", max(_parse_ints(args.top_ks) or [20]))]
+    runs += [("top_k", top_k) for top_k in _parse_ints(args.top_ks)]
+    for layout, top_k in runs:
+        extractor = _RecordingExtractor()
+        pipeline = Bc3ClassificationPipeline(
+            extractor=extractor,
+            selector=selector,
+            catalog_repository=repo,
+            prompt_layout=layout,
+        )
+        pipeline.run(
+            Bc3ClassificationRequest(
+                descompuestos=[sample.descompuesto for sample in samples],
+                llm_batch_size=args.batch_size,
+                top_k_candidates=top_k,
+            )
+        )
+
+        total = cached = visible = seen = 0
+        previous_blocks: set[str] = set()
+        for catalog, payload in extractor.calls:
+            catalog_tokens = planner.estimate_tokens(catalog)
+            lot_tokens = planner.estimate_tokens(
+                json.dumps(payload.get("lot") or [], ensure_ascii=False)
+            )
+            total += catalog_tokens + lot_tokens
+            if catalog in previous_blocks and catalog_tokens >= _CACHE_MIN_TOKENS:
+                cached += catalog_tokens
+            previous_blocks.add(catalog)
+            for raw in payload.get("lot") or []:
+                seen += 1
+                visible += int(f"\n{expected[raw['i']]}|" in catalog)
+
+        coverage = f"{visible}/{seen} ({100.0 * visible / max(seen, 1):.1f}%)"
+        print(
+            f"{layout:<7}  {top_k if layout == 'top_k' else '-':>5}  "
+            f"{len(extractor.calls):8d}  {total:15d}  {cached:10d}  "
+            f"{total - cached:12d}  {coverage:>16}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+# tools/report_prompt_layouts.py
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import time
+
+from bc3_bench_common import build_labeled_samples, load_bundle
+from fake_responses_server import serve
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Clasifica una muestra etiquetada contra el servidor local que "
+            "imita la Responses API con cada BC3_PROMPT_LAYOUT y compara "
+            "llamadas, tokens (cacheados o no), tiempo y acierto."
+        )
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--catalog-yaml", default="")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--layouts", default="prefix,top_k,hierarchical")
+    args = parser.parse_args()
+
+    server, state = serve(
+        port=args.port,
+        catalog_yaml=args.catalog_yaml or None,
+        latency_ms=args.latency_ms,
+    )
+    os.environ.update(
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "fake",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.port}/v1",
+        BC3_LLM_MAX_CONCURRENCY=str(args.concurrency),
+        BC3_DEDUP_ENABLED="false",
+        BC3_RESULT_CACHE_ENABLED="false",
+    )
+    if args.catalog_yaml:
+        os.environ["BC3_CATALOG_YAML_PATH"] = args.catalog_yaml
+
+    from ruesma_ocr_service.bc3_library import Bc3ClassifierLibrary
+
+    samples = build_labeled_samples(
+        load_bundle(args.catalog_yaml or None),
+        count=args.queries,
+        seed=args.seed,
+    )
+    expected = {sample.descompuesto.id: sample.expected_code for sample in samples}
+    request = {
+        "descompuestos": [sample.descompuesto.model_dump() for sample in samples],
+        "llm_batch_size": args.batch_size,
+    }
+
+    print(f"consultas={len(samples)}  llm_batch_size={args.batch_size}")
+    print(
+        "layout         llamadas  entrada  cacheados  no_cacheados  salida  "
+        "tokens/item  tiempo_s  acierto"
+    )
+    try:
+        for layout in [part.strip() for part in args.layouts.split(",") if part.strip()]:
+            os.environ["BC3_PROMPT_LAYOUT"] = layout
+            library = Bc3ClassifierLibrary()
+            logging.disable(logging.CRITICAL)
+            before = (
+                state.calls,
+                state.input_tokens,
+                state.cached_tokens,
+                state.output_tokens,
+            )
+
+            started = time.perf_counter()
+            envelope = library.classify(request)
+            elapsed = time.perf_counter() - started
+
+            calls, input_tokens, cached_tokens, output_tokens = (
+                now - prev
+                for now, prev in zip(
+                    (
+                        state.calls,
+                        state.input_tokens,
+                        state.cached_tokens,
+                        state.output_tokens,
+                    ),
+                    before,
+                )
+            )
+            resultados = envelope["data"]["resultados"]
+            hits = sum(
+                int(item["codigo_interno"] == expected[item["id"]])
+                for item in resultados
+            )
+            uncached = input_tokens - cached_tokens
+            print(
+                f"{layout:<13}  {calls:8d}  {input_tokens:7d}  {cached_tokens:9d}  "
+                f"{uncached:12d}  {output_tokens:6d}  "
+                f"{(uncached + output_tokens) / max(len(resultados), 1):11.1f}  "
+                f"{elapsed:8.2f}  {hits}/{len(resultados)}"
+            )
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
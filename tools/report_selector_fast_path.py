@@ -0,0 +1,112 @@
+# tools/report_selector_fast_path.py
+from __future__ import annotations
+
+import argparse
+import logging
+
+from bc3_bench_common import build_labeled_samples, load_bundle
+
+from ruesma_ocr_service.application.pipelines.bc3_classification_pipeline import (
+    Bc3ClassificationPipeline,
+)
+from ruesma_ocr_service.application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+)
+from ruesma_ocr_service.domain.models.bc3_classification_models import (
+    Bc3ClasificacionResultado,
+    Bc3ClassificationRequest,
+)
+from ruesma_ocr_service.infrastructure.catalog.compact_catalog_yaml_repository import (
+    CompactCatalogYamlRepository,
+)
+from ruesma_ocr_service.runtime_resources import default_bc3_catalog_yaml_path
+
+
+class _CountingExtractor:
+    """
+    No llama a ningún LLM: cuenta los items que el pipeline le enviaría y
+    devuelve un resultado vacío (esos items salen por fallback local).
+    """
+
+    model = "sin-llm"
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.items = 0
+
+    def extract(self, *, prompt_key, payload, **_kwargs):
+        self.calls += 1
+        self.items += len(payload.get("lot") or [])
+        return Bc3ClasificacionResultado(resultados=[]), "bc3_clasificacion_resultado"
+
+
+def _parse_floats(raw: str) -> list[float]:
+    return [float(part) for part in raw.split(",") if part.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Barre umbrales del fast path del selector: qué parte del "
+            "presupuesto se resuelve sin LLM y con qué acierto top-1."
+        )
+    )
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--catalog-yaml", default="")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--confidences", default="75,80,85,90")
+    parser.add_argument("--margins", default="0.1,0.25,0.4")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    catalog_path = args.catalog_yaml or default_bc3_catalog_yaml_path()
+    repo = CompactCatalogYamlRepository(catalog_path)
+    samples = build_labeled_samples(
+        load_bundle(args.catalog_yaml or None),
+        count=args.queries,
+        seed=args.seed,
+    )
+    expected = {sample.descompuesto.id: sample.expected_code for sample in samples}
+    req = Bc3ClassificationRequest(
+        descompuestos=[sample.descompuesto for sample in samples],
+        llm_batch_size=args.batch_size,
+    )
+    selector = CatalogCandidateSelector()
+
+    total = len(samples)
+    print(f"consultas={total}  llm_batch_size={args.batch_size}")
+    print("min_conf  min_margen  fast_path  acierto_fast_path  items_llm  llamadas_llm")
+    for min_conf in _parse_floats(args.confidences):
+        for min_margin in _parse_floats(args.margins):
+            extractor = _CountingExtractor()
+            pipeline = Bc3ClassificationPipeline(
+                extractor=extractor,
+                selector=selector,
+                catalog_repository=repo,
+                fast_path_enabled=True,
+                fast_path_min_confidence=min_conf,
+                fast_path_min_margin=min_margin,
+            )
+            result = pipeline.run(req)
+            fast = [
+                item
+                for item in result.resultados
+                if item.confidence_source == "selector_fast_path"
+            ]
+            hits = sum(
+                int(item.codigo_interno == expected[item.id])
+                for item in fast
+            )
+            accuracy = f"{hits}/{len(fast)}" if fast else "-"
+            print(
+                f"{min_conf:8.1f}  {min_margin:10.2f}  "
+                f"{len(fast):4d}/{total:<4d}  {accuracy:>17}  "
+                f"{extractor.items:9d}  {extractor.calls:12d}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
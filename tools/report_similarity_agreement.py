@@ -0,0 +1,90 @@
+# tools/report_similarity_agreement.py
+from __future__ import annotations
+
+import argparse
+
+from bc3_bench_common import (
+    build_labeled_samples,
+    format_timings,
+    load_bundle,
+    time_per_call,
+)
+
+from ruesma_ocr_service.application.services.catalog_candidate_selector import (
+    CatalogCandidateSelector,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compara el kernel de similitud histórico (difflib) con el de "
+            "trigramas: acuerdo top-1/top-5, acierto etiquetado y latencia."
+        )
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--catalog-yaml", default="")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.catalog_yaml or None)
+    catalog_items = bundle.to_bc3_catalog_items()
+    samples = build_labeled_samples(bundle, count=args.queries, seed=args.seed)
+    queries = [sample.descompuesto for sample in samples]
+
+    reference = CatalogCandidateSelector(full_rerank=True, similarity="difflib")
+    candidate = CatalogCandidateSelector(full_rerank=True, similarity="trigram")
+    reference_index = reference.index_for(
+        cache_key=bundle.prompt_cache_key,
+        catalogo=catalog_items,
+    )
+    candidate_index = candidate.index_for(
+        cache_key=bundle.prompt_cache_key,
+        catalogo=catalog_items,
+    )
+
+    def _reference(query):
+        return reference.select(descompuesto=query, index=reference_index, top_k=5)
+
+    def _candidate(query):
+        return candidate.select(descompuesto=query, index=candidate_index, top_k=5)
+
+    reference_timings = time_per_call(_reference, queries)
+    candidate_timings = time_per_call(_candidate, queries)
+
+    top1_equal = 0
+    top1_in_top5 = 0
+    top5_equal = 0
+    reference_hits = 0
+    candidate_hits = 0
+    for sample in samples:
+        reference_codes = [c.codigo for c in _reference(sample.descompuesto)]
+        candidate_codes = [c.codigo for c in _candidate(sample.descompuesto)]
+        top1_equal += int(reference_codes[:1] == candidate_codes[:1])
+        top1_in_top5 += int(reference_codes[0] in candidate_codes)
+        top5_equal += int(set(reference_codes) == set(candidate_codes))
+        reference_hits += int(reference_codes[:1] == [sample.expected_code])
+        candidate_hits += int(candidate_codes[:1] == [sample.expected_code])
+
+    total = len(samples)
+    print(f"catálogo={len(catalog_items)} items  consultas={total}  (full rerank)")
+    print(format_timings("difflib", reference_timings))
+    print(format_timings("trigram", candidate_timings))
+    print(
+        f"speedup medio: "
+        f"{sum(reference_timings) / max(sum(candidate_timings), 1e-9):.2f}x"
+    )
+    print(
+        f"acuerdo top-1: {top1_equal}/{total}  "
+        f"top-1 difflib dentro del top-5 trigram: {top1_in_top5}/{total}  "
+        f"mismo conjunto top-5: {top5_equal}/{total}"
+    )
+    print(
+        f"acierto top-1 (etiqueta): difflib={reference_hits}/{total} "
+        f"trigram={candidate_hits}/{total}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())